@@ -0,0 +1 @@
+"""Hardware-free benchmarks: a pty Tasmota emulator, scripted sensors and end-to-end controller runs."""
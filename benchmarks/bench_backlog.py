@@ -0,0 +1,106 @@
+"""
+Batched versus one-by-one device commands against the Tasmota emulators.
+
+Every tick sets --channels channels to new values and reads --reads fields back, as one batch() call
+and, with --queued, as concurrent commands merged by the I/O worker. Reports round-trips and latency
+per tick for: one command per exchange, a batch (Backlog0 over serial, concurrent pooled requests over
+HTTP, pipelined publishes over MQTT), and firmware without Backlog0 (fallback).
+Linux/macOS only (needs a pseudo-terminal).
+
+Run: uv run python -m benchmarks.bench_backlog --ticks 200 --channels 4 --transport serial
+"""
+
+import argparse
+import asyncio
+import time
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--ticks", type=int, default=200, help="ticks per scenario")
+    parser.add_argument("--channels", type=int, default=4, help="channels set every tick")
+    parser.add_argument("--reads", type=int, default=1, help="fields read every tick (Dimmer, then channels)")
+    parser.add_argument("--latency", type=float, default=0.005, help="emulated device response latency")
+    parser.add_argument("--jitter", type=float, default=0.002, help="emulated device response jitter")
+    parser.add_argument("--noise", type=float, default=0.2, help="probability of a device log line per command")
+    parser.add_argument("--transport", choices=("serial", "http", "mqtt"), default="serial", help="device link")
+    parser.add_argument("--queued", action="store_true", help="submit concurrently through the I/O worker")
+    return parser.parse_args()
+
+
+def tick_fields(args, tick: int) -> dict:
+    fields = {f"Channel{_ + 1}": (tick * 7 + _ * 13) % 101 for _ in range(args.channels)}
+    for name in (["Dimmer"] + [f"Channel{_ + 1}" for _ in range(args.channels, 16)])[: args.reads]:
+        fields.setdefault(name, None)
+    return fields
+
+
+async def run_scenario(args, backlog_firmware: bool, backlog: bool) -> tuple[list[float], int, int]:
+    from iets_speed_control.entities.tasmota_device import TasmotaDevice
+
+    from .bench_controller import create_emulator
+
+    with create_emulator(
+        args.transport,
+        latency=args.latency,
+        jitter=args.jitter,
+        noise=args.noise,
+        channels=16,
+        backlog=backlog_firmware,
+    ) as emulator:
+        device = TasmotaDevice(port=emulator.port, timeout=0.1 if args.transport == "serial" else None, deadline=1.0)
+        if not backlog:
+            device.backlog = False
+        await device.connect()
+        if args.queued:
+            device.start_worker()
+
+        latencies, failures = [], 0
+        emulator.reset_stats()
+        for tick in range(args.ticks):
+            fields = tick_fields(args, tick)
+            started = time.perf_counter()
+            if args.queued:
+                values = await asyncio.gather(
+                    *(
+                        device.read_field_value(field) if value is None else device.set_field_value(field, value)
+                        for field, value in fields.items()
+                    )
+                )
+                values = dict(zip(fields, values))
+            else:
+                values = await device.batch(fields)
+            latencies.append(time.perf_counter() - started)
+            failures += sum(
+                1 for field, value in fields.items() if values.get(field) is None or value not in (None, values[field])
+            )
+
+        exchanges = emulator.exchanges
+        await device.stop_worker()
+        await device.disconnect()
+    return latencies, exchanges, failures
+
+
+async def run(args):
+    from .bench_controller import percentiles
+
+    scenarios = (
+        ("one by one", True, False),
+        ("batched", True, True),
+        ("no firmware support", False, True),
+    )
+    mode = "queued" if args.queued else "batch()"
+    print(f"{args.ticks} ticks, {args.channels} sets + {args.reads} reads per tick, {mode}, {args.transport}")
+    for name, backlog_firmware, backlog in scenarios:
+        latencies, exchanges, failures = await run_scenario(args, backlog_firmware, backlog)
+        print(
+            f"{name:20}  round-trips {exchanges / args.ticks:5.2f}/tick | {percentiles(latencies)} | {failures} wrong"
+        )
+
+
+def main():
+    asyncio.run(run(parse_args()))
+
+
+if __name__ == "__main__":
+    main()
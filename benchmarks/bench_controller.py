@@ -0,0 +1,137 @@
+"""
+End-to-end SpeedController benchmark against the pty Tasmota emulator and scripted sensors.
+
+Reports tick latency percentiles, device round-trips per tick, temperature-to-PWM reaction time
+and CPU time per tick. --transport http/mqtt runs against the network emulators instead of the pty one.
+Linux/macOS only (needs a pseudo-terminal).
+
+Run: uv run python -m benchmarks.bench_controller --seconds 10 --delay 0.1 --transport serial
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import time
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--seconds", type=float, default=10.0, help="benchmark duration")
+    parser.add_argument("--delay", type=float, default=0.1, help="DELAY between ticks")
+    parser.add_argument("--step-at", type=float, default=3.0, help="when the synthetic load starts, seconds")
+    parser.add_argument("--latency", type=float, default=0.005, help="emulated device response latency")
+    parser.add_argument("--jitter", type=float, default=0.002, help="emulated device response jitter")
+    parser.add_argument("--noise", type=float, default=0.2, help="probability of a device log line per command")
+    parser.add_argument("--transport", choices=("serial", "http", "mqtt"), default="serial", help="device link")
+    parser.add_argument("--sensor-latency", type=float, default=0.002, help="emulated WMI latency")
+    parser.add_argument(
+        "--env", action="append", default=[], metavar="KEY=VALUE", help="extra settings, e.g. SHADOW_STATE=1"
+    )
+    return parser.parse_args()
+
+
+def configure_env(args):
+    """Settings are loaded from the environment on first use, so they are set before the controller is built."""
+    os.environ["DELAY"] = str(args.delay)
+    os.environ.setdefault("SERIAL_TIMEOUT", "0.1")
+    for item in args.env:
+        key, _, value = item.partition("=")
+        os.environ[key] = value
+
+
+def percentiles(values: list[float]) -> str:
+    if len(values) < 2:
+        return "n/a"
+    q = statistics.quantiles(values, n=100, method="inclusive")
+    return (
+        f"p50 {q[49] * 1e3:7.2f} ms | p90 {q[89] * 1e3:7.2f} ms | "
+        f"p99 {q[98] * 1e3:7.2f} ms | max {max(values) * 1e3:7.2f} ms"
+    )
+
+
+def create_emulator(transport: str, **kwargs):
+    """Emulated Tasmota device for a transport; its .port is what DEFAULT_PORT would be."""
+    if transport == "http":
+        from .tasmota_network import TasmotaHttpServer
+
+        return TasmotaHttpServer(**kwargs)
+    if transport == "mqtt":
+        from .tasmota_network import TasmotaMqttBroker
+
+        return TasmotaMqttBroker(**kwargs)
+
+    from .tasmota_emulator import TasmotaEmulator
+
+    return TasmotaEmulator(**kwargs)
+
+
+async def run(args):
+    from iets_speed_control.controller import SpeedController
+    from iets_speed_control.util.devices import DeviceConfig
+
+    from .synthetic_sensors import ScriptedSensorReader, step_profile
+
+    profile = step_profile(step_at=args.step_at)
+    with create_emulator(args.transport, latency=args.latency, jitter=args.jitter, noise=args.noise) as emulator:
+        sensors = ScriptedSensorReader(profile, latency=args.sensor_latency)
+        controller = SpeedController(
+            DeviceConfig(name="bench", port=emulator.port, device_name="", device_serial=""), sensors=sensors
+        )
+
+        # Tick work time: from the end of one scheduler wait to the start of the next
+        tick_times: list[float] = []
+        scheduler_wait = controller.scheduler.wait
+        tick_started = None
+
+        async def timed_wait():
+            nonlocal tick_started
+            if tick_started is not None:
+                tick_times.append(time.perf_counter() - tick_started)
+            overrun = await scheduler_wait()
+            tick_started = time.perf_counter()
+            return overrun
+
+        controller.scheduler.wait = timed_wait
+
+        cpu_started = time.process_time()
+        await controller.start()
+        await asyncio.sleep(args.seconds)
+        await controller.stop()
+        cpu_time = time.process_time() - cpu_started
+        await controller.shutdown()
+
+    ticks = len(tick_times)
+    if not ticks:
+        raise SystemExit("No ticks completed - is the emulator reachable?")
+
+    # the emulator thread runs in this process; its CPU time is not the controller's
+    cpu_time -= emulator.thread_cpu_time
+    target = controller.curve(round(profile(args.step_at + 1)[0]))
+    step_time = (sensors.started or 0) + args.step_at
+    reacted = [t for t, _, value in emulator.writes if t >= step_time and value >= target]
+
+    print(
+        f"ticks:                {ticks} in {args.seconds:.1f}s "
+        f"(DELAY {args.delay}s, {controller.scheduler.overruns} overruns)"
+    )
+    print(f"tick latency:         {percentiles(tick_times)}")
+    print(
+        f"{args.transport + ' round-trips:':22}{emulator.exchanges / ticks:.2f} per tick ({emulator.exchanges} total)"
+    )
+    print(f"dimmer writes:        {len(emulator.writes)}")
+    if reacted:
+        print(f"reaction time:        {(reacted[0] - step_time) * 1e3:.1f} ms to reach PWM {target}")
+    else:
+        print(f"reaction time:        PWM {target} not reached")
+    print(f"CPU time per tick:    {cpu_time / ticks * 1e3:.3f} ms")
+
+
+def main():
+    args = parse_args()
+    configure_env(args)
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""
+Microbenchmark: FanCurve lookup table vs calculate_dimmer_value(), and the per-tick cost of a
+CurveSet (SENSOR_CURVES) over a growing number of sensors: numpy pass, list pass and per-group loop.
+
+Run: uv run python benchmarks/bench_fan_curve.py --sensors 8 32 128
+"""
+
+import argparse
+import timeit
+
+from iets_speed_control.util.fan_curve import CurveSet, FanCurve
+from iets_speed_control.util.tools import calculate_dimmer_value
+
+TEMP_RANGES = "(55, 64, 20, 49), (65, 68, 50, 50), (69, 79, 51, 64), (80, 89, 65, 74), (90, 100, 75, 100)"
+TEMPERATURES = list(range(20, 111))
+GROUPS = ("CPU", "GPU", "GPU Hot Spot", "VRM", "NVMe", "Chipset", "DIMM", "PSU")
+
+
+def sensor_reading(count: int) -> dict:
+    """count labels spread over GROUPS, with temperatures across the curve range."""
+    return {f"{GROUPS[_ % len(GROUPS)]} #{_}": 30.0 + (_ * 7.3) % 80 for _ in range(count)}
+
+
+def per_group_loop(curves: CurveSet, sensors: dict) -> int:
+    """The controller's CPU/GPU approach extended to every group: filter the labels, max, curve."""
+    targets = []
+    for group in curves.groups:
+        temperatures = [int(value) for label, value in sensors.items() if group.label_filter in label]
+        if temperatures:
+            targets.append(group.curve(max(temperatures)))
+    return max(targets)
+
+
+def bench_curve_set(args, curve: FanCurve):
+    spec = "; ".join(f"{_}: (40, 90, 20, 100)" for _ in GROUPS[2:])
+    vectorized = CurveSet.parse(spec, curve, GROUPS[:2])
+    listed = CurveSet.parse(spec, curve, GROUPS[:2])
+    listed._np = None  # the fallback without numpy
+    print(f"\nCurveSet, {len(GROUPS)} groups (numpy {'on' if vectorized._np else 'missing'}):")
+    print(f"{'sensors':>8} {'numpy':>10} {'list':>10} {'per group':>10}  us/tick")
+    for count in args.sensors:
+        sensors = sensor_reading(count)
+        if not vectorized(sensors) == listed(sensors) == per_group_loop(vectorized, sensors):
+            raise SystemExit(f"CurveSet results differ for {count} sensors")
+        timings = [
+            timeit.timeit(lambda: evaluate(sensors), number=args.ticks) / args.ticks * 1e6
+            for evaluate in (vectorized, listed, lambda _: per_group_loop(vectorized, _))
+        ]
+        print(f"{count:8d} {timings[0]:10.2f} {timings[1]:10.2f} {timings[2]:10.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--number", type=int, default=200, help="passes over the temperature sweep")
+    parser.add_argument("--ranges", default=TEMP_RANGES, help="TEMP_RANGES string to benchmark")
+    parser.add_argument("--sensors", type=int, nargs="*", default=[8, 32, 128], help="sensor counts for CurveSet")
+    parser.add_argument("--ticks", type=int, default=2000, help="CurveSet evaluations per sensor count")
+    args = parser.parse_args()
+
+    curve = FanCurve.parse(args.ranges)
+    mismatches = [_ for _ in TEMPERATURES if curve(_) != calculate_dimmer_value(_, args.ranges)]
+    if mismatches:
+        raise SystemExit(f"FanCurve differs from calculate_dimmer_value at {mismatches}")
+
+    calls = args.number * len(TEMPERATURES)
+    baseline = timeit.timeit(lambda: [calculate_dimmer_value(_, args.ranges) for _ in TEMPERATURES], number=args.number)
+    compiled = timeit.timeit(lambda: [curve(_) for _ in TEMPERATURES], number=args.number)
+
+    print(f"calculate_dimmer_value: {baseline / calls * 1e6:8.3f} us/call")
+    print(f"FanCurve:               {compiled / calls * 1e6:8.3f} us/call")
+    print(f"speedup:                {baseline / compiled:8.1f}x")
+    bench_curve_set(args, curve)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""
+Startup import budget.
+
+Runs `python -X importtime -c "import <module>"` in fresh interpreters, reports the best cumulative
+import time and the heaviest imports, and fails when the time is over the budget, when importing
+loads the settings (.env) or when it pulls in a module that should only be loaded on demand.
+
+Run: uv run python -m benchmarks.bench_import --budget-ms 150
+"""
+
+import argparse
+import re
+import subprocess
+import sys
+
+LINE_RE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|(\s*)(\S+)")
+
+# loaded only when a port is opened, sensors are read, the tray is shown or data is analyzed
+LAZY_MODULES = ("dotenv", "serial", "aioserial", "wmi", "pythoncom", "customtkinter", "pystray", "PIL", "numpy")
+
+CHECK = """
+import sys, {module}
+from iets_speed_control.util import env
+loaded = sorted(_ for _ in {lazy!r} if _ in sys.modules)
+print("LAZY", ",".join(loaded))
+print("SETTINGS", env._settings is not None)
+"""
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--module", default="iets_speed_control.entrypoints.cli", help="module to import")
+    parser.add_argument("--budget-ms", type=float, default=150.0, help="maximum cumulative import time")
+    parser.add_argument("--runs", type=int, default=5, help="fresh interpreters; the fastest run counts")
+    parser.add_argument("--top", type=int, default=10, help="number of heaviest imports to print")
+    return parser.parse_args()
+
+
+def import_times(module: str) -> dict[str, tuple[int, int]]:
+    """{module: (self us, cumulative us)} of one fresh interpreter."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        text=True,
+    )
+    if result.returncode:
+        raise SystemExit(result.stderr)
+    times = {}
+    for match in LINE_RE.finditer(result.stderr):
+        times[match.group(4)] = (int(match.group(1)), int(match.group(2)))
+    return times
+
+
+def main():
+    args = parse_args()
+    runs = [import_times(args.module) for _ in range(args.runs)]
+    best = min(runs, key=lambda _: _[args.module][1])
+    total_ms = best[args.module][1] / 1e3
+
+    print(f"import {args.module}: {total_ms:.1f} ms (best of {args.runs}, budget {args.budget_ms:.0f} ms)")
+    print("heaviest imports (cumulative):")
+    own = sorted(
+        ((name, cumulative) for name, (_, cumulative) in best.items() if name != args.module),
+        key=lambda _: -_[1],
+    )
+    for name, cumulative in own[: args.top]:
+        print(f"  {cumulative / 1e3:7.1f} ms  {name}")
+
+    check = subprocess.run(
+        [sys.executable, "-c", CHECK.format(module=args.module, lazy=LAZY_MODULES)], capture_output=True, text=True
+    )
+    output = dict(_.split(" ", 1) if " " in _ else (_, "") for _ in check.stdout.splitlines())
+    lazy, settings = output.get("LAZY", ""), output.get("SETTINGS")
+
+    failures = []
+    if total_ms > args.budget_ms:
+        failures.append(f"import time {total_ms:.1f} ms is over the {args.budget_ms:.0f} ms budget")
+    if lazy:
+        failures.append(f"imported on startup: {lazy}")
+    if settings != "False":
+        failures.append("settings were loaded on import" if settings else f"check failed: {check.stderr.strip()}")
+
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    if failures:
+        raise SystemExit(1)
+    print("OK")
+
+
+if __name__ == "__main__":
+    main()
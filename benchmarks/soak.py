@@ -0,0 +1,439 @@
+"""
+Soak test: SpeedController over a long run against stand-in sensors and device, with injected faults.
+
+Samples RSS, tracemalloc, open file descriptors, threads and asyncio tasks. After --warmup ticks the first
+sample is the baseline; the run fails (exit code 1) when any of them grows past its budget, and reports
+the top allocators by growth since the baseline.
+
+--transport memory (default) runs on a compressed clock: the event loop jumps to the next timer whenever
+nothing is ready, so a million ticks take minutes. The device is an in-process transport to the emulated
+Tasmota, and the faults are connection resets, refused reopens, silent stretches and stale sensors.
+--transport serial|http|mqtt runs the real transport against its emulator on the real clock; the faults
+close the port or drop the connections, so every reconnect reopens the real handles.
+
+GUI actions (mode, manual speed, stop/start) are submitted from a thread with run_coroutine_threadsafe,
+like the tray app does, and a status subscriber is attached like the GUI's.
+
+Run: uv run python -m benchmarks.soak --ticks 1000000
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+import queue
+import random
+import sys
+import threading
+import time
+import tracemalloc
+from typing import NamedTuple, Optional
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--ticks", type=int, default=1_000_000, help="control loop ticks to run")
+    parser.add_argument("--transport", choices=("memory", "serial", "http", "mqtt"), default="memory")
+    parser.add_argument("--delay", type=float, default=None, help="DELAY; default 1.0 (memory) or 0.01")
+    parser.add_argument("--warmup", type=int, default=None, help="ticks before the baseline; default 5%%")
+    parser.add_argument("--sample-every", type=int, default=None, help="ticks between samples; default 1%%")
+    parser.add_argument("--fault-every", type=int, default=5000, help="mean ticks between injected faults")
+    parser.add_argument("--action-every", type=int, default=1000, help="ticks between GUI actions")
+    parser.add_argument("--latency", type=float, default=0.005, help="emulated device response latency")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--rss-budget", type=float, default=16.0, help="RSS growth budget, MiB")
+    parser.add_argument("--traced-budget", type=float, default=4.0, help="tracemalloc growth budget, MiB")
+    parser.add_argument("--fd-budget", type=int, default=4, help="open file descriptor growth budget")
+    parser.add_argument("--thread-budget", type=int, default=2, help="thread count growth budget")
+    parser.add_argument("--task-budget", type=int, default=3, help="asyncio task count growth budget")
+    parser.add_argument("--no-tracemalloc", action="store_true", help="skip tracemalloc (about 5x faster)")
+    parser.add_argument("--top", type=int, default=10, help="allocators to report")
+    parser.add_argument("--log-level", default="WARNING", help="root log level during the run")
+    parser.add_argument(
+        "--env", action="append", default=[], metavar="KEY=VALUE", help="extra settings, e.g. SHADOW_STATE=1"
+    )
+    args = parser.parse_args()
+    if args.delay is None:
+        args.delay = 1.0 if args.transport == "memory" else 0.01
+    if args.warmup is None:
+        args.warmup = max(args.ticks // 20, 1)
+    if args.sample_every is None:
+        args.sample_every = max(args.ticks // 100, 1)
+    return args
+
+
+class VirtualClockLoop(asyncio.SelectorEventLoop):
+    """
+    Event loop with a compressed clock: whenever no callback is ready, time jumps to the next timer.
+
+    Sleeps and timeouts cost nothing, so only stand-ins that never wait on real I/O or threads belong
+    on it; a real transport would see its deadlines pass before the data arrives.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self._now = 0.0
+
+    def time(self) -> float:
+        return self._now
+
+    def _run_once(self):
+        # the heap top is the earliest timer, so jumping to it never skips one
+        if not self._ready and self._scheduled and self._scheduled[0].when() > self._now:
+            self._now = self._scheduled[0].when()
+        super()._run_once()
+
+
+def _memory_transport_class():
+    from iets_speed_control.entities.transport import Transport, TransportError, result_field, unknown_command
+
+    class EmulatedTransport(Transport):
+        """In-process transport to a TasmotaEmulator device model with injectable faults; no I/O at all."""
+
+        name = "memory"
+
+        def __init__(self, emulator, latency: float):
+            super().__init__("memory://tasmota")
+            self.emulator = emulator
+            self.latency = latency
+            self.is_open = False
+            self.opens = 0
+            self.reset_next = False  # the next exchange fails like a dropped link
+            self.refuse_opens = 0  # opens that fail like an unplugged device
+            self.silent_until = 0.0  # loop time until which the device does not answer
+
+        async def open(self):
+            await asyncio.sleep(self.latency)
+            if self.refuse_opens:
+                self.refuse_opens -= 1
+                raise OSError("injected: device not present")
+            self.is_open = True
+            self.opens += 1
+
+        def abort(self):
+            self.is_open = False
+
+        def _result(self, command: str, field_names: tuple) -> dict:
+            result = self.emulator.execute(command)
+            if unknown_command(result):
+                return {}
+            return {_: result if result_field(result, _) is not None else None for _ in field_names}
+
+        async def _answer(self, deadline: float) -> bool:
+            if not self.is_open:
+                raise TransportError("port is closed")
+            if self.reset_next:
+                self.reset_next = False
+                raise TransportError("injected: connection reset")
+            if asyncio.get_running_loop().time() < self.silent_until:
+                await asyncio.sleep(deadline)
+                return False
+            await asyncio.sleep(self.latency)
+            return True
+
+        async def exchange(self, command: str, field_names: tuple, deadline: float) -> dict:
+            if not await self._answer(deadline):
+                return dict.fromkeys(field_names)
+            return self._result(command, field_names)
+
+        async def exchange_batch(self, commands: dict, deadline: float) -> dict:
+            if not await self._answer(deadline):
+                return dict.fromkeys(commands)
+            return {field: self._result(command, (field,)).get(field) for field, command in commands.items()}
+
+    return EmulatedTransport
+
+
+class Sample(NamedTuple):
+    tick: int
+    rss: Optional[int]  # bytes
+    traced: Optional[int]  # bytes
+    fds: Optional[int]
+    threads: int
+    tasks: int
+
+
+def rss_bytes() -> Optional[int]:
+    """Current resident set size; None where it can't be read without extra packages."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except Exception:
+        return None
+
+
+def open_fds() -> Optional[int]:
+    for path in ("/proc/self/fd", "/dev/fd"):
+        try:
+            return len(os.listdir(path))
+        except Exception:
+            continue
+    return None
+
+
+def take_sample(tick: int) -> Sample:
+    return Sample(
+        tick,
+        rss_bytes(),
+        tracemalloc.get_traced_memory()[0] if tracemalloc.is_tracing() else None,
+        open_fds(),
+        threading.active_count(),
+        len(asyncio.all_tasks()),
+    )
+
+
+class GuiThread:
+    """Submits controller actions from a thread with run_coroutine_threadsafe, like the tray app."""
+
+    def __init__(self, loop: asyncio.AbstractEventLoop, controller):
+        self.loop = loop
+        self.controller = controller
+        self.actions = 0
+        self.failures = 0
+        self._requests: queue.SimpleQueue = queue.SimpleQueue()
+        self._thread = threading.Thread(target=self._run, name="soak-gui", daemon=True)
+        self._thread.start()
+
+    def request(self):
+        self._requests.put(self.actions)
+
+    def stop(self):
+        self._requests.put(None)
+        self._thread.join(timeout=10)
+
+    async def _action(self, n: int):
+        from iets_speed_control.controller import Mode
+
+        controller = self.controller
+        if n % 10 == 9:  # tray Stop, then Start
+            await controller.stop()
+            await controller.start()
+        elif n % 2:
+            controller.mode = Mode.MANUAL
+            controller.manual_speed = n * 37 % 101
+        else:
+            controller.mode = Mode.AUTO
+
+    def _run(self):
+        while (n := self._requests.get()) is not None:
+            future = asyncio.run_coroutine_threadsafe(self._action(n), self.loop)
+            try:
+                future.result(timeout=30)
+            except Exception as e:
+                self.failures += 1
+                logging.error("GUI action %s failed: %s", n, e)
+            self.actions += 1
+
+
+class Soak:
+    """Drives the controller tick by tick: faults, GUI actions and samples."""
+
+    def __init__(self, args, controller, emulator, transport, sensors, gui: GuiThread):
+        self.args = args
+        self.controller = controller
+        self.emulator = emulator
+        self.transport = transport
+        self.sensors = sensors
+        self.gui = gui
+        self.random = random.Random(args.seed)
+        self.ticks = 0
+        self.faults: dict[str, int] = {}
+        self.exchanges = 0
+        self.samples: list[Sample] = []
+        self.baseline: Optional[tracemalloc.Snapshot] = None
+        self.done = asyncio.Event()
+        self.started = time.perf_counter()
+        self._next_fault = self._fault_gap()
+        self._sensors_back_at: Optional[int] = None
+
+    def _fault_gap(self) -> int:
+        return self.ticks + max(1, int(self.random.uniform(0.5, 1.5) * self.args.fault_every))
+
+    def _inject(self):
+        transport, device = self.transport, self.controller.device
+        if self.args.transport == "memory":
+            fault = self.random.choice(("reset", "refuse", "silent", "sensors"))
+            if fault == "reset":
+                transport.reset_next = True
+            elif fault == "refuse":
+                transport.reset_next = True
+                transport.refuse_opens = self.random.randint(1, 4)
+            elif fault == "silent":
+                transport.silent_until = asyncio.get_running_loop().time() + self.random.uniform(1, 10)
+            else:
+                self.sensors.stale = True
+                self._sensors_back_at = self.ticks + self.random.randint(5, 50)
+        elif self.args.transport == "serial":
+            fault = "reopen"
+            device._lose("injected disconnect")
+        else:
+            fault = "drop"
+            self.emulator.drop_connections()
+        self.faults[fault] = self.faults.get(fault, 0) + 1
+
+    def on_tick(self):
+        self.ticks += 1
+        if self.ticks >= self._next_fault:
+            self._inject()
+            self._next_fault = self._fault_gap()
+        if self._sensors_back_at is not None and self.ticks >= self._sensors_back_at:
+            self.sensors.stale = False
+            self._sensors_back_at = None
+        if self.ticks % self.args.action_every == 0:
+            self.gui.request()
+        if self.ticks == self.args.warmup or self.ticks % self.args.sample_every == 0:
+            self._sample()
+        if self.ticks >= self.args.ticks:
+            self.done.set()
+
+    def _sample(self):
+        # the emulator keeps every write for the benchmarks; only the count matters here
+        self.exchanges += self.emulator.exchanges
+        self.emulator.reset_stats()
+        if self.ticks < self.args.warmup:
+            return
+        if self.ticks == self.args.warmup and tracemalloc.is_tracing():
+            self.baseline = tracemalloc.take_snapshot()
+        sample = take_sample(self.ticks)
+        self.samples.append(sample)
+        elapsed = time.perf_counter() - self.started
+        print(
+            f"tick {sample.tick:>9} | {sample.tick / elapsed:8.0f} ticks/s | rss {_mib(sample.rss)} | "
+            f"traced {_mib(sample.traced)} | fds {sample.fds} | threads {sample.threads} | tasks {sample.tasks}",
+            flush=True,
+        )
+
+
+def _mib(value: Optional[int]) -> str:
+    return "n/a" if value is None else f"{value / 2**20:7.2f} MiB"
+
+
+def check_budgets(args, samples: list[Sample]) -> list[str]:
+    """Rows of the budget table; a row ends with FAIL when the growth over the baseline exceeds its budget."""
+    baseline = samples[0]
+    budgets = (
+        ("rss", args.rss_budget * 2**20, _mib),
+        ("traced", args.traced_budget * 2**20, _mib),
+        ("fds", args.fd_budget, str),
+        ("threads", args.thread_budget, str),
+        ("tasks", args.task_budget, str),
+    )
+    rows = []
+    for name, budget, show in budgets:
+        start = getattr(baseline, name)
+        if start is None:
+            rows.append(f"{name:8} not available")
+            continue
+        growth = max(getattr(_, name) for _ in samples) - start
+        final = getattr(samples[-1], name)
+        verdict = "FAIL" if growth > budget else "ok"
+        rows.append(
+            f"{name:8} baseline {show(start):>12} | final {show(final):>12} | "
+            f"max growth {show(growth):>12} | budget {show(budget):>12} | {verdict}"
+        )
+    return rows
+
+
+def top_allocators(baseline: tracemalloc.Snapshot, top: int) -> list[str]:
+    ignore = [
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+    ]
+    snapshot = tracemalloc.take_snapshot().filter_traces(ignore)
+    stats = snapshot.compare_to(baseline.filter_traces(ignore), "lineno")
+    return [str(_) for _ in stats[:top]]
+
+
+async def run(args) -> bool:
+    from iets_speed_control.controller import SpeedController
+    from iets_speed_control.util.devices import DeviceConfig
+
+    from .bench_controller import create_emulator
+    from .synthetic_sensors import ScriptedSensorReader, sine_profile
+
+    if args.transport == "memory":
+        from .tasmota_emulator import TasmotaEmulator
+
+        emulator = TasmotaEmulator(latency=0, jitter=0, noise=0, seed=args.seed)  # a device model, never started
+    else:
+        emulator = create_emulator(args.transport, latency=args.latency, jitter=args.latency / 2, noise=0.1)
+        emulator.start()
+
+    sensors = ScriptedSensorReader(sine_profile(period=600 * args.delay), latency=args.latency / 2)
+    port = "soak" if args.transport == "memory" else emulator.port
+    controller = SpeedController(
+        DeviceConfig(name="soak", port=port, device_name="", device_serial=""), sensors=sensors
+    )
+    transport = controller.device.transport
+    if args.transport == "memory":
+        transport = _memory_transport_class()(emulator, args.latency)
+        transport.metrics = controller.device.metrics
+        controller.device.transport = transport
+
+    status_updates = 0
+
+    def on_status(_):
+        nonlocal status_updates
+        status_updates += 1
+
+    subscription = controller.publisher.subscribe(on_status, max_rate=4)
+    gui = GuiThread(asyncio.get_running_loop(), controller)
+    soak = Soak(args, controller, emulator, transport, sensors, gui)
+
+    scheduler_wait = controller.scheduler.wait
+
+    async def counted_wait():
+        soak.on_tick()
+        return await scheduler_wait()
+
+    controller.scheduler.wait = counted_wait
+    await controller.start()
+    await soak.done.wait()
+    await controller.shutdown()
+    gui.stop()
+    subscription.cancel()
+    if args.transport != "memory":
+        emulator.stop()
+
+    elapsed = time.perf_counter() - soak.started
+    print(f"\n{soak.ticks} ticks in {elapsed:.1f}s ({soak.ticks / elapsed:.0f} ticks/s), transport {args.transport}")
+    print(f"faults:        {', '.join(f'{k} {v}' for k, v in sorted(soak.faults.items())) or 'none'}")
+    print(f"reconnects:    {controller.metrics.snapshot().get('reconnects_total', 0)}")
+    print(f"exchanges:     {soak.exchanges}")
+    print(f"GUI actions:   {gui.actions} ({gui.failures} failed), status updates {status_updates}")
+    if not soak.samples:
+        print("No samples after the warm-up; raise --ticks or lower --warmup")
+        return False
+
+    rows = check_budgets(args, soak.samples)
+    print("\n" + "\n".join(rows))
+    if soak.baseline is not None:
+        print(f"\nTop {args.top} allocators by growth since the baseline:")
+        print("\n".join(top_allocators(soak.baseline, args.top)))
+    return not gui.failures and not any(_.endswith("FAIL") for _ in rows)
+
+
+def main():
+    args = parse_args()
+    from .bench_controller import configure_env
+
+    configure_env(args)
+    os.environ["TELEMETRY_FILE"] = ""
+    os.environ["METRICS_PORT"] = "0"
+
+    from iets_speed_control.util.logger import logger_setup
+
+    logger_setup()
+    logging.getLogger().setLevel(args.log_level.upper())
+
+    if not args.no_tracemalloc:
+        tracemalloc.start()
+    loop_factory = VirtualClockLoop if args.transport == "memory" else None
+    with asyncio.Runner(loop_factory=loop_factory) as runner:
+        passed = runner.run(run(args))
+    print("\nPASS" if passed else "\nFAIL")
+    sys.exit(0 if passed else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""Scripted stand-in for SensorReader, replaying a temperature profile over time."""
+
+import asyncio
+import math
+from typing import Callable, Optional
+
+# seconds since start -> (cpu temperature, gpu temperature)
+Profile = Callable[[float], tuple[float, float]]
+
+
+def step_profile(idle=50.0, load=85.0, step_at=2.0, gpu_offset=-5.0) -> Profile:
+    """Idle temperature that jumps to the load temperature at step_at seconds."""
+
+    def profile(elapsed: float):
+        cpu = load if elapsed >= step_at else idle
+        return cpu, cpu + gpu_offset
+
+    return profile
+
+
+def sine_profile(mean=70.0, amplitude=15.0, period=20.0, gpu_offset=-5.0) -> Profile:
+    """Slow periodic load."""
+
+    def profile(elapsed: float):
+        cpu = mean + amplitude * math.sin(2 * math.pi * elapsed / period)
+        return cpu, cpu + gpu_offset
+
+    return profile
+
+
+class ScriptedSensorReader:
+    """
+    Drop-in replacement for SensorReader.
+
+    Returns AIDA64-like labels whose values follow the profile, after latency seconds of simulated WMI time.
+    Set stale to simulate every sensor source going away.
+    extra_sensors are added to every reading, e.g. to feed a PID feed-forward filter.
+    """
+
+    def __init__(self, profile: Profile, latency=0.002, extra_sensors: Optional[dict] = None):
+        self.profile = profile
+        self.latency = latency
+        self.extra_sensors = extra_sensors or {}
+        self.reads = 0
+        self.stale = False
+        self._last: dict = {}
+        self._started: Optional[float] = None
+
+    @property
+    def started(self) -> Optional[float]:
+        """Loop time of the first read; profile time 0."""
+        return self._started
+
+    def add_filters(self, *filters: str):
+        pass
+
+    def labels(self, label_filter: str) -> tuple[str, ...]:
+        return tuple(_ for _ in self._last if label_filter in _)
+
+    async def read(self) -> dict:
+        loop = asyncio.get_running_loop()
+        if self._started is None:
+            self._started = loop.time()
+        if self.latency:
+            await asyncio.sleep(self.latency)
+
+        self.reads += 1
+        if self.stale:
+            return {}
+        cpu, gpu = self.profile(loop.time() - self._started)
+        self._last = {
+            "CPU Package": f"{cpu:.0f}",
+            "CPU Core #1": f"{cpu - 3:.0f}",
+            "GPU Diode": f"{gpu:.0f}",
+            "GPU Hotspot": f"{gpu + 8:.0f}",
+            "Motherboard": "40",
+            **self.extra_sensors,
+        }
+        return self._last
+
+    async def close(self):
+        pass
@@ -0,0 +1,199 @@
+"""
+Fake Tasmota device on a Linux pseudo-terminal.
+
+Answers "Dimmer" / "Dimmer N" (and "ChannelN" / "ChannelN M") like the Tasmota serial console:
+an echoed "CMD:" log line, optional unrelated log noise, then "RSL: RESULT = {...}".
+"Backlog0 cmd1; cmd2; ..." answers with one RESULT line per command, unless backlog is off (older firmware).
+
+Run standalone: python -m benchmarks.tasmota_emulator --latency 0.005
+"""
+
+import argparse
+import json
+import os
+import random
+import re
+import select
+import threading
+import time
+import tty
+from datetime import datetime
+from typing import Optional
+
+COMMAND_RE = re.compile(r"^(Dimmer|Channel(\d+))(?:\s+(\d+))?$", re.IGNORECASE)
+
+
+class TasmotaEmulator:
+    """
+    Serves Tasmota-like responses on the slave side of a pty; connect a Dimmer or SerialDevice to .port.
+
+    latency: seconds before the response is written, plus up to jitter seconds of random extra delay.
+    noise: probability of an unrelated log line (telemetry, wifi, ...) before each response.
+    Latency is paid once per command line, so a Backlog costs one serial turnaround.
+    """
+
+    def __init__(self, latency=0.005, jitter=0.002, noise=0.2, channels=4, seed: Optional[int] = None, backlog=True):
+        self.latency = latency
+        self.backlog = backlog
+        self.jitter = jitter
+        self.noise = noise
+        self.values = {f"Channel{_ + 1}": 0 for _ in range(channels)}
+        self.power = "OFF"
+        self._random = random.Random(seed)
+
+        self.commands = 0
+        self.exchanges = 0  # command lines received, i.e. serial round-trips
+        self.writes: list[tuple[float, str, int]] = []  # (time.monotonic(), field, value)
+        self.thread_cpu_time = 0.0
+
+        self._master: Optional[int] = None
+        self._slave: Optional[int] = None
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+
+    @property
+    def port(self) -> str:
+        if self._slave is None:
+            raise RuntimeError("Emulator is not started")
+        return os.ttyname(self._slave)
+
+    @property
+    def dimmer(self) -> int:
+        return self.values["Channel1"]
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+
+    def start(self):
+        self._master, self._slave = os.openpty()
+        tty.setraw(self._slave)
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._serve, name="tasmota-emulator", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=2)
+            self._thread = None
+        for fd in (self._master, self._slave):
+            if fd is not None:
+                os.close(fd)
+        self._master = self._slave = None
+
+    def reset_stats(self):
+        with self._lock:
+            self.commands = 0
+            self.exchanges = 0
+            self.writes.clear()
+
+    def set_external_value(self, field: str, value: int):
+        """Change a value behind the controller's back, like the Tasmota web UI would."""
+        with self._lock:
+            self._set(field, value)
+
+    @staticmethod
+    def _timestamp() -> str:
+        return datetime.now().strftime("%H:%M:%S.%f")[:-3]
+
+    def _set(self, field: str, value: int):
+        value = max(0, min(100, value))
+        if field.lower() == "dimmer":
+            for key in self.values:
+                self.values[key] = value
+        else:
+            self.values[field] = value
+        self.power = "ON" if any(self.values.values()) else "OFF"
+
+    def _result(self, field: str) -> dict:
+        if field.lower() == "dimmer":
+            return {"POWER": self.power, "Dimmer": self.dimmer}
+        return {"POWER": self.power, field: self.values[field]}
+
+    def handle(self, command: str) -> list[str]:
+        """Response lines for one command line."""
+        lines = [f"{self._timestamp()} CMD: {command}"]
+        if self.noise and self._random.random() < self.noise:
+            lines.append(
+                f"{self._timestamp()} MQT: tele/tasmota/STATE = " + json.dumps({"Heap": 27, "Wifi": {"RSSI": 80}})
+            )
+
+        name, _, rest = command.strip().partition(" ")
+        if self.backlog and name.lower() in ("backlog", "backlog0"):
+            commands = [_.strip() for _ in rest.split(";") if _.strip()]
+        else:
+            commands = [command]
+        with self._lock:
+            self.exchanges += 1
+            for item in commands:
+                result = self._execute(item)
+                lines.append(f"{self._timestamp()} RSL: RESULT = {json.dumps(result, separators=(',', ':'))}")
+        return lines
+
+    def execute(self, command: str) -> dict:
+        """RESULT of one command arriving on its own, as over HTTP or MQTT; counts as one exchange."""
+        with self._lock:
+            self.exchanges += 1
+            return self._execute(command)
+
+    def _execute(self, command: str) -> dict:
+        match = COMMAND_RE.match(command.strip())
+        self.commands += 1
+        if not match:
+            return {"Command": "Unknown"}
+
+        field = match.group(1).capitalize() if not match.group(2) else f"Channel{match.group(2)}"
+        if field not in self.values and field != "Dimmer":
+            return {"Command": "Error"}
+        if match.group(3) is not None:
+            self._set(field, int(match.group(3)))
+            self.writes.append((time.monotonic(), field, int(match.group(3))))
+        return self._result(field)
+
+    def _serve(self):
+        buffer = b""
+        while not self._stop.is_set():
+            ready, _, _ = select.select([self._master], [], [], 0.05)
+            if not ready:
+                continue
+            try:
+                buffer += os.read(self._master, 4096)
+            except OSError:
+                break
+
+            while b"\n" in buffer:
+                line, buffer = buffer.split(b"\n", 1)
+                command = line.decode(errors="replace").strip()
+                if not command:
+                    continue
+                delay = self.latency + self._random.uniform(0, self.jitter)
+                if delay:
+                    time.sleep(delay)
+                os.write(self._master, "".join(_ + "\r\n" for _ in self.handle(command)).encode())
+
+        self.thread_cpu_time = time.thread_time()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--latency", type=float, default=0.005)
+    parser.add_argument("--jitter", type=float, default=0.002)
+    parser.add_argument("--noise", type=float, default=0.2)
+    args = parser.parse_args()
+
+    with TasmotaEmulator(latency=args.latency, jitter=args.jitter, noise=args.noise) as emulator:
+        print(f"Tasmota emulator listening on {emulator.port}, Ctrl+C to stop")
+        try:
+            while True:
+                time.sleep(1)
+        except KeyboardInterrupt:
+            pass
+
+
+if __name__ == "__main__":
+    main()
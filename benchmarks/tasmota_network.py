@@ -0,0 +1,261 @@
+"""
+Fake Tasmota device on the network: the web API (GET /cm?cmnd=...) and an MQTT broker with the device built in.
+
+Both keep the TasmotaEmulator device model (values, writes, exchanges, latency), so benchmarks and manual
+checks can point a Dimmer at .port, an http:// or mqtt:// URL, instead of a pty. Each serves from its own
+thread and event loop; drop_connections() cuts every client off, like a Wi-Fi drop.
+
+Run standalone: python -m benchmarks.tasmota_network --transport mqtt --latency 0.005
+"""
+
+import argparse
+import asyncio
+import json
+import threading
+import time
+from typing import Optional
+from urllib.parse import parse_qs, urlsplit
+
+from iets_speed_control.entities.mqtt_transport import (
+    CONNACK,
+    CONNECT,
+    DISCONNECT,
+    PINGREQ,
+    PINGRESP,
+    PUBLISH,
+    SUBACK,
+    SUBSCRIBE,
+    encode_packet,
+    parse_publish,
+    publish_packet,
+    read_packet,
+)
+
+from .tasmota_emulator import TasmotaEmulator
+
+
+class _NetworkEmulator(TasmotaEmulator):
+    """TasmotaEmulator served over TCP on 127.0.0.1 from a background event loop."""
+
+    scheme = ""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.host = "127.0.0.1"
+        self.tcp_port: Optional[int] = None
+        self.connections = 0  # TCP connections accepted
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._ready = threading.Event()
+        self._writers: set[asyncio.StreamWriter] = set()
+
+    @property
+    def url(self) -> str:
+        if self.tcp_port is None:
+            raise RuntimeError("Emulator is not started")
+        return f"{self.scheme}://{self.host}:{self.tcp_port}"
+
+    @property
+    def port(self) -> str:
+        return self.url
+
+    def start(self):
+        self._ready.clear()
+        self._thread = threading.Thread(target=self._run, name=f"tasmota-{self.scheme}", daemon=True)
+        self._thread.start()
+        if not self._ready.wait(5):
+            raise RuntimeError(f"{self.scheme} emulator did not start")
+
+    def stop(self):
+        if self._loop and self._thread:
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._thread.join(timeout=2)
+        self._thread = None
+        self.tcp_port = None
+
+    def drop_connections(self):
+        """Close every client connection at once."""
+        if self._loop:
+            self._loop.call_soon_threadsafe(lambda: [_.close() for _ in list(self._writers)])
+
+    def _run(self):
+        self._loop = loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        server = loop.run_until_complete(asyncio.start_server(self._accept, self.host, 0))
+        self.tcp_port = server.sockets[0].getsockname()[1]
+        self._ready.set()
+        try:
+            loop.run_forever()
+        finally:
+            server.close()
+            for writer in self._writers:
+                writer.close()
+            tasks = asyncio.all_tasks(loop)
+            for task in tasks:
+                task.cancel()
+            loop.run_until_complete(asyncio.gather(*tasks, return_exceptions=True))
+            loop.close()
+            self.thread_cpu_time = time.thread_time()
+
+    async def _accept(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.connections += 1
+        self._writers.add(writer)
+        try:
+            await self._serve_client(reader, writer)
+        except asyncio.CancelledError:  # the emulator stops
+            pass
+        except Exception:  # the client went away
+            pass
+        finally:
+            self._writers.discard(writer)
+            writer.close()
+
+    async def _serve_client(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        raise NotImplementedError
+
+    def _delay(self) -> float:
+        return self.latency + self._random.uniform(0, self.jitter)
+
+
+class TasmotaHttpServer(_NetworkEmulator):
+    """
+    Tasmota web API: GET /cm?cmnd=<command>[&user=..&password=..] answers the RESULT JSON.
+
+    keep_alive=False closes the connection after every response, like stock Tasmota firmware does;
+    with credentials set, requests without the matching user and password get 401.
+    """
+
+    scheme = "http"
+
+    def __init__(self, *args, keep_alive=True, credentials: Optional[tuple[str, str]] = None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.keep_alive = keep_alive
+        self.credentials = credentials
+
+    @property
+    def url(self) -> str:
+        url = super().url
+        if self.credentials:
+            return url.replace("://", f"://{self.credentials[0]}:{self.credentials[1]}@", 1)
+        return url
+
+    async def _serve_client(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        while request_line := await reader.readline():
+            while (await reader.readline()) not in (b"\r\n", b"\n", b""):
+                pass
+            _, target, *_ = request_line.decode("latin-1").split(" ")
+            parts = urlsplit(target)
+            query = {key: values[0] for key, values in parse_qs(parts.query).items()}
+
+            await asyncio.sleep(self._delay())
+            if parts.path != "/cm":
+                status, result = "404 Not Found", {"Error": "Not found"}
+            elif self.credentials and (query.get("user"), query.get("password")) != self.credentials:
+                status, result = "401 Unauthorized", {"WARNING": "Need user=<username>&password=<password>"}
+            else:
+                status, result = "200 OK", self.execute(query.get("cmnd", ""))
+
+            body = json.dumps(result, separators=(",", ":")).encode()
+            writer.write(
+                f"HTTP/1.1 {status}\r\nContent-Type: application/json\r\nContent-Length: {len(body)}\r\n"
+                f"Connection: {'keep-alive' if self.keep_alive else 'close'}\r\n\r\n".encode()
+                + body
+            )
+            await writer.drain()
+            if not self.keep_alive:
+                return
+
+
+class TasmotaMqttBroker(_NetworkEmulator):
+    """
+    Minimal MQTT 3.1.1 broker (QoS 0, exact and '#' topic filters) with a Tasmota device on topic.
+
+    The device takes cmnd/<topic>/<Command> publishes in order and answers each on stat/<topic>/RESULT
+    after the emulated latency; commands published back to back overlap their latency, like pipelined
+    requests over a real network.
+    """
+
+    scheme = "mqtt"
+
+    def __init__(self, *args, topic="tasmota", **kwargs):
+        super().__init__(*args, **kwargs)
+        self.topic = topic
+        self._subscriptions: dict[asyncio.StreamWriter, set[str]] = {}
+        self._commands: Optional[asyncio.Queue] = None
+        self._device_task: Optional[asyncio.Task] = None
+        self._due = 0.0
+
+    @property
+    def url(self) -> str:
+        return f"{super().url}/{self.topic}"
+
+    def _deliver(self, topic: str, payload: str):
+        packet = publish_packet(topic, payload)
+        for writer, filters in list(self._subscriptions.items()):
+            if any(_ == topic or (_.endswith("#") and topic.startswith(_[:-1])) for _ in filters):
+                writer.write(packet)
+
+    async def _device(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            due, command = await self._commands.get()
+            await asyncio.sleep(max(0.0, due - loop.time()))
+            result = self.execute(command)
+            self._deliver(f"stat/{self.topic}/RESULT", json.dumps(result, separators=(",", ":")))
+
+    def _on_command(self, topic: str, payload: bytes):
+        prefix = f"cmnd/{self.topic}/"
+        if not topic.startswith(prefix):
+            return
+        if self._commands is None:
+            self._commands = asyncio.Queue()
+            self._device_task = asyncio.create_task(self._device())
+        # in order: a command is never answered before the one published ahead of it
+        self._due = max(self._due, asyncio.get_running_loop().time() + self._delay())
+        self._commands.put_nowait((self._due, f"{topic[len(prefix) :]} {payload.decode(errors='replace')}".strip()))
+
+    async def _serve_client(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self._subscriptions[writer] = set()
+        try:
+            while True:
+                packet_type, flags, body = await read_packet(reader)
+                if packet_type == CONNECT:
+                    writer.write(encode_packet(CONNACK, b"\0\0"))
+                elif packet_type == SUBSCRIBE:
+                    packet_id, offset, granted = body[:2], 2, b""
+                    while offset < len(body):
+                        length = int.from_bytes(body[offset : offset + 2], "big")
+                        self._subscriptions[writer].add(body[offset + 2 : offset + 2 + length].decode())
+                        offset += 3 + length
+                        granted += b"\0"
+                    writer.write(encode_packet(SUBACK, packet_id + granted))
+                elif packet_type == PUBLISH:
+                    topic, payload = parse_publish(flags, body)
+                    self._on_command(topic, payload)
+                    self._deliver(topic, payload.decode(errors="replace"))
+                elif packet_type == PINGREQ:
+                    writer.write(encode_packet(PINGRESP))
+                elif packet_type == DISCONNECT:
+                    return
+        finally:
+            self._subscriptions.pop(writer, None)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--transport", choices=("http", "mqtt"), default="http")
+    parser.add_argument("--latency", type=float, default=0.005)
+    parser.add_argument("--jitter", type=float, default=0.002)
+    args = parser.parse_args()
+
+    server_class = TasmotaHttpServer if args.transport == "http" else TasmotaMqttBroker
+    with server_class(latency=args.latency, jitter=args.jitter) as emulator:
+        print(f"Tasmota {args.transport} emulator listening, DEFAULT_PORT={emulator.port}, Ctrl+C to stop")
+        try:
+            while True:
+                time.sleep(1)
+        except KeyboardInterrupt:
+            pass
+
+
+if __name__ == "__main__":
+    main()
@@ -1 +0,0 @@
-from .util import env  # noqa: F401
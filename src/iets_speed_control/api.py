@@ -0,0 +1,391 @@
+"""
+Local control API - lets thin clients share one controller owned by the daemon.
+
+Newline-delimited JSON over a Unix socket (API_SOCKET) or localhost TCP (API_PORT).
+
+Requests: {"cmd": "status" | "subscribe" | "start" | "stop"}, {"cmd": "mode", "mode": "auto" | "manual"},
+{"cmd": "speed", "speed": 0-100}, {"cmd": "profile", "seconds": N, "mode": "sample" | "cprofile"};
+an optional "id" is echoed in the reply. A profile reply comes after the capture, with the file path as
+"profile" in its state.
+Replies: {"type": "result", "id": ..., "state": {...}} or {"type": "error", "id": ..., "error": "..."}.
+Subscribers also receive {"type": "state", "state": {...}} pushes whenever the controller publishes
+a changed StatusSnapshot, at most max_rate per second. Pushes are coalesced per client:
+a slow client skips intermediate states and always gets the latest one.
+"""
+
+import asyncio
+import json
+import logging
+import socket
+from typing import Callable, Optional, Union
+
+from .controller import Mode, MultiSpeedController, SpeedController, StatusSnapshot
+from .util.profiler import Profiler
+from .util.publisher import Publisher, Subscription
+
+Controller = Union[SpeedController, MultiSpeedController]
+
+
+def controller_state(controller: Controller, snapshot: Optional[StatusSnapshot] = None) -> dict:
+    """JSON-serializable state of a controller."""
+    return {
+        **(snapshot or controller.snapshot()).to_dict(),
+        "sparkline": controller.speed_sparkline(),
+        "writes_per_minute": controller.writes_per_minute,
+    }
+
+
+class _Subscriber:
+    """Latest-state slot of one client; the writer always sends the newest state."""
+
+    def __init__(self):
+        self.state: Optional[dict] = None
+        self.ready = asyncio.Event()
+
+    def offer(self, state: dict):
+        self.state = state
+        self.ready.set()
+
+    async def take(self) -> dict:
+        await self.ready.wait()
+        self.ready.clear()
+        return self.state
+
+
+class ApiServer:
+    """Serves the control API of a controller and pushes its published status to subscribed clients."""
+
+    def __init__(
+        self,
+        controller: Controller,
+        socket_path="",
+        port=8765,
+        host="127.0.0.1",
+        max_rate=4.0,
+        profiler: Optional[Profiler] = None,
+    ):
+        self.controller = controller
+        self.profiler = profiler or Profiler()
+        self.socket_path = socket_path
+        self.port = port
+        self.host = host
+        self.max_rate = max_rate
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._subscribers: set[_Subscriber] = set()
+        self._subscription: Optional[Subscription] = None
+
+    @property
+    def address(self) -> str:
+        return self.socket_path or f"{self.host}:{self.port}"
+
+    async def start(self):
+        if self.socket_path:
+            self._server = await asyncio.start_unix_server(self._handle, self.socket_path)
+        else:
+            self._server = await asyncio.start_server(self._handle, self.host, self.port)
+        self._subscription = self.controller.publisher.subscribe(self._on_snapshot, max_rate=self.max_rate)
+        logging.info(f"Control API listening on {self.address}")
+
+    async def stop(self):
+        if self._subscription:
+            self._subscription.cancel()
+            self._subscription = None
+        if self._server:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+
+    def _on_snapshot(self, snapshot: StatusSnapshot):
+        state = controller_state(self.controller, snapshot)
+        for subscriber in self._subscribers:
+            subscriber.offer(state)
+
+    async def _execute(self, request: dict) -> dict:
+        command = request.get("cmd")
+        if command == "mode":
+            self.controller.mode = Mode(request.get("mode"))
+        elif command == "speed":
+            speed = int(request.get("speed"))
+            if not 0 <= speed <= 100:
+                raise ValueError(f"speed must be within 0..100, got {speed}")
+            self.controller.manual_speed = speed
+        elif command == "start":
+            await self.controller.start()
+        elif command == "stop":
+            await self.controller.stop()
+        elif command == "profile":
+            seconds = request.get("seconds")
+            path = await self.profiler.capture(None if seconds is None else float(seconds), request.get("mode"))
+            return {**controller_state(self.controller), "profile": str(path)}
+        elif command not in ("status", "subscribe"):
+            raise ValueError(f"Unknown command {command!r}")
+
+        self.controller.publish_status()
+        return controller_state(self.controller)
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        subscriber: Optional[_Subscriber] = None
+        pusher: Optional[asyncio.Task] = None
+        lock = asyncio.Lock()
+
+        async def send(message: dict):
+            async with lock:
+                writer.write(json.dumps(message).encode() + b"\n")
+                await writer.drain()
+
+        async def push():
+            while True:
+                await send({"type": "state", "state": await subscriber.take()})
+
+        try:
+            while line := await reader.readline():
+                request = {}
+                try:
+                    request = json.loads(line)
+                    state = await self._execute(request)
+                    await send({"type": "result", "id": request.get("id"), "state": state})
+                except Exception as e:
+                    await send({"type": "error", "id": request.get("id"), "error": str(e)})
+                    continue
+
+                if request.get("cmd") == "subscribe" and subscriber is None:
+                    subscriber = _Subscriber()
+                    self._subscribers.add(subscriber)
+                    pusher = asyncio.create_task(push())
+        except Exception as e:
+            logging.debug(f"Control API client error: {e}")
+        finally:
+            if subscriber:
+                self._subscribers.discard(subscriber)
+            if pusher:
+                pusher.cancel()
+            writer.close()
+
+
+def daemon_running(socket_path="", port=8765, host="127.0.0.1") -> bool:
+    """Whether a daemon is accepting API connections."""
+    try:
+        if socket_path:
+            with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as client:
+                client.settimeout(0.5)
+                client.connect(socket_path)
+        else:
+            socket.create_connection((host, port), timeout=0.5).close()
+        return True
+    except Exception:
+        return False
+
+
+class ApiClient:
+    """Async client of the control API."""
+
+    def __init__(self, socket_path="", port=8765, host="127.0.0.1"):
+        self.socket_path = socket_path
+        self.port = port
+        self.host = host
+        self.on_state: Optional[Callable[[dict], None]] = None
+        self._reader: Optional[asyncio.StreamReader] = None
+        self._writer: Optional[asyncio.StreamWriter] = None
+        self._dispatcher: Optional[asyncio.Task] = None
+        self._pending: dict[int, asyncio.Future] = {}
+        self._next_id = 0
+
+    @property
+    def connected(self) -> bool:
+        return self._dispatcher is not None and not self._dispatcher.done()
+
+    async def connect(self):
+        if self.socket_path:
+            self._reader, self._writer = await asyncio.open_unix_connection(self.socket_path)
+        else:
+            self._reader, self._writer = await asyncio.open_connection(self.host, self.port)
+        self._dispatcher = asyncio.create_task(self._dispatch())
+
+    async def close(self):
+        if self._dispatcher:
+            self._dispatcher.cancel()
+            self._dispatcher = None
+        if self._writer:
+            self._writer.close()
+            self._writer = None
+
+    async def wait_closed(self):
+        """Wait until the daemon closes the connection."""
+        if self._dispatcher:
+            await self._dispatcher
+
+    async def request(self, command: str, **arguments) -> dict:
+        """Send a command and return the state from the reply; raises RuntimeError on an error reply."""
+        if not self.connected:
+            raise ConnectionError("Not connected to the daemon")
+        self._next_id += 1
+        future = asyncio.get_running_loop().create_future()
+        self._pending[self._next_id] = future
+        self._writer.write(json.dumps({"cmd": command, "id": self._next_id, **arguments}).encode() + b"\n")
+        await self._writer.drain()
+        return await future
+
+    async def _dispatch(self):
+        try:
+            while line := await self._reader.readline():
+                message = json.loads(line)
+                if message.get("type") == "state":
+                    if self.on_state:
+                        self.on_state(message["state"])
+                    continue
+
+                future = self._pending.pop(message.get("id"), None)
+                if future and not future.done():
+                    if message.get("type") == "error":
+                        future.set_exception(RuntimeError(message.get("error")))
+                    else:
+                        future.set_result(message.get("state"))
+        finally:
+            for future in self._pending.values():
+                if not future.done():
+                    future.set_exception(ConnectionError("Connection to the daemon closed"))
+            self._pending.clear()
+
+
+class RemoteController:
+    """
+    SpeedController stand-in backed by a daemon, for thin frontends like the tray GUI.
+
+    Properties reflect the latest pushed state, which is also republished as a StatusSnapshot.
+    Setters may be called from any thread; they are forwarded on the loop start() ran on.
+    stop() stops the daemon's control loop, shutdown() only detaches from the daemon.
+    """
+
+    def __init__(self, socket_path="", port=8765, host="127.0.0.1", retry_delay=2.0):
+        self.client = ApiClient(socket_path, port, host)
+        self.client.on_state = self._on_state
+        self.retry_delay = retry_delay
+        self._state: dict = {}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._task: Optional[asyncio.Task] = None
+        self.publisher: Publisher[StatusSnapshot] = Publisher()
+
+    @property
+    def mode(self) -> Mode:
+        return Mode(self._state.get("mode", Mode.AUTO.value))
+
+    @mode.setter
+    def mode(self, value: Mode):
+        self._state["mode"] = value.value
+        self._send("mode", mode=value.value)
+
+    @property
+    def manual_speed(self) -> int:
+        return self._state.get("manual_speed", 0)
+
+    @manual_speed.setter
+    def manual_speed(self, value: int):
+        self._state["manual_speed"] = value
+        self._send("speed", speed=value)
+
+    @property
+    def running(self) -> bool:
+        return self.client.connected and self._state.get("running", False)
+
+    @property
+    def connected(self) -> bool:
+        return self.client.connected and self._state.get("connected", False)
+
+    @property
+    def cpu_temp(self) -> int:
+        return self._state.get("cpu_temp", 0)
+
+    @property
+    def gpu_temp(self) -> int:
+        return self._state.get("gpu_temp", 0)
+
+    @property
+    def current_speed(self) -> int:
+        return self._state.get("current_speed", 0)
+
+    @property
+    def port(self) -> Optional[str]:
+        return self._state.get("port")
+
+    def metrics_summary(self) -> str:
+        return ""
+
+    async def profile(self, seconds: Optional[float] = None, mode: Optional[str] = None) -> str:
+        """
+        Have the daemon profile itself; returns the path of the profile file on the daemon's side.
+
+        Runs on a connection of its own, so commands from the GUI do not wait for the capture.
+        """
+        client = ApiClient(self.client.socket_path, self.client.port, self.client.host)
+        await client.connect()
+        try:
+            return (await client.request("profile", seconds=seconds, mode=mode))["profile"]
+        finally:
+            await client.close()
+
+    def speed_sparkline(self, width=30) -> str:
+        return self._state.get("sparkline", "")[-width:]
+
+    def metrics_registries(self) -> list:
+        return []
+
+    def snapshot(self) -> StatusSnapshot:
+        return StatusSnapshot(
+            self.mode,
+            self.manual_speed,
+            self.running,
+            self.connected,
+            self.cpu_temp,
+            self.gpu_temp,
+            self.current_speed,
+            self.port,
+        )
+
+    def publish_status(self):
+        self.publisher.publish(self.snapshot())
+
+    def _send(self, command: str, **arguments):
+        if not self._loop:
+            return
+        future = asyncio.run_coroutine_threadsafe(self.client.request(command, **arguments), self._loop)
+        future.add_done_callback(
+            lambda _: _.exception() and logging.error(f"Daemon command {command} failed: {_.exception()}")
+        )
+
+    def _on_state(self, state: dict):
+        self._state = state
+        self.publisher.publish(StatusSnapshot.from_dict(state))
+
+    async def _attach(self):
+        """Stay subscribed to the daemon, reconnecting after it restarts."""
+        while True:
+            try:
+                await self.client.connect()
+                logging.info("Attached to the daemon")
+                self._on_state(await self.client.request("subscribe"))
+                await self.client.wait_closed()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logging.debug(f"Daemon connection failed: {e}")
+            await self.client.close()
+            self._state = {}
+            self.publish_status()
+            await asyncio.sleep(self.retry_delay)
+
+    async def start(self):
+        self._loop = asyncio.get_running_loop()
+        if self._task is None:
+            self._task = asyncio.create_task(self._attach())
+        elif self.client.connected:
+            await self.client.request("start")
+
+    async def stop(self):
+        if self.client.connected:
+            await self.client.request("stop")
+
+    async def shutdown(self):
+        if self._task:
+            self._task.cancel()
+            self._task = None
+        await self.client.close()
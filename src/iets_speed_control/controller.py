@@ -2,15 +2,37 @@
 
 import asyncio
 import logging
+import random
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
 from enum import Enum
+from pathlib import Path
 from typing import Optional, Callable
-from serial.tools.list_ports_common import ListPortInfo
-from serial.tools.list_ports_windows import comports
 
+from .entities.command_queue import Priority
 from .entities.dimmer import Dimmer
+from .entities.tasmota_device import ConnectionState, TasmotaDevice
+from .entities.transport import is_url
+from .strategies import ControlInput, ControlStrategy, RateMeter, create_strategy
 from .util import env
-from .util.sensors import get_sensors
-from .util.tools import calculate_dimmer_value
+from .util.devices import DeviceConfig, group_by_device, load_device_configs
+from .util.discovery import PortDiscovery
+from .util.metrics import Metrics
+from .util.publisher import Publisher
+from .util.sensors import SensorReader, create_providers
+from .util.fan_curve import CurveSet, FanCurve
+from .util.scheduler import TickScheduler
+from .util.telemetry import TelemetryBuffer, TelemetryFile, TelemetrySchema
+
+
+def create_sensor_reader(cache_ttl: float = 0.0) -> SensorReader:
+    """SensorReader over the SENSOR_PROVIDERS sources."""
+    return SensorReader(
+        create_providers(env.SENSOR_PROVIDERS, index_refresh=env.SENSOR_INDEX_REFRESH),
+        cache_ttl=cache_ttl,
+        stale_after=env.SENSOR_STALE_AFTER,
+    )
 
 
 class Mode(Enum):
@@ -20,25 +42,114 @@ class Mode(Enum):
     MANUAL = "manual"
 
 
+@dataclass(frozen=True)
+class StatusSnapshot:
+    """Immutable controller status, published whenever any of the values changes."""
+
+    mode: Mode
+    manual_speed: int
+    running: bool
+    connected: bool
+    cpu_temp: int
+    gpu_temp: int
+    current_speed: int
+    port: Optional[str] = None
+    devices: tuple[tuple[str, "StatusSnapshot"], ...] = ()
+
+    def to_dict(self) -> dict:
+        data = {
+            "mode": self.mode.value,
+            "manual_speed": self.manual_speed,
+            "running": self.running,
+            "connected": self.connected,
+            "cpu_temp": self.cpu_temp,
+            "gpu_temp": self.gpu_temp,
+            "current_speed": self.current_speed,
+            "port": self.port,
+        }
+        if self.devices:
+            data["devices"] = {name: _.to_dict() for name, _ in self.devices}
+        return data
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "StatusSnapshot":
+        return cls(
+            mode=Mode(data["mode"]),
+            manual_speed=data["manual_speed"],
+            running=data["running"],
+            connected=data["connected"],
+            cpu_temp=data["cpu_temp"],
+            gpu_temp=data["gpu_temp"],
+            current_speed=data["current_speed"],
+            port=data.get("port"),
+            devices=tuple((name, cls.from_dict(_)) for name, _ in data.get("devices", {}).items()),
+        )
+
+
 class SpeedController:
     """
     Manages fan speed control with auto and manual modes.
 
     In AUTO mode, fan speed is calculated from CPU/GPU temperatures.
     In MANUAL mode, fan speed is set directly by the user.
+
+    device is given when several channels share one Tasmota device; its owner then stops
+    its I/O worker and disconnects it.
     """
 
-    def __init__(self):
-        self.device = Dimmer()
+    def __init__(
+        self,
+        config: Optional[DeviceConfig] = None,
+        sensors: Optional[SensorReader] = None,
+        device: Optional[TasmotaDevice] = None,
+    ):
+        self.config = config or DeviceConfig()
+        self.command = self.config.pwm_command
+        self.metrics = Metrics(labels={"device": self.config.name} if self.config.name else None)
+        self._owns_device = device is None
+        self.discovery = create_discovery(self.config)
+        self.device = device or Dimmer(
+            port=initial_port(self.config, self.discovery), dimmer_command=self.command, metrics=self.metrics
+        )
+        self.discovery.owner = self.device
+        self._owns_sensors = sensors is None
+        self.sensors = sensors or create_sensor_reader()
+        self.failsafe_speed: int = env.SENSOR_FAILSAFE_PWM
+        self.curve = FanCurve.parse(self.config.temp_ranges)
+        self.curves: Optional[CurveSet] = None
+        if self.config.sensor_curves or env.SENSOR_CURVE_REDUCE != "max":
+            self.curves = CurveSet.parse(
+                self.config.sensor_curves,
+                self.curve,
+                (self.config.cpu_sensor_filter, self.config.gpu_sensor_filter),
+                env.SENSOR_CURVE_REDUCE.strip().lower(),
+            )
+        self._strategy = create_strategy(self.config.strategy, self.curve, self.curves)
+        self.sensors.add_filters(
+            self.config.cpu_sensor_filter, self.config.gpu_sensor_filter, *self._strategy.sensor_filters
+        )
+        self._write_rates: dict[str, RateMeter] = {}
+        self.scheduler = TickScheduler(
+            env.DELAY,
+            min_period=env.DELAY_MIN,
+            max_period=env.DELAY_MAX,
+            rise_threshold=env.DELAY_RISE_THRESHOLD,
+        )
         self._mode = Mode.AUTO
         self._manual_speed = 0
         self._running = False
         self._loop_task: Optional[asyncio.Task] = None
+        self._reconnect_task: Optional[asyncio.Task] = None
+        self.device.state_listeners.append(self._on_device_state)
 
-        # Status callbacks
+        # Status callbacks, called only when their values change
         self._on_status_change: Optional[Callable] = None
         self._on_temps_change: Optional[Callable] = None
         self._on_speed_change: Optional[Callable] = None
+        self._notified: dict[str, tuple] = {}
+
+        # StatusSnapshot on every change, for UI and API subscribers
+        self.publisher: Publisher[StatusSnapshot] = Publisher()
 
         # Current status
         self._cpu_temp = 0
@@ -46,6 +157,56 @@ class SpeedController:
         self._current_speed = 0
         self._connected = False
 
+        # Shadow state: last dimmer value acknowledged by the device
+        self._shadow_value: Optional[int] = None
+        self._shadow_reconciled_at = 0.0
+
+        # Reconnect metrics
+        self._disconnected_since: Optional[float] = None
+        self._was_connected = False
+
+        self.metrics.histogram("tick_seconds", "Control loop work time per tick")
+        self.metrics.histogram("sensor_fetch_seconds", "Sensor read time")
+        self.metrics.histogram("device_read_seconds", "Dimmer value read time")
+        self.metrics.histogram("device_write_seconds", "Dimmer value write time")
+        self.metrics.histogram("callbacks_seconds", "Status callback time")
+        self.metrics.histogram("reconnect_seconds", "Time from losing the device to connecting again")
+        self.metrics.counter("reconnects_total", "Reconnections after the device was lost")
+        self.metrics.gauge(
+            "disconnected_seconds",
+            "Time since the device was lost, 0 while connected",
+            lambda: time.monotonic() - self._disconnected_since if self._disconnected_since is not None else 0.0,
+        )
+        # the port discovery keeps its own counts; they are read when the metrics are rendered
+        discovery = self.discovery
+        self.metrics.counter("port_scans_total", "Serial port scans for the device", lambda: discovery.scans)
+        self.metrics.counter(
+            "port_scans_failed_total", "Serial port scans that did not find the device", lambda: discovery.failed_scans
+        )
+        self.metrics.counter("loop_overruns_total", "Ticks that took longer than the tick period")
+
+        # Per-tick history
+        self.telemetry = self._create_telemetry()
+        self._tick_stages: dict[str, float] = {}
+        self._telemetry_flushed_at = 0.0
+        self._telemetry_labels: Optional[frozenset] = None
+
+    def _create_telemetry(self, sensors=()) -> TelemetryBuffer:
+        """Telemetry with the CPU/GPU maxima and a column per sensor label in sensors."""
+        schema = TelemetrySchema(("cpu", "gpu", *sensors))
+        file = None
+        if env.TELEMETRY_FILE:
+            path = Path(env.TELEMETRY_FILE)
+            if self.config.name:
+                path = path.with_name(f"{path.stem}-{self.config.name}{path.suffix}")
+            file = TelemetryFile(path, schema, max_bytes=env.TELEMETRY_MAX_BYTES, backups=env.TELEMETRY_BACKUPS)
+        return TelemetryBuffer(env.TELEMETRY_CAPACITY, schema, file)
+
+    @property
+    def name(self) -> str:
+        """Device name from the config."""
+        return self.config.name
+
     @property
     def mode(self) -> Mode:
         """Current control mode."""
@@ -55,7 +216,40 @@ class SpeedController:
     def mode(self, value: Mode):
         if self._mode != value:
             self._mode = value
-            logging.info(f"Mode changed to {value.name}")
+            self._strategy.reset()
+            logging.info("Mode changed to %s", value.name)
+
+    @property
+    def strategy(self) -> ControlStrategy:
+        """Control strategy used in AUTO mode."""
+        return self._strategy
+
+    @strategy.setter
+    def strategy(self, value: ControlStrategy):
+        if self._strategy is not value:
+            value.reset()
+            self._strategy = value
+            self.sensors.add_filters(*value.sensor_filters)
+            logging.info("Control strategy changed to %s", value.name)
+
+    @property
+    def writes_per_minute(self) -> dict[str, float]:
+        """Dimmer writes during the last minute, per control strategy."""
+        now = time.monotonic()
+        return {name: meter.rate(now) for name, meter in self._write_rates.items()}
+
+    def _write_rate(self, strategy: str) -> RateMeter:
+        """Write rate meter of a strategy, exported as a gauge on first use."""
+        meter = self._write_rates.get(strategy)
+        if meter is None:
+            meter = self._write_rates[strategy] = RateMeter()
+            self.metrics.gauge(
+                "auto_writes_per_minute",
+                "Dimmer writes during the last minute in AUTO mode, per control strategy",
+                lambda: meter.rate(time.monotonic()),
+                labels={"strategy": strategy},
+            )
+        return meter
 
     @property
     def manual_speed(self) -> int:
@@ -65,7 +259,7 @@ class SpeedController:
     @manual_speed.setter
     def manual_speed(self, value: int):
         self._manual_speed = max(0, min(100, int(value)))
-        logging.debug(f"Manual speed set to {self._manual_speed}")
+        logging.debug("Manual speed set to %s", self._manual_speed)
 
     @property
     def running(self) -> bool:
@@ -92,11 +286,34 @@ class SpeedController:
         """Current fan speed."""
         return self._current_speed
 
+    @property
+    def io_stats(self) -> dict:
+        """Serial command queue depth and coalescing counters."""
+        return self.device.queue.stats()
+
     @property
     def port(self) -> Optional[str]:
         """Current serial port."""
         return self.device.port
 
+    def metrics_registries(self) -> list[Metrics]:
+        """Metrics of this controller and its device."""
+        return [self.metrics]
+
+    def metrics_summary(self) -> str:
+        """Compact per-stage latency summary."""
+        return self.metrics.summary(
+            ("tick_seconds", "sensor_fetch_seconds", "device_read_seconds", "device_write_seconds")
+        )
+
+    def speed_sparkline(self, width=30) -> str:
+        """Sparkline of the fan speed over the last width ticks."""
+        return self.telemetry.sparkline("actual", width)
+
+    @property
+    def _log_prefix(self) -> str:
+        return f"{self.name}: " if self.name else ""
+
     def set_callbacks(
         self,
         on_status_change: Optional[Callable] = None,
@@ -107,21 +324,52 @@ class SpeedController:
         self._on_status_change = on_status_change
         self._on_temps_change = on_temps_change
         self._on_speed_change = on_speed_change
+        self._notified.clear()
+
+    def snapshot(self) -> StatusSnapshot:
+        """Current status."""
+        return StatusSnapshot(
+            mode=self._mode,
+            manual_speed=self._manual_speed,
+            running=self._running,
+            connected=self._connected,
+            cpu_temp=self._cpu_temp,
+            gpu_temp=self._gpu_temp,
+            current_speed=self._current_speed,
+            port=self.port,
+        )
+
+    def publish_status(self):
+        """Publish the current status if it changed; call on the event loop."""
+        with self.metrics.timer("callbacks_seconds"):
+            self.publisher.publish(self.snapshot())
+
+    def _changed(self, key: str, values: tuple) -> bool:
+        if self._notified.get(key) == values:
+            return False
+        self._notified[key] = values
+        return True
 
     def _notify_status(self):
         """Notify status change callback."""
-        if self._on_status_change:
-            self._on_status_change(self._connected, self._running)
+        self.publish_status()
+        if self._on_status_change and self._changed("status", (self._connected, self._running, self._mode, self.port)):
+            with self.metrics.timer("callbacks_seconds"):
+                self._on_status_change(self._connected, self._running)
 
     def _notify_temps(self):
         """Notify temperature change callback."""
-        if self._on_temps_change:
-            self._on_temps_change(self._cpu_temp, self._gpu_temp)
+        self.publish_status()
+        if self._on_temps_change and self._changed("temps", (self._cpu_temp, self._gpu_temp)):
+            with self.metrics.timer("callbacks_seconds"):
+                self._on_temps_change(self._cpu_temp, self._gpu_temp)
 
     def _notify_speed(self):
         """Notify speed change callback."""
-        if self._on_speed_change:
-            self._on_speed_change(self._current_speed)
+        self.publish_status()
+        if self._on_speed_change and self._changed("speed", (self._current_speed,)):
+            with self.metrics.timer("callbacks_seconds"):
+                self._on_speed_change(self._current_speed)
 
     async def start(self):
         """Start the control loop."""
@@ -129,6 +377,7 @@ class SpeedController:
             return
 
         self._running = True
+        self.device.start_worker()
         self._loop_task = asyncio.create_task(self._control_loop())
         self._notify_status()
         logging.info("Control loop started")
@@ -146,88 +395,230 @@ class SpeedController:
             except asyncio.CancelledError:
                 pass
             self._loop_task = None
+        if self._reconnect_task:
+            # Wait for it, so a connect in flight can't reopen the device after it's closed
+            self._reconnect_task.cancel()
+            try:
+                await self._reconnect_task
+            except asyncio.CancelledError:
+                pass
+            self._reconnect_task = None
 
-        # Set fan to 0 when stopping
-        await self._set_fan_speed(0)
+        # Set fan to 0 when stopping, ahead of anything still queued
+        await self._set_fan_speed(0, priority=Priority.URGENT)
+        if self._owns_device:
+            await self.device.stop_worker()
         self._notify_status()
         logging.info("Control loop stopped")
 
-    async def _set_fan_speed(self, value: int):
+    @contextmanager
+    def _stage(self, name: str):
+        """Time a control loop stage into its histogram and the telemetry record of this tick."""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - started
+            self.metrics.observe(f"{name}_seconds", elapsed)
+            self._tick_stages[name] = elapsed
+
+    def _update_telemetry_schema(self, sensors: dict):
+        """
+        Add a column for every newly selected sensor: the labels of the CPU/GPU filters and of the strategy's
+        (the SENSOR_CURVES groups), sorted so a restart with the same sensors keeps the file's schema.
+        Only looked at when the labels of the reading change. Columns are never dropped, a sensor missing
+        from a reading is NaN; the records kept so far move to the new buffer, and the file is rotated.
+        """
+        if sensors.keys() == self._telemetry_labels:
+            return
+        self._telemetry_labels = frozenset(sensors)
+
+        filters = (self.config.cpu_sensor_filter, self.config.gpu_sensor_filter, *self._strategy.sensor_filters)
+        columns = self.telemetry.schema.columns
+        labels = {label for _ in filters for label in self.sensors.labels(_) if label not in columns}
+        if labels:
+            telemetry = self._create_telemetry(sorted({*self.telemetry.schema.sensors[2:], *labels}))
+            self.telemetry.close()
+            telemetry.copy_from(self.telemetry)
+            self.telemetry = telemetry
+
+    def _record_telemetry(self, sensors: dict, target: Optional[int], actual: Optional[int]):
+        self._update_telemetry_schema(sensors)
+        self.telemetry.append(
+            time.time(), {**sensors, "cpu": self._cpu_temp, "gpu": self._gpu_temp}, target, actual, self._tick_stages
+        )
+        now = time.monotonic()
+        if now - self._telemetry_flushed_at >= env.TELEMETRY_FLUSH_INTERVAL:
+            self._telemetry_flushed_at = now
+            self.telemetry.flush()
+
+    async def _set_fan_speed(self, value: int, priority=Priority.NORMAL):
         """Set the fan speed on the device."""
         if self.device.connected:
-            await self.device.set_dimmer_value(value)
+            with self._stage("device_write"):
+                acknowledged = await self.device.set_field_value(self.command, value, priority)
+            if acknowledged == value:
+                self._shadow_value = acknowledged
+            else:
+                # No or unexpected acknowledgement: reconcile with the device on the next tick
+                if acknowledged is not None:
+                    logging.warning("%s%s %s acknowledged as %s", self._log_prefix, self.command, value, acknowledged)
+                self._shadow_value = None
             self._current_speed = value
             self._notify_speed()
 
+    async def _read_current_dimmer(self) -> Optional[int]:
+        """
+        Current dimmer value of the device.
+
+        In SHADOW_STATE mode the last acknowledged value is returned without a serial round-trip,
+        and the device is only queried every RECONCILE_INTERVAL seconds, after a reconnect or a mismatch.
+        """
+        now = asyncio.get_running_loop().time()
+        if (
+            env.SHADOW_STATE
+            and self._shadow_value is not None
+            and now - self._shadow_reconciled_at < env.RECONCILE_INTERVAL
+        ):
+            return self._shadow_value
+
+        with self._stage("device_read"):
+            value = await self.device.read_field_value(self.command)
+        if env.SHADOW_STATE and None not in (value, self._shadow_value) and value != self._shadow_value:
+            logging.info(
+                "%s%s changed outside of the controller: %s -> %s",
+                self._log_prefix,
+                self.command,
+                self._shadow_value,
+                value,
+            )
+        self._shadow_value = value
+        self._shadow_reconciled_at = now
+        return value
+
     async def _connect(self) -> bool:
         """Attempt to connect to the device."""
         if self.device.connected:
             return True
 
-        # Try direct connection first
+        # The device may have been power-cycled while disconnected
+        self._shadow_value = None
+        if self._disconnected_since is None:
+            self._disconnected_since = time.monotonic()
+
+        # Try the configured or last known port first
         await self.device.connect()
-        if self.device.connected:
-            self._connected = True
-            self._notify_status()
-            return True
 
         # Try to find device by name or serial
-        coms: list[ListPortInfo] = comports()
-        coms_match = []
-
-        if env.DEVICE_NAME:
-            coms_match = [_ for _ in coms if env.DEVICE_NAME in _.description]
-
-        if env.DEVICE_SERIAL:
-            coms_match = [_ for _ in coms if _.serial_number and env.DEVICE_SERIAL in _.serial_number] or coms_match
-
-        if coms_match:
-            com = coms_match[0]
-            self.device.port = com.device
-            logging.info(f"Serial Device found at {self.device.port}")
-            await self.device.connect()
+        if not self.device.connected and self.device.transport.discoverable:
+            port = await asyncio.to_thread(self.discovery.find)
+            if port:
+                self.device.port = port
+                logging.info("%sSerial Device found at %s", self._log_prefix, self.device.port)
+                await self.device.connect()
 
         self._connected = self.device.connected
+        if self._connected:
+            if self.device.transport.discoverable:
+                self.discovery.remember(self.device.port)
+            elapsed = time.monotonic() - self._disconnected_since
+            logging.info(
+                "%sConnected to %s in %.2fs (%s failed port scans)",
+                self._log_prefix,
+                self.device.port,
+                elapsed,
+                self.discovery.failed_scans,
+            )
+            if self._was_connected:
+                self.metrics.inc("reconnects_total")
+                self.metrics.observe("reconnect_seconds", elapsed)
+            self._was_connected = True
+            self._disconnected_since = None
         self._notify_status()
         return self._connected
 
+    def _on_device_state(self, state: ConnectionState):
+        """Follow the device's connection state; a lost connection is reopened in the background."""
+        self._connected = self.device.connected
+        if state == ConnectionState.LOST:
+            self._shadow_value = None
+            if self._disconnected_since is None:
+                self._disconnected_since = time.monotonic()
+            self._ensure_reconnect()
+        self._notify_status()
+
+    def _ensure_reconnect(self):
+        if self._running and (self._reconnect_task is None or self._reconnect_task.done()):
+            self._reconnect_task = asyncio.create_task(self._reconnect_loop(), name=f"reconnect-{self.device.port}")
+
+    async def _reconnect_loop(self):
+        """
+        Reconnect with jittered exponential backoff between RECONNECT_MIN_DELAY and RECONNECT_MAX_DELAY.
+
+        Runs beside the control loop, so a missing device never stalls a tick; the jitter keeps several
+        devices from retrying in lockstep.
+        """
+        delay = env.RECONNECT_MIN_DELAY
+        while self._running and not self.device.connected:
+            if await self._connect():
+                return
+            await asyncio.sleep(delay / 2 + random.uniform(0, delay / 2))
+            delay = min(delay * 2, env.RECONNECT_MAX_DELAY)
+
+    async def _read_sensors(self) -> dict:
+        with self._stage("sensor_fetch"):
+            return await self.sensors.read()
+
+    def _failsafe_value(self, current_dimmer: Optional[int]) -> int:
+        """Dimmer value while every sensor source is stale: failsafe_speed, or the current one when negative."""
+        if self.failsafe_speed >= 0:
+            return self.failsafe_speed
+        return current_dimmer if current_dimmer is not None else self._current_speed
+
     async def _control_loop(self):
         """Main control loop."""
+        self.scheduler.reset()
         try:
             while self._running:
-                # Attempt connection if not connected
+                tick_started = time.perf_counter()
+                self._tick_stages = {}
+                # Reconnecting happens in the background; the tick only checks the state
                 if not self.device.connected:
-                    await self._connect()
+                    self._ensure_reconnect()
 
                 if self.device.connected:
                     self._connected = True
 
-                    # Read temperatures
-                    sensors = get_sensors()
-                    cpu_temps = {k: int(v) for k, v in sensors.items() if env.CPU_SENSOR_FILTER in k}
-                    gpu_temps = {k: int(v) for k, v in sensors.items() if env.GPU_SENSOR_FILTER in k}
-
-                    self._cpu_temp = max(cpu_temps.values() or [0])
-                    self._gpu_temp = max(gpu_temps.values() or [0])
+                    # Read temperatures and the current dimmer value concurrently
+                    sensors, current_dimmer = await asyncio.gather(
+                        self._read_sensors(),
+                        self._read_current_dimmer(),
+                    )
+                    cpu_temps = [
+                        int(float(sensors[_]))
+                        for _ in self.sensors.labels(self.config.cpu_sensor_filter)
+                        if _ in sensors
+                    ]
+                    gpu_temps = [
+                        int(float(sensors[_]))
+                        for _ in self.sensors.labels(self.config.gpu_sensor_filter)
+                        if _ in sensors
+                    ]
+
+                    self._cpu_temp = max(cpu_temps or [0])
+                    self._gpu_temp = max(gpu_temps or [0])
                     self._notify_temps()
-
-                    # Read current dimmer value
-                    current_dimmer = await self.device.read_dimmer_value()
+                    self.scheduler.observe(max(self._cpu_temp, self._gpu_temp))
 
                     # Calculate new speed based on mode
-                    if self._mode == Mode.AUTO:
-                        cpu_dimmer = calculate_dimmer_value(self._cpu_temp, env.TEMP_RANGES)
-                        gpu_dimmer = calculate_dimmer_value(self._gpu_temp, env.TEMP_RANGES)
-                        new_value = max(cpu_dimmer, gpu_dimmer)
-
-                        # Apply step limits
-                        if current_dimmer is not None and env.MAX_STEP:
-                            if new_value < current_dimmer - env.MAX_STEP:
-                                new_value = current_dimmer - env.MAX_STEP
-
-                        # Apply minimum change threshold
-                        if current_dimmer is not None and abs(current_dimmer - new_value) < env.IGNORE_LESS_THAN:
-                            new_value = current_dimmer
+                    now = time.monotonic()
+                    if self._mode == Mode.AUTO and self.sensors.stale:
+                        # No temperatures: don't let max([0]) drop the fan to the bottom of the curve
+                        new_value = self._failsafe_value(current_dimmer)
+                    elif self._mode == Mode.AUTO:
+                        new_value = self._strategy.compute(
+                            ControlInput(self._cpu_temp, self._gpu_temp, sensors, current_dimmer, now)
+                        )
                     else:
                         # Manual mode
                         new_value = self._manual_speed
@@ -235,31 +626,261 @@ class SpeedController:
                     # Update speed if changed
                     if current_dimmer != new_value:
                         logging.info(
-                            f"CPU: {self._cpu_temp}, GPU: {self._gpu_temp}. "
-                            f"{env.PWM_COMMAND}: {current_dimmer} -> {new_value}"
+                            "%sCPU: %s, GPU: %s. %s: %s -> %s",
+                            self._log_prefix,
+                            self._cpu_temp,
+                            self._gpu_temp,
+                            self.command,
+                            current_dimmer,
+                            new_value,
+                            extra={
+                                "device": self.config.name,
+                                "mode": self._mode.value,
+                                "cpu_temp": self._cpu_temp,
+                                "gpu_temp": self._gpu_temp,
+                                "previous": current_dimmer,
+                                "speed": new_value,
+                                "sensors_stale": self.sensors.stale,
+                            },
                         )
                         await self._set_fan_speed(new_value)
+                        if self._mode == Mode.AUTO:
+                            self._write_rate(self._strategy.name).record(now)
                     elif current_dimmer is not None:
                         self._current_speed = current_dimmer
                         self._notify_speed()
+
+                    self._tick_stages["tick"] = time.perf_counter() - tick_started
+                    self._record_telemetry(sensors, new_value, current_dimmer)
                 else:
                     self._connected = False
                     self._notify_status()
 
-                await asyncio.sleep(env.DELAY)
+                self.metrics.observe("tick_seconds", time.perf_counter() - tick_started)
+                if await self.scheduler.wait():
+                    self.metrics.inc("loop_overruns_total")
 
         except asyncio.CancelledError:
             logging.debug("Control loop cancelled")
             raise
         except Exception as e:
-            logging.exception(f"Error in control loop: {e}")
+            logging.exception("Error in control loop: %s", e)
             self._connected = False
             self._notify_status()
 
     async def shutdown(self):
         """Shutdown the controller gracefully."""
         await self.stop()
-        if self.device.connected:
+        if self._owns_device and self.device.connected:
             await self.device.disconnect()
+        self.discovery.release()
+        if self._owns_sensors:
+            await self.sensors.close()
+        self.telemetry.close()
         self._connected = False
         self._notify_status()
+
+
+class MultiSpeedController:
+    """
+    Drives several fan channels from one process.
+
+    Each channel gets its own SpeedController with its own control loop, so a slow or disconnected
+    device never delays the others; they are started and stopped together with asyncio.gather
+    and share one SensorReader. Channels with the same port and serial share one TasmotaDevice, so one link
+    and one command queue serve them and their commands can go out in one batch.
+    Exposes the SpeedController interface with aggregated values (the hottest temperatures,
+    the fastest fan), and reports per-device changes to on_device_change.
+    """
+
+    def __init__(self, configs: list[DeviceConfig], sensors: Optional[SensorReader] = None):
+        if not configs:
+            raise ValueError("At least one device config is required")
+
+        self.sensors = sensors or create_sensor_reader(cache_ttl=env.DELAY_MIN / 2)
+        # by (port, serial), the devices shared by several channels
+        self.devices: dict[tuple[str, str], TasmotaDevice] = {}
+        self.controllers: dict[str, SpeedController] = {}
+        for key, group in group_by_device(configs).items():
+            device = None
+            if len(group) > 1:
+                names = "+".join(_.name for _ in group)
+                device = self.devices[key] = TasmotaDevice(
+                    port=initial_port(group[0], create_discovery(group[0])),
+                    metrics=Metrics(labels={"device": names}),
+                )
+            for config in group:
+                self.controllers[config.name] = SpeedController(config, sensors=self.sensors, device=device)
+
+        self._on_status_change: Optional[Callable] = None
+        self._on_temps_change: Optional[Callable] = None
+        self._on_speed_change: Optional[Callable] = None
+        self._on_device_change: Optional[Callable] = None
+        self.publisher: Publisher[StatusSnapshot] = Publisher()
+
+        for name, controller in self.controllers.items():
+            controller.publisher.subscribe(lambda _: self.publish_status())
+            controller.set_callbacks(
+                on_status_change=lambda *_, n=name: self._notify(
+                    n, self._on_status_change, self.connected, self.running
+                ),
+                on_temps_change=lambda *_, n=name: self._notify(n, self._on_temps_change, self.cpu_temp, self.gpu_temp),
+                on_speed_change=lambda *_, n=name: self._notify(n, self._on_speed_change, self.current_speed),
+            )
+
+    @property
+    def mode(self) -> Mode:
+        """Current control mode."""
+        return next(iter(self.controllers.values())).mode
+
+    @mode.setter
+    def mode(self, value: Mode):
+        for controller in self.controllers.values():
+            controller.mode = value
+
+    @property
+    def manual_speed(self) -> int:
+        """Manual fan speed (0-100)."""
+        return next(iter(self.controllers.values())).manual_speed
+
+    @manual_speed.setter
+    def manual_speed(self, value: int):
+        for controller in self.controllers.values():
+            controller.manual_speed = value
+
+    @property
+    def running(self) -> bool:
+        """Whether any control loop is running."""
+        return any(_.running for _ in self.controllers.values())
+
+    @property
+    def connected(self) -> bool:
+        """Whether any device is connected."""
+        return any(_.connected for _ in self.controllers.values())
+
+    @property
+    def cpu_temp(self) -> int:
+        """Highest CPU temperature among devices."""
+        return max(_.cpu_temp for _ in self.controllers.values())
+
+    @property
+    def gpu_temp(self) -> int:
+        """Highest GPU temperature among devices."""
+        return max(_.gpu_temp for _ in self.controllers.values())
+
+    @property
+    def current_speed(self) -> int:
+        """Highest fan speed among devices."""
+        return max(_.current_speed for _ in self.controllers.values())
+
+    @property
+    def port(self) -> Optional[str]:
+        """Serial ports of the connected devices."""
+        return ", ".join(_.port for _ in self.controllers.values() if _.connected and _.port) or None
+
+    def set_callbacks(
+        self,
+        on_status_change: Optional[Callable] = None,
+        on_temps_change: Optional[Callable] = None,
+        on_speed_change: Optional[Callable] = None,
+        on_device_change: Optional[Callable] = None,
+    ):
+        """
+        Set callback functions for status updates.
+
+        The first three receive aggregated values like SpeedController's callbacks.
+        on_device_change(name, controller) is called on any change of a single device.
+        """
+        self._on_status_change = on_status_change
+        self._on_temps_change = on_temps_change
+        self._on_speed_change = on_speed_change
+        self._on_device_change = on_device_change
+
+    def _notify(self, name: str, callback: Optional[Callable], *args):
+        if callback:
+            callback(*args)
+        if self._on_device_change:
+            self._on_device_change(name, self.controllers[name])
+
+    def snapshot(self) -> StatusSnapshot:
+        """Aggregated status with a snapshot per device."""
+        return StatusSnapshot(
+            mode=self.mode,
+            manual_speed=self.manual_speed,
+            running=self.running,
+            connected=self.connected,
+            cpu_temp=self.cpu_temp,
+            gpu_temp=self.gpu_temp,
+            current_speed=self.current_speed,
+            port=self.port,
+            devices=tuple((name, _.snapshot()) for name, _ in self.controllers.items()),
+        )
+
+    def publish_status(self):
+        """Publish the aggregated status if it changed; call on the event loop."""
+        self.publisher.publish(self.snapshot())
+
+    @property
+    def writes_per_minute(self) -> dict[str, float]:
+        """Dimmer writes during the last minute, per control strategy, of all devices together."""
+        rates: dict[str, float] = {}
+        for controller in self.controllers.values():
+            for name, rate in controller.writes_per_minute.items():
+                rates[name] = rates.get(name, 0.0) + rate
+        return rates
+
+    def metrics_registries(self) -> list[Metrics]:
+        """Metrics of every device."""
+        return [_.metrics for _ in self.controllers.values()] + [_.metrics for _ in self.devices.values()]
+
+    def metrics_summary(self) -> str:
+        """Compact per-stage latency summary of every device."""
+        return "\n".join(f"{name}: {_.metrics_summary()}" for name, _ in self.controllers.items())
+
+    def speed_sparkline(self, width=30) -> str:
+        """Fan speed sparkline of every device."""
+        return "\n".join(f"{name}: {_.speed_sparkline(width)}" for name, _ in self.controllers.items())
+
+    async def _gather(self, method: str):
+        results = await asyncio.gather(
+            *(getattr(_, method)() for _ in self.controllers.values()), return_exceptions=True
+        )
+        for name, result in zip(self.controllers, results):
+            if isinstance(result, Exception):
+                logging.error("%s: %s failed: %s", name, method, result)
+
+    async def start(self):
+        """Start all control loops."""
+        await self._gather("start")
+
+    async def stop(self):
+        """Stop all control loops."""
+        await self._gather("stop")
+        for device in self.devices.values():
+            await device.stop_worker()
+
+    async def shutdown(self):
+        """Shutdown all controllers gracefully."""
+        await self._gather("shutdown")
+        for device in self.devices.values():
+            await device.stop_worker()
+            if device.connected:
+                await device.disconnect()
+        await self.sensors.close()
+
+
+def create_discovery(config: DeviceConfig) -> PortDiscovery:
+    """PortDiscovery of a device config, its cache entry keyed on the config name."""
+    return PortDiscovery(config.device_name, config.device_serial, name=config.name)
+
+
+def initial_port(config: DeviceConfig, discovery: PortDiscovery) -> str:
+    """Port to open first: a network device is always reached at its configured URL, a serial one where it was last."""
+    return config.port if is_url(config.port) else discovery.cached_port() or config.port
+
+
+def create_controller():
+    """SpeedController for the .env device, or MultiSpeedController when DEVICES_FILE is set."""
+    if env.DEVICES_FILE:
+        return MultiSpeedController(load_device_configs(env.DEVICES_FILE))
+    return SpeedController()
@@ -0,0 +1,125 @@
+import asyncio
+import itertools
+from enum import Enum, IntEnum
+from typing import Optional
+
+
+class Priority(IntEnum):
+    """Command priority, lower runs first."""
+
+    URGENT = 0
+    NORMAL = 1
+
+
+class CommandKind(Enum):
+    READ = "read"
+    SET = "set"
+
+
+class Command:
+    __slots__ = ("kind", "field_name", "value", "priority", "seq", "future")
+
+    def __init__(self, kind: CommandKind, field_name: str, value, priority: Priority, seq: int):
+        self.kind = kind
+        self.field_name = field_name
+        self.value = value
+        self.priority = priority
+        self.seq = seq
+        self.future: asyncio.Future = asyncio.get_running_loop().create_future()
+
+    @property
+    def key(self):
+        return self.kind, self.field_name.lower()
+
+    def __repr__(self):
+        value = f" {self.value}" if self.kind == CommandKind.SET else ""
+        return f"<{self.kind.value} {self.field_name}{value} p{self.priority.value}>"
+
+
+class CommandQueue:
+    """
+    Priority queue of device commands served by a single I/O worker.
+
+    At most one command per (kind, field) is pending:
+    a newer set replaces the value of a pending set for the same field (latest wins),
+    and a read of a field that is already queued shares the pending read's result.
+    Commands run by priority, then in submission order.
+    """
+
+    def __init__(self):
+        self._pending: dict[tuple[CommandKind, str], Command] = {}
+        self._wakeup = asyncio.Event()
+        self._seq = itertools.count()
+
+        self.submitted = 0
+        self.executed = 0
+        self.coalesced_sets = 0
+        self.deduplicated_reads = 0
+        self.dropped = 0
+        self.max_depth = 0
+
+    @property
+    def depth(self) -> int:
+        """Number of pending commands."""
+        return len(self._pending)
+
+    def submit(self, kind: CommandKind, field_name: str, value=None, priority=Priority.NORMAL) -> asyncio.Future:
+        """Queue a command and return the future of its result."""
+        self.submitted += 1
+        command = Command(kind, field_name, value, priority, next(self._seq))
+        pending = self._pending.get(command.key)
+        if pending is not None:
+            if kind == CommandKind.SET:
+                pending.value = value
+                self.coalesced_sets += 1
+            else:
+                self.deduplicated_reads += 1
+            pending.priority = min(pending.priority, priority)
+            return pending.future
+
+        self._pending[command.key] = command
+        self.max_depth = max(self.max_depth, len(self._pending))
+        self._wakeup.set()
+        return command.future
+
+    async def get(self) -> Command:
+        """Wait for and remove the next command to run."""
+        while not self._pending:
+            self._wakeup.clear()
+            await self._wakeup.wait()
+
+        command = min(self._pending.values(), key=lambda _: (_.priority, _.seq))
+        del self._pending[command.key]
+        return command
+
+    async def get_batch(self, max_size: int) -> list[Command]:
+        """Wait for the next command and remove it with up to max_size - 1 more, in running order."""
+        first = await self.get()
+        batch = [first] + sorted(self._pending.values(), key=lambda _: (_.priority, _.seq))[: max_size - 1]
+        for command in batch[1:]:
+            del self._pending[command.key]
+        return batch
+
+    def cancel_pending(self, exc: Optional[BaseException] = None):
+        """Drop every pending command, failing its future with exc (or cancelling it)."""
+        self.dropped += len(self._pending)
+        for command in self._pending.values():
+            if command.future.done():
+                continue
+            if exc is None:
+                command.future.cancel()
+            else:
+                command.future.set_exception(exc)
+        self._pending.clear()
+
+    def stats(self) -> dict:
+        """Queue depth and coalescing counters for monitoring."""
+        return {
+            "depth": self.depth,
+            "max_depth": self.max_depth,
+            "submitted": self.submitted,
+            "executed": self.executed,
+            "coalesced_sets": self.coalesced_sets,
+            "deduplicated_reads": self.deduplicated_reads,
+            "dropped": self.dropped,
+        }
@@ -1,27 +1,26 @@
 from typing import Optional
-import logging
 from ..util import env
-from .serial_device import SerialDevice
+from .command_queue import Priority
+from .tasmota_device import TasmotaDevice
 
-logging.basicConfig(level=logging.INFO)
 
-
-class Dimmer(SerialDevice):
+class Dimmer(TasmotaDevice):
     def __init__(
         self,
-        port=env.DEFAULT_PORT,
-        baudrate=env.SERIAL_BAUDRATE,
-        timeout=env.SERIAL_TIMEOUT,
-        dimmer_command=env.PWM_COMMAND,
+        port: Optional[str] = None,
+        baudrate: Optional[int] = None,
+        timeout: Optional[float] = None,
+        dimmer_command: Optional[str] = None,
+        metrics=None,
     ):
-        super().__init__(port=port, baudrate=baudrate, timeout=timeout)
-        self.dimmer_command = dimmer_command
+        super().__init__(port=port, baudrate=baudrate, timeout=timeout, metrics=metrics)
+        self.dimmer_command = env.PWM_COMMAND if dimmer_command is None else dimmer_command
 
     async def read_dimmer_value(self) -> Optional[int]:
         return await self.read_field_value(self.dimmer_command)
 
-    async def set_dimmer_value(self, value):
-        return await self.set_field_value(self.dimmer_command, value)
+    async def set_dimmer_value(self, value, priority=Priority.NORMAL):
+        return await self.set_field_value(self.dimmer_command, value, priority)
 
 
 # async def _main():
@@ -0,0 +1,147 @@
+import asyncio
+import json
+import logging
+from typing import Optional
+from urllib.parse import quote, unquote, urlsplit
+
+from ..util import env
+from .transport import Transport, TransportError, result_field, unknown_command, without_credentials
+
+Connection = tuple[asyncio.StreamReader, asyncio.StreamWriter]
+
+
+class HttpTransport(Transport):
+    """
+    Tasmota web API, GET /cm?cmnd=<command>, over a small pool of keep-alive HTTP/1.1 connections.
+
+    url is http(s)://[user:password@]host[:port][/path]; the credentials are sent as the user and
+    password query parameters Tasmota expects. A batch runs its commands concurrently, one request
+    per pooled connection. A device that answers "Connection: close" gets a new connection per command.
+    """
+
+    name = "http"
+
+    def __init__(self, url: str, pool_size=4, timeout: Optional[float] = None):
+        super().__init__(without_credentials(url))  # the credentials stay out of logs
+        parts = urlsplit(url)
+        self.ssl = parts.scheme == "https"
+        self.host = parts.hostname or "localhost"
+        self.http_port = parts.port or (443 if self.ssl else 80)
+        self.path = parts.path.rstrip("/") + "/cm?cmnd="
+        self.auth = ""
+        if parts.username:
+            self.auth = f"&user={quote(unquote(parts.username))}&password={quote(unquote(parts.password or ''))}"
+        self.pool_size = pool_size
+        self.timeout = env.SERIAL_COMMAND_DEADLINE if timeout is None else timeout  # connect timeout
+        self._slots = asyncio.Semaphore(pool_size)
+        self._idle: list[Connection] = []
+        self._generation = 0  # bumped by abort(); connections of an older generation are not reused
+
+    async def open(self):
+        self.metrics.counter("http_connections_total", "HTTP connections opened")
+        self._idle.append(await self._connect())
+
+    def abort(self):
+        self._generation += 1
+        idle, self._idle = self._idle, []
+        for _, writer in idle:
+            writer.close()
+
+    async def _connect(self) -> Connection:
+        connection = await asyncio.wait_for(
+            asyncio.open_connection(self.host, self.http_port, ssl=self.ssl or None), self.timeout
+        )
+        self.metrics.inc("http_connections_total")
+        return connection
+
+    async def _get(self, command: str) -> Optional[dict]:
+        """GET one command on a pooled connection; a reused connection found closed is retried on another."""
+        generation = self._generation
+        request = (
+            f"GET {self.path}{quote(command)}{self.auth} HTTP/1.1\r\n"
+            f"Host: {self.host}\r\nConnection: keep-alive\r\n\r\n"
+        ).encode()
+        while True:
+            reused = bool(self._idle)
+            try:
+                reader, writer = self._idle.pop() if reused else await self._connect()
+            except Exception as e:
+                raise TransportError(f"Unable to connect to {self.host}:{self.http_port}: {e}") from e
+
+            keep = False
+            try:
+                writer.write(request)
+                await writer.drain()
+                status, keep, body = await self._read_response(reader)
+            except Exception as e:
+                if reused:
+                    continue
+                raise TransportError(f"HTTP request failed: {e}") from e
+            finally:
+                # a cancelled or failed request leaves the connection mid-response
+                if keep and generation == self._generation:
+                    self._idle.append((reader, writer))
+                else:
+                    writer.close()
+
+            if status != 200:
+                raise TransportError(f"HTTP {status} from {self.host}")
+            try:
+                result = json.loads(body)
+            except Exception as e:
+                self.metrics.inc("device_parse_failures_total")
+                logging.debug("Error parsing result: %s %s", type(e), e)
+                return None
+            return result if isinstance(result, dict) else None
+
+    @staticmethod
+    async def _read_response(reader: asyncio.StreamReader) -> tuple[int, bool, bytes]:
+        """Read one response: (status, whether the connection stays open, body)."""
+        status_line = await reader.readline()
+        if not status_line:
+            raise ConnectionError("connection closed")
+        version, status, *_ = status_line.decode("latin-1").split(" ", 2)
+
+        headers = {}
+        while (line := await reader.readline()) not in (b"\r\n", b"\n", b""):
+            name, _, value = line.decode("latin-1").partition(":")
+            headers[name.strip().lower()] = value.strip()
+
+        keep = headers.get("connection", "").lower() != "close" and version != "HTTP/1.0"
+        if "chunked" in headers.get("transfer-encoding", "").lower():
+            chunks = []
+            while size := int((await reader.readline()).split(b";")[0], 16):
+                chunks.append(await reader.readexactly(size))
+                await reader.readline()
+            while (await reader.readline()) not in (b"\r\n", b"\n", b""):  # trailers
+                pass
+            body = b"".join(chunks)
+        elif "content-length" in headers:
+            body = await reader.readexactly(int(headers["content-length"]))
+        else:
+            body, keep = await reader.read(), False
+        return int(status), keep, body
+
+    async def exchange(self, command: str, field_names: tuple, deadline: float) -> dict:
+        async with self._slots:
+            try:
+                result = await asyncio.wait_for(self._get(command), deadline)
+            except asyncio.TimeoutError:
+                return dict.fromkeys(field_names)
+
+        if result is not None and unknown_command(result):
+            return {}
+        return {_: result if result and result_field(result, _) is not None else None for _ in field_names}
+
+    async def exchange_batch(self, commands: dict, deadline: float) -> dict:
+        """The commands as concurrent requests, at most pool_size at a time."""
+        responses = await asyncio.gather(
+            *(self.exchange(command, (field,), deadline) for field, command in commands.items()),
+            return_exceptions=True,
+        )
+        results: dict = {}
+        for field, response in zip(commands, responses):
+            if isinstance(response, BaseException):
+                raise response
+            results[field] = response.get(field)
+        return results
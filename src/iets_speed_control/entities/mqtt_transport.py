@@ -0,0 +1,236 @@
+import asyncio
+import json
+import logging
+import os
+import struct
+from typing import Optional
+from urllib.parse import unquote, urlsplit
+
+from ..util import env
+from .transport import Transport, TransportError, result_field, unknown_command, without_credentials
+
+# MQTT 3.1.1 control packet types (the high nibble of the first byte)
+CONNECT, CONNACK, PUBLISH, SUBSCRIBE, SUBACK, PINGREQ, PINGRESP, DISCONNECT = 1, 2, 3, 8, 9, 12, 13, 14
+
+
+def encode_string(value: str) -> bytes:
+    data = value.encode()
+    return struct.pack("!H", len(data)) + data
+
+
+def encode_packet(packet_type: int, body: bytes = b"", flags: int = 0) -> bytes:
+    """Fixed header (type, flags, variable-length remaining length) followed by body."""
+    header = bytearray([packet_type << 4 | flags])
+    length = len(body)
+    while True:
+        length, byte = divmod(length, 128)
+        header.append(byte | 0x80 if length else byte)
+        if not length:
+            return bytes(header) + body
+
+
+async def read_packet(reader: asyncio.StreamReader) -> tuple[int, int, bytes]:
+    """Read one packet: (type, flags, body). Raises asyncio.IncompleteReadError when the peer closed."""
+    first = (await reader.readexactly(1))[0]
+    length, shift = 0, 0
+    while True:
+        byte = (await reader.readexactly(1))[0]
+        length |= (byte & 0x7F) << shift
+        if not byte & 0x80:
+            break
+        shift += 7
+    return first >> 4, first & 0x0F, await reader.readexactly(length)
+
+
+def publish_packet(topic: str, payload: str) -> bytes:
+    """QoS 0 PUBLISH: no packet id and no acknowledgement."""
+    return encode_packet(PUBLISH, encode_string(topic) + payload.encode())
+
+
+def parse_publish(flags: int, body: bytes) -> tuple[str, bytes]:
+    """Topic and payload of a PUBLISH body; the packet id of QoS 1/2 is skipped."""
+    (length,) = struct.unpack_from("!H", body)
+    topic = body[2 : 2 + length].decode(errors="replace")
+    offset = 2 + length + (2 if flags & 0x06 else 0)
+    return topic, body[offset:]
+
+
+class _Pending:
+    """A command waiting for its RESULT messages."""
+
+    __slots__ = ("unanswered", "results", "future")
+
+    def __init__(self, field_names: tuple, future: asyncio.Future):
+        self.unanswered = list(field_names)
+        self.results: dict = dict.fromkeys(field_names)
+        self.future = future
+
+
+class MqttTransport(Transport):
+    """
+    Tasmota over MQTT: commands are published to cmnd/<topic>/<Command> and answered on stat/<topic>/RESULT.
+
+    url is mqtt://[user:password@]broker[:port]/<topic>. Publishes are QoS 0 and pipelined: a batch goes out
+    back to back in one write, and the RESULT messages are matched in order, each answering the first
+    pending command with an unanswered field it contains.
+    """
+
+    name = "mqtt"
+
+    def __init__(self, url: str, timeout: Optional[float] = None, keepalive: int = 30):
+        super().__init__(without_credentials(url))  # the credentials stay out of logs
+        parts = urlsplit(url)
+        self.host = parts.hostname or "localhost"
+        self.mqtt_port = parts.port or 1883
+        self.username = unquote(parts.username) if parts.username else None
+        self.password = unquote(parts.password) if parts.password else None
+        self.topic = parts.path.strip("/")
+        if not self.topic:
+            raise ValueError(f"No device topic in {url}; use mqtt://broker/<topic>")
+        self.timeout = env.SERIAL_COMMAND_DEADLINE if timeout is None else timeout  # connect timeout
+        self.keepalive = keepalive
+        self.client_id = f"iets-speed-control-{os.getpid()}-{id(self):x}"
+        self._reader: Optional[asyncio.StreamReader] = None
+        self._writer: Optional[asyncio.StreamWriter] = None
+        self._tasks: list[asyncio.Task] = []
+        self._pending: list[_Pending] = []
+
+    @property
+    def result_topic(self) -> str:
+        return f"stat/{self.topic}/RESULT"
+
+    async def open(self):
+        try:
+            await asyncio.wait_for(self._handshake(), self.timeout)
+        except Exception:
+            self.abort()
+            raise
+        self._tasks = [
+            asyncio.create_task(self._read_loop(), name=f"mqtt-read-{self.topic}"),
+            asyncio.create_task(self._ping_loop(), name=f"mqtt-ping-{self.topic}"),
+        ]
+
+    async def _handshake(self):
+        self._reader, self._writer = await asyncio.open_connection(self.host, self.mqtt_port)
+        flags = 0x02  # clean session
+        payload = encode_string(self.client_id)
+        if self.username is not None:
+            flags |= 0x80
+            payload += encode_string(self.username)
+            if self.password is not None:
+                flags |= 0x40
+                payload += encode_string(self.password)
+        self._writer.write(
+            encode_packet(CONNECT, encode_string("MQTT") + struct.pack("!BBH", 4, flags, self.keepalive) + payload)
+        )
+        packet_type, _, body = await read_packet(self._reader)
+        if packet_type != CONNACK or len(body) < 2 or body[1]:
+            raise TransportError(f"MQTT broker refused the connection (return code {body[1] if body[1:] else '?'})")
+
+        self._writer.write(encode_packet(SUBSCRIBE, struct.pack("!H", 1) + encode_string(self.result_topic) + b"\0", 2))
+        while (await read_packet(self._reader))[0] != SUBACK:
+            pass
+
+    def abort(self):
+        tasks, self._tasks = self._tasks, []
+        for task in tasks:
+            if task is not asyncio.current_task():
+                task.cancel()
+        if self._writer:
+            writer, self._writer = self._writer, None
+            writer.close()
+        self._fail_pending(TransportError("connection closed"))
+
+    async def close(self):
+        if self._writer:
+            try:
+                self._writer.write(encode_packet(DISCONNECT))
+                await self._writer.drain()
+            except Exception as e:
+                logging.debug("Error disconnecting from %s: %s", self.port, e)
+        self.abort()
+
+    def _fail_pending(self, error: Exception):
+        pending, self._pending = self._pending, []
+        for _ in pending:
+            if not _.future.done():
+                _.future.set_exception(error)
+
+    async def _read_loop(self):
+        try:
+            while True:
+                packet_type, flags, body = await read_packet(self._reader)
+                if packet_type == PUBLISH:
+                    self._on_publish(*parse_publish(flags, body))
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logging.debug("MQTT connection to %s closed: %s", self.port, e)
+            self._fail_pending(TransportError(f"MQTT connection closed: {e}"))
+
+    async def _ping_loop(self):
+        while self._writer:
+            await asyncio.sleep(self.keepalive / 2)
+            if self._writer:
+                self._writer.write(encode_packet(PINGREQ))
+
+    def _on_publish(self, topic: str, payload: bytes):
+        line = payload.decode(errors="replace")
+        try:
+            result = json.loads(line)
+        except Exception as e:
+            self.metrics.inc("device_parse_failures_total")
+            logging.debug("Error parsing result: %s %s", type(e), e)
+            return
+        if not isinstance(result, dict):
+            return
+
+        if unknown_command(result):
+            pending = next((_ for _ in self._pending if not _.future.done()), None)
+            if pending:
+                pending.results = {}
+                pending.future.set_result(None)
+                return
+        for pending in self._pending:
+            field_name = next((_ for _ in pending.unanswered if result_field(result, _) is not None), None)
+            if field_name is not None:
+                pending.results[field_name] = result
+                pending.unanswered.remove(field_name)
+                if not pending.unanswered:
+                    pending.future.set_result(None)
+                return
+        self._on_device_line(f"{topic} {line}")
+
+    async def _send(self, requests: list[tuple[str, tuple]], deadline: float) -> list[dict]:
+        """Publish the commands back to back and wait up to deadline for all of their RESULTs."""
+        if not self._writer or not self._tasks or self._tasks[0].done():
+            raise TransportError("not connected to the MQTT broker")
+
+        loop = asyncio.get_running_loop()
+        pending = []
+        for command, field_names in requests:
+            name, _, argument = command.partition(" ")
+            pending.append(_Pending(field_names, loop.create_future()))
+            self._writer.write(publish_packet(f"cmnd/{self.topic}/{name}", argument))
+        self._pending.extend(pending)
+        try:
+            await self._writer.drain()
+            await asyncio.wait([_.future for _ in pending], timeout=deadline)
+        except Exception as e:
+            raise TransportError(f"MQTT publish failed: {e}") from e
+        finally:
+            for _ in pending:
+                if _ in self._pending:
+                    self._pending.remove(_)
+
+        errors = [_.future.exception() for _ in pending if _.future.done()]
+        if any(errors):
+            raise next(_ for _ in errors if _)
+        return [_.results for _ in pending]
+
+    async def exchange(self, command: str, field_names: tuple, deadline: float) -> dict:
+        return (await self._send([(command, field_names)], deadline))[0]
+
+    async def exchange_batch(self, commands: dict, deadline: float) -> dict:
+        results = await self._send([(command, (field,)) for field, command in commands.items()], deadline)
+        return {field: result.get(field) for field, result in zip(commands, results)}
@@ -2,134 +2,201 @@ import asyncio
 import json
 import re
 import logging
-from typing import Optional
-
-import aioserial
-from serial.serialutil import SerialException
+from functools import partial
+from typing import TYPE_CHECKING, Optional
 
 from ..util import env
+from ..util.metrics import Metrics
+from .tasmota_device import ConnectionState, TasmotaDevice, require_connection  # noqa: F401 re-exported
+from .transport import Transport, TransportError, result_field, unknown_command
 
-logging.basicConfig(level=logging.INFO)
-
+if TYPE_CHECKING:
+    import aioserial
 
-def require_connection(func):
-    async def wrapper(self, *args, **kwargs):
-        if not self.connected:
-            await self.connect()
-        if not self.connected:
-            logging.error("Connection not established.")
-            return None
+RESULT_RE = re.compile(r"RESULT = (\{.*\})")
 
-        return await func(self, *args, **kwargs)
 
-    return wrapper
+class SerialTransport(Transport):
+    """Tasmota console over a USB serial port; RESULT lines are picked out of the device output."""
 
+    name = "serial"
+    discoverable = True
 
-class SerialDevice:
     def __init__(
         self,
-        port=env.DEFAULT_PORT,
-        baudrate=env.SERIAL_BAUDRATE,
-        timeout=env.SERIAL_TIMEOUT,
+        port: str,
+        baudrate: Optional[int] = None,
+        timeout: Optional[float] = None,
+        framing: Optional[bool] = None,
     ):
-        self.port = port
-        self.baudrate = baudrate
-        self.timeout = timeout
-        self.serial: Optional[aioserial.AioSerial] = None
-
-    async def __aenter__(self):
-        await self.connect()
-        return self
-
-    async def __aexit__(self, exc_type, exc_value, traceback):
-        await self.disconnect()
-
-    @property
-    def connected(self):
-        output = self.serial and self.serial.is_open and not self.serial.closed
-        if output:
-            try:
-                _ = self.serial.in_waiting  # type: ignore[union-attr]
-            except SerialException as e:
-                if "Access is denied" in str(e):
-                    return False
-
-        return output
-
-    async def connect(self):
-        if not self.connected:
-            try:
-                self.serial = aioserial.AioSerial(
-                    port=self.port,
-                    baudrate=self.baudrate,
-                    write_timeout=self.timeout,
-                    timeout=self.timeout,
-                )
-                logging.info(f"Connected to {self.port}")
-            except Exception as e:
-                logging.error(f"Error: Unable to connect to {self.port}. {e}")
-                return False
-        return True
-
-    async def disconnect(self):
-        if self.connected and self.serial:
-            self.serial.close()
-            logging.info(f"Disconnected from {self.port}")
+        super().__init__(port)
+        # None: the value from the settings
+        self.baudrate = env.SERIAL_BAUDRATE if baudrate is None else baudrate
+        self.timeout = env.SERIAL_TIMEOUT if timeout is None else timeout
+        self.framing = env.SERIAL_RESPONSE_FRAMING if framing is None else framing
+        self.serial: Optional["aioserial.AioSerial"] = None
+
+    async def open(self):
+        # the serial stack is imported only when a port is opened
+        import aioserial
+
+        # opening can block for a while on a half-present USB device
+        opening = asyncio.get_running_loop().run_in_executor(
+            None,
+            partial(
+                aioserial.AioSerial,
+                port=self.port,
+                baudrate=self.baudrate,
+                write_timeout=self.timeout,
+                timeout=self.timeout,
+            ),
+        )
+        try:
+            self.serial = await asyncio.shield(opening)
+        except asyncio.CancelledError:
+            # the worker thread can't be stopped: close the port once it's open, or it stays held until GC
+            opening.add_done_callback(self._close_unused)
+            raise
+
+    def _close_unused(self, opening: asyncio.Future):
+        if opening.cancelled() or opening.exception() is not None:
+            return
+        try:
+            opening.result().close()
+        except Exception as e:
+            logging.debug("Error closing %s: %s", self.port, e)
 
-    @require_connection
-    async def send_command(self, command):
+    def abort(self):
         if self.serial:
+            serial, self.serial = self.serial, None
             try:
-                await self.serial.write_async((command + "\n").encode())
-                await asyncio.sleep(0.1)  # Wait for the command to be processed
+                serial.close()
             except Exception as e:
-                logging.error(f"Error sending command: {e}")
+                logging.debug("Error closing %s: %s", self.port, e)
 
-    @require_connection
-    async def _read_line(self):
-        if self.serial:
-            try:
-                return (await self.serial.read_until_async()).decode()
-            # .strip()
-            except Exception as e:
-                logging.error(f"Error reading line: {e}")
-        return ""
+    def _parse_result(self, line) -> Optional[dict]:
+        match = RESULT_RE.search(line)
+        if not match:
+            return None
 
-    async def _read_results(self):
-        lines = []
-        while True:
+        try:
+            result = json.loads(match.group(1))
+        except Exception as e:
+            self.metrics.inc("device_parse_failures_total")
+            logging.debug("Error parsing result: %s %s", type(e), e)
+            return None
+        return result if isinstance(result, dict) else None
+
+    async def _write(self, command):
+        if not self.serial:
+            raise TransportError("port is closed")
+        try:
+            await self.serial.write_async((command + "\n").encode())
+        except Exception as e:
+            raise TransportError(f"Error sending command: {e}") from e
+
+    async def _read_line(self) -> str:
+        if not self.serial:
+            raise TransportError("port is closed")
+        try:
+            return (await self.serial.read_until_async()).decode(errors="replace").strip()
+        except Exception as e:
+            raise TransportError(f"Error reading line: {e}") from e
+
+    async def _drain_input(self):
+        """
+        Pass the device output received but not read yet to _on_device_line(), so it's neither lost
+        nor taken as the response to the next command. A line cut short is read to its end.
+        """
+        if not self.serial:
+            return
+        try:
+            pending = self.serial.in_waiting
+            data = self.serial.read(pending) if pending else b""
+        except Exception as e:
+            raise TransportError(f"Error reading pending output: {e}") from e
+        if not data:
+            return
+        lines = data.decode(errors="replace").split("\n")
+        if lines[-1]:
+            lines[-1] += await self._read_line()
+        for line in (_.strip() for _ in lines):
+            if line:
+                self._on_device_line(line)
+
+    async def exchange(self, command: str, field_names: tuple, deadline: float) -> dict:
+        """
+        Each RESULT line answers the first unanswered field it contains; any other device output
+        read meanwhile is passed to _on_device_line().
+        """
+        if not self.framing:
+            return await self._exchange_unframed(command, field_names)
+
+        await self._drain_input()
+        await self._write(command)
+
+        loop = asyncio.get_running_loop()
+        results: dict = dict.fromkeys(field_names)
+        unanswered = list(field_names)
+        deadline = loop.time() + deadline
+        while unanswered and loop.time() < deadline:
             line = await self._read_line()
             if not line:
-                break
+                continue
 
-            lines.append(line)
-        results = [_.strip() for _ in lines if "RESULT" in _]
-        results = [re.sub(".*RESULT = ", "", _) for _ in results]
-        output = []
-        for result in results:
-            try:
-                output.append(json.loads(result))
-            except Exception as e:
-                logging.debug(f"Error parsing result: {type(e)} {str(e)}")
+            result = self._parse_result(line)
+            if result is not None and unknown_command(result):
+                return {}
+            field_name = next((_ for _ in unanswered if result and result_field(result, _) is not None), None)
+            if field_name is None:
+                self._on_device_line(line)
                 continue
 
-        return output
+            results[field_name] = result
+            unanswered.remove(field_name)
+        return results
+
+    async def _exchange_unframed(self, command: str, field_names: tuple) -> dict:
+        """Legacy exchange: write, wait a fixed 100 ms and read until the port is quiet."""
+        await self._write(command)
+        await asyncio.sleep(0.1)  # Wait for the command to be processed
+
+        results: dict = dict.fromkeys(field_names)
+        unanswered = list(field_names)
+        while line := await self._read_line():
+            result = self._parse_result(line)
+            if result is None or not unanswered:
+                self._on_device_line(line)
+                continue
+            if unknown_command(result):
+                return {}
+            results[unanswered.pop(0)] = result
+        return results
 
-    async def read_command_result(self):
-        results = await self._read_results()
-        if not results:
-            return
+    async def exchange_batch(self, commands: dict, deadline: float) -> dict:
+        """One Backlog0 command (no delay between its commands); firmware without it answers 'unknown'."""
+        if not self.framing:
+            return {}
+        return await self.exchange(f"Backlog0 {'; '.join(commands.values())}", tuple(commands), deadline)
 
-        return results[0]
 
-    async def read_field_value(self, field_name) -> Optional[int]:
-        await self.send_command(field_name)
-        result = await self.read_command_result()
-        return result.get(field_name, None) if result else None
+class SerialDevice(TasmotaDevice):
+    """A Tasmota device on a serial port, whatever the port name looks like."""
 
-    async def set_field_value(self, field_name, value):
-        await self.send_command(f"{field_name} {value}")
-        # await asyncio.sleep(0.1)
+    def __init__(
+        self,
+        port: Optional[str] = None,
+        baudrate: Optional[int] = None,
+        timeout: Optional[float] = None,
+        framing: Optional[bool] = None,
+        deadline: Optional[float] = None,
+        metrics: Optional[Metrics] = None,
+        lost_after: Optional[int] = None,
+    ):
+        transport = SerialTransport(
+            env.DEFAULT_PORT if port is None else port, baudrate=baudrate, timeout=timeout, framing=framing
+        )
+        super().__init__(deadline=deadline, metrics=metrics, lost_after=lost_after, transport=transport)
 
 
 async def main():
@@ -0,0 +1,357 @@
+import asyncio
+import logging
+from enum import Enum
+from typing import Callable, Optional
+
+from ..util import env
+from ..util.metrics import Metrics
+from .command_queue import CommandKind, CommandQueue, Priority
+from .transport import Transport, TransportError, create_transport, result_field
+
+
+class ConnectionState(Enum):
+    """Health of the device link, updated from the outcome of real I/O."""
+
+    DISCONNECTED = "disconnected"  # not opened yet or closed on purpose
+    CONNECTING = "connecting"
+    HEALTHY = "healthy"
+    DEGRADED = "degraded"  # open, but the last command(s) got no response
+    LOST = "lost"  # I/O failed or the device stopped answering; the link is closed
+
+
+def require_connection(func):
+    async def wrapper(self, *args, **kwargs):
+        # Only a device that was never opened connects inline; a lost one is reconnected by its owner
+        if self.state == ConnectionState.DISCONNECTED:
+            await self.connect()
+        if not self.connected:
+            logging.debug("Connection not established.")
+            return None
+
+        return await func(self, *args, **kwargs)
+
+    return wrapper
+
+
+class TasmotaDevice:
+    """
+    A Tasmota device behind any Transport (serial, HTTP, MQTT).
+
+    Keeps the connection state, serves the command queue from one I/O worker and
+    reads/sets fields; the transport picked from the port only moves the commands.
+    """
+
+    def __init__(
+        self,
+        port: Optional[str] = None,
+        baudrate: Optional[int] = None,
+        timeout: Optional[float] = None,
+        framing: Optional[bool] = None,
+        deadline: Optional[float] = None,
+        metrics: Optional[Metrics] = None,
+        lost_after: Optional[int] = None,
+        transport: Optional[Transport] = None,
+    ):
+        # None: the value from the settings
+        self.transport = transport or create_transport(
+            env.DEFAULT_PORT if port is None else port, baudrate=baudrate, timeout=timeout, framing=framing
+        )
+        self.deadline = env.SERIAL_COMMAND_DEADLINE if deadline is None else deadline
+        self.lost_after = env.SERIAL_LOST_AFTER if lost_after is None else lost_after
+        self.backlog: Optional[bool] = None if env.SERIAL_BACKLOG else False  # None: not known yet
+        self.batch_size = 8
+        self.state = ConnectionState.DISCONNECTED
+        self.failures = 0  # consecutive commands without a response
+        self.state_listeners: list[Callable[[ConnectionState], None]] = []  # e.g. one per channel
+        self._connect_lock = asyncio.Lock()
+        self.queue = CommandQueue()
+        self._worker: Optional[asyncio.Task] = None
+
+        self.metrics = metrics or Metrics()
+        self.transport.metrics = self.metrics
+        transport_label = {"transport": self.transport.name}
+        self.metrics.histogram("device_roundtrip_seconds", "Command round-trip time", transport_label)
+        self.metrics.counter(
+            "device_timeouts_total", "Commands without a response before the deadline", labels=transport_label
+        )
+        self.metrics.counter(
+            "device_parse_failures_total", "RESULT lines that are not valid JSON", labels=transport_label
+        )
+        self.metrics.counter("device_errors_total", "Link read/write errors", labels=transport_label)
+        self.metrics.counter("device_connects_total", "Successful link opens", labels=transport_label)
+        self.metrics.counter(
+            "device_lost_total", "Connections lost to I/O errors or a silent device", labels=transport_label
+        )
+
+        # the command queue keeps its own counts; they are read when the metrics are rendered
+        queue = self.queue
+        self.metrics.gauge("device_queue_depth", "Commands waiting for the I/O worker", lambda: queue.depth)
+        self.metrics.gauge(
+            "device_queue_max_depth", "Most commands waiting for the I/O worker at once", lambda: queue.max_depth
+        )
+        self.metrics.counter("device_commands_total", "Commands submitted to the I/O worker", lambda: queue.submitted)
+        self.metrics.counter("device_commands_executed_total", "Commands run by the I/O worker", lambda: queue.executed)
+        self.metrics.counter(
+            "device_sets_coalesced_total",
+            "Sets merged into a pending set of the same field",
+            lambda: queue.coalesced_sets,
+        )
+        self.metrics.counter(
+            "device_reads_deduplicated_total",
+            "Reads answered by a pending read of the same field",
+            lambda: queue.deduplicated_reads,
+        )
+        self.metrics.counter(
+            "device_commands_dropped_total",
+            "Queued commands dropped when the I/O worker stopped",
+            lambda: queue.dropped,
+        )
+
+    async def __aenter__(self):
+        await self.connect()
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        await self.disconnect()
+
+    @property
+    def port(self) -> str:
+        """Serial port or URL of the device."""
+        return self.transport.port
+
+    @port.setter
+    def port(self, value: str):
+        self.transport.port = value
+
+    @property
+    def connected(self) -> bool:
+        """Whether the link is open and usable; no I/O, just the state."""
+        return self.state in (ConnectionState.HEALTHY, ConnectionState.DEGRADED)
+
+    def _set_state(self, state: ConnectionState):
+        if state == self.state:
+            return
+        previous, self.state = self.state, state
+        logging.debug("%s: connection %s -> %s", self.port, previous.value, state.value)
+        for listener in self.state_listeners:
+            listener(state)
+
+    def _io_ok(self):
+        self.failures = 0
+        self._set_state(ConnectionState.HEALTHY)
+
+    def _io_timeout(self):
+        """A command got no response: degraded, and lost after lost_after in a row."""
+        self.failures += 1
+        if self.lost_after and self.failures >= self.lost_after:
+            self._lose(f"{self.failures} commands without a response")
+        else:
+            self._set_state(ConnectionState.DEGRADED)
+
+    def _lose(self, reason):
+        if not self.connected:
+            return
+        logging.warning("Connection to %s lost: %s", self.port, reason)
+        self.metrics.inc("device_lost_total")
+        self.transport.abort()
+        self._set_state(ConnectionState.LOST)
+
+    async def connect(self):
+        async with self._connect_lock:  # the owners of several channels may reconnect at once
+            return await self._connect()
+
+    async def _connect(self):
+        if not self.connected:
+            self._set_state(ConnectionState.CONNECTING)
+            try:
+                await self.transport.open()
+            except asyncio.CancelledError:
+                self.transport.abort()  # don't leave a half-opened link behind
+                self._set_state(ConnectionState.DISCONNECTED)
+                raise
+            except Exception as e:
+                logging.error("Error: Unable to connect to %s. %s", self.port, e)
+                self.transport.abort()
+                self._set_state(ConnectionState.LOST)
+                return False
+            self.metrics.inc("device_connects_total")
+            logging.info(f"Connected to {self.port}")
+            self.failures = 0
+            self._set_state(ConnectionState.HEALTHY)
+        return True
+
+    async def disconnect(self):
+        was_connected = self.connected
+        await self.transport.close()
+        self._set_state(ConnectionState.DISCONNECTED)
+        if was_connected:
+            logging.info(f"Disconnected from {self.port}")
+
+    _result_field = staticmethod(result_field)
+
+    async def request(self, command, field_name) -> Optional[dict]:
+        """
+        Send a command and return the RESULT JSON that contains field_name.
+
+        Returns as soon as the response arrives; self.deadline is only a fallback for a silent device.
+        """
+        results = await self.request_fields(command, (field_name,))
+        return results.get(field_name) if results else None
+
+    @require_connection
+    async def request_fields(self, command, field_names) -> Optional[dict]:
+        """
+        Send a command answered by one RESULT per field, e.g. a Backlog, and return {field: RESULT JSON}.
+
+        Fields still unanswered at the deadline are None. Returns {} when the device doesn't know
+        the command and None when it can't be sent.
+        """
+        field_names = tuple(field_names)
+        return await self._exchange(command, self.transport.exchange(command, field_names, self.deadline), field_names)
+
+    @require_connection
+    async def _request_batch(self, commands: dict) -> Optional[dict]:
+        description = "; ".join(commands.values())
+        return await self._exchange(description, self.transport.exchange_batch(commands, self.deadline), commands)
+
+    async def _exchange(self, command, exchange, field_names) -> Optional[dict]:
+        """Await an exchange and update the connection state from its outcome."""
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        try:
+            results = await exchange
+        except TransportError as e:
+            self.metrics.inc("device_errors_total")
+            logging.error("Error in '%s' with %s: %s", command, self.port, e)
+            self._lose(e)
+            return None
+
+        if results is None:
+            return None
+        if not results:  # the device answered that it doesn't know the command
+            self._io_ok()
+            return results
+        if all(results.get(_) is not None for _ in field_names):
+            self.metrics.observe("device_roundtrip_seconds", loop.time() - started)
+            self._io_ok()
+        else:
+            self.metrics.inc("device_timeouts_total")
+            logging.warning("No response to '%s' from %s within %ss", command, self.port, self.deadline)
+            self._io_timeout()
+        return results
+
+    async def batch(self, fields: dict) -> dict:
+        """
+        Read and set several fields in one round-trip: {field: value to set, or None to read}.
+
+        Returns {field: value reported by the device, None when unanswered}. Goes through the I/O worker
+        when it runs, so the batch is ordered with the other queued commands.
+        """
+        if self.worker_running:
+            futures = {
+                field: self.queue.submit(CommandKind.READ if value is None else CommandKind.SET, field, value)
+                for field, value in fields.items()
+            }
+            return {field: await asyncio.shield(future) for field, future in futures.items()}
+        return await self._batch(fields)
+
+    async def _batch(self, fields: dict) -> dict:
+        """
+        Run {field: value or None} in as few round-trips as the transport allows
+        (one Backlog0 over serial, concurrent requests over HTTP, pipelined publishes over MQTT).
+
+        When the transport or the firmware can't batch, it and every later batch
+        falls back to one exchange per field.
+        """
+        if len(fields) > 1 and self.backlog is not False:
+            commands = {field: field if value is None else f"{field} {value}" for field, value in fields.items()}
+            results = await self._request_batch(commands)
+            if results is None:
+                return dict.fromkeys(fields)
+            if results:
+                if any(results.values()):
+                    self.backlog = True
+                return {field: result_field(result, field) if result else None for field, result in results.items()}
+            logging.info("%s can't batch commands; sending them one by one", self.port)
+            self.backlog = False
+
+        values = {}
+        for field, value in fields.items():
+            if value is None:
+                values[field] = await self._read_field_value(field)
+            else:
+                values[field] = await self._set_field_value(field, value)
+        return values
+
+    @property
+    def worker_running(self) -> bool:
+        return self._worker is not None and not self._worker.done()
+
+    def start_worker(self):
+        """Start the task that owns the link and serves self.queue."""
+        if not self.worker_running:
+            self._worker = asyncio.create_task(self._io_worker(), name=f"device-io-{self.port}")
+
+    async def stop_worker(self):
+        """Stop the I/O worker and cancel the commands still queued."""
+        if self._worker is None:
+            return
+
+        worker, self._worker = self._worker, None
+        worker.cancel()
+        try:
+            await worker
+        except asyncio.CancelledError:
+            pass
+        self.queue.cancel_pending()
+
+    async def _io_worker(self):
+        while True:
+            # Everything queued meanwhile goes out as one batch, unless the transport or firmware can't
+            commands = await self.queue.get_batch(1 if self.backlog is False else self.batch_size)
+            try:
+                if len(commands) > 1:
+                    fields: dict = {}
+                    for command in commands:  # a set and a read of one field: the set answers both
+                        if command.kind == CommandKind.SET or command.field_name not in fields:
+                            fields[command.field_name] = command.value if command.kind == CommandKind.SET else None
+                    values = await self._batch(fields)
+                    results = [values.get(_.field_name) for _ in commands]
+                elif commands[0].kind == CommandKind.SET:
+                    results = [await self._set_field_value(commands[0].field_name, commands[0].value)]
+                else:
+                    results = [await self._read_field_value(commands[0].field_name)]
+            except asyncio.CancelledError:
+                for command in commands:
+                    command.future.cancel()
+                raise
+            except Exception as e:
+                logging.error("Error executing %s: %s", commands, e)
+                results = [None] * len(commands)
+
+            self.queue.executed += len(commands)
+            for command, result in zip(commands, results):
+                if not command.future.done():
+                    command.future.set_result(result)
+
+    async def _submit(self, kind, field_name, value=None, priority=Priority.NORMAL):
+        # shield: a cancelled caller must not cancel a result shared with other callers
+        return await asyncio.shield(self.queue.submit(kind, field_name, value, priority))
+
+    async def read_field_value(self, field_name) -> Optional[int]:
+        if self.worker_running:
+            return await self._submit(CommandKind.READ, field_name)
+        return await self._read_field_value(field_name)
+
+    async def set_field_value(self, field_name, value, priority=Priority.NORMAL):
+        if self.worker_running:
+            return await self._submit(CommandKind.SET, field_name, value, priority)
+        return await self._set_field_value(field_name, value)
+
+    async def _read_field_value(self, field_name) -> Optional[int]:
+        result = await self.request(field_name, field_name)
+        return result_field(result, field_name) if result else None
+
+    async def _set_field_value(self, field_name, value):
+        result = await self.request(f"{field_name} {value}", field_name)
+        return result_field(result, field_name) if result else None
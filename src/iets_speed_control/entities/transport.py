@@ -0,0 +1,105 @@
+import logging
+from ..util.metrics import Metrics
+
+device_log = logging.getLogger("tasmota")
+
+
+class TransportError(Exception):
+    """The link to the device failed; it has to be opened again."""
+
+
+def result_field(result: dict, field_name: str):
+    """Value of field_name in a RESULT JSON, compared case-insensitively like Tasmota does."""
+    field_name = field_name.lower()
+    for key, value in result.items():
+        if key.lower() == field_name:
+            return value
+    return None
+
+
+def unknown_command(result: dict) -> bool:
+    return str(result.get("Command", "")).lower() == "unknown"
+
+
+def is_url(port: str) -> bool:
+    return "://" in port
+
+
+def without_credentials(url: str) -> str:
+    """url with the user:password@ part removed, for logs and status."""
+    scheme, _, rest = url.partition("://")
+    host, slash, path = rest.partition("/")
+    return f"{scheme}://{host.rpartition('@')[2]}{slash}{path}"
+
+
+class Transport:
+    """
+    Carries Tasmota commands to a device and brings back their RESULT JSON.
+
+    A transport only moves bytes; TasmotaDevice on top of it keeps the connection state,
+    the command queue and the field semantics, so Dimmer works the same over any of them.
+    """
+
+    name = "base"
+    discoverable = False  # whether the port can be found again by a USB scan
+
+    def __init__(self, port: str):
+        self.port = port
+        self.metrics = Metrics()  # the device replaces it with its own
+
+    async def open(self):
+        """Open the link; raises when the device can't be reached."""
+        raise NotImplementedError
+
+    def abort(self):
+        """Drop the link at once, without a goodbye; used when I/O failed."""
+
+    async def close(self):
+        """Close the link gracefully."""
+        self.abort()
+
+    async def exchange(self, command: str, field_names: tuple, deadline: float) -> dict:
+        """
+        Send one command and collect the RESULT JSON answering each of field_names.
+
+        Returns {field: RESULT JSON, or None when unanswered within deadline seconds}, and {} when
+        the device doesn't know the command. Raises TransportError when the link fails.
+        """
+        raise NotImplementedError
+
+    async def exchange_batch(self, commands: dict, deadline: float) -> dict:
+        """
+        Run several commands, {field: command}, in as few round-trips as the transport allows.
+
+        Returns like exchange(), with {} when the transport or firmware can't batch;
+        the device then sends the commands one by one.
+        """
+        return {}
+
+    def _on_device_line(self, line):
+        """Handle device output that is not the response to the current command."""
+        device_log.debug(line)
+
+    def __repr__(self):
+        return f"<{type(self).__name__} {self.port}>"
+
+
+def create_transport(port: str, baudrate=None, timeout=None, framing=None) -> Transport:
+    """
+    Transport for a port: a serial port name (COM7, /dev/ttyUSB0), http://[user:password@]host[:port]
+    for the Tasmota web API, or mqtt://[user:password@]broker[:port]/topic for Tasmota over MQTT.
+    """
+    if port.startswith(("http://", "https://")):
+        from .http_transport import HttpTransport
+
+        return HttpTransport(port, timeout=timeout)
+    if port.startswith("mqtt://"):
+        from .mqtt_transport import MqttTransport
+
+        return MqttTransport(port)
+    if is_url(port):
+        raise ValueError(f"Unsupported transport: {port}. Use a serial port, http://host or mqtt://broker/topic")
+
+    from .serial_device import SerialTransport
+
+    return SerialTransport(port, baudrate=baudrate, timeout=timeout, framing=framing)
@@ -1,15 +1,22 @@
 """CLI entrypoint for IETS Speed Control."""
 
+import argparse
 import asyncio
+import json
 import logging
+import sys
 
-from ..controller import SpeedController
+from ..controller import create_controller
+from ..util import env
+from ..util.logger import logger_setup
+from ..util.metrics import MetricsServer
 
 
-async def _cli():
-    """Run the CLI control loop with retry on disconnect."""
-    controller = SpeedController()
+async def _cli(daemon=False):
+    """Run the CLI control loop with retry on disconnect; with daemon, also serve the control API."""
+    controller = create_controller()
     initial = True
+    api_server = None
 
     def on_status(connected, running):
         nonlocal initial
@@ -22,26 +29,142 @@ async def _cli():
             logging.info(f"No device connected. CPU: {controller.cpu_temp}, GPU: {controller.gpu_temp}")
 
     controller.set_callbacks(on_status_change=on_status)
+    from ..util.profiler import Profiler, install_signal_handler
+
+    profiler = Profiler(env.PROFILE_DIR, env.PROFILE_SECONDS, env.PROFILE_MODE)
+    loop = asyncio.get_running_loop()
+    signal_name = install_signal_handler(lambda: loop.call_soon_threadsafe(profiler.start_capture))
+    if signal_name:
+        logging.debug(f"Send {signal_name} to profile for {profiler.seconds:g} s")
+    if daemon:
+        from ..api import ApiServer
+
+        api_server = ApiServer(
+            controller, env.API_SOCKET, env.API_PORT, max_rate=env.STATUS_MAX_RATE, profiler=profiler
+        )
+    metrics_server = MetricsServer(controller.metrics_registries, env.METRICS_PORT) if env.METRICS_PORT else None
 
     try:
+        if metrics_server:
+            await metrics_server.start()
+        if api_server:
+            await api_server.start()
         await controller.start()
 
-        # Keep running until cancelled
+        # Keep running until cancelled; the controller reconnects lost devices in the background
         while True:
             await asyncio.sleep(1)
 
-            # Retry logic: if disconnected for too long, wait and retry
-            if not controller.connected:
-                await asyncio.sleep(9)  # Additional wait (total 10s)
-
     except asyncio.CancelledError:
         logging.info("Setting fan to 0")
         await controller.shutdown()
+        if api_server:
+            await api_server.stop()
+        if metrics_server:
+            await metrics_server.stop()
+
+
+def _format_state(state: dict) -> str:
+    status = "Connected" if state["connected"] else "Disconnected"
+    if state["running"]:
+        status += f" ({state['mode'].upper()})"
+    if state["connected"] and state["port"]:
+        status += f" - {state['port']}"
+    lines = [
+        f"{status} | CPU: {state['cpu_temp']}°C | GPU: {state['gpu_temp']}°C | Fan: {state['current_speed']}%",
+    ]
+    if state.get("writes_per_minute"):
+        rates = ", ".join(f"{name} {rate:g}" for name, rate in state["writes_per_minute"].items())
+        lines.append(f"AUTO writes/min: {rates}")
+    for name, device in state.get("devices", {}).items():
+        if device["connected"]:
+            lines.append(
+                f"  {name}: CPU {device['cpu_temp']}°C | GPU {device['gpu_temp']}°C | Fan {device['current_speed']}%"
+            )
+        else:
+            lines.append(f"  {name}: Disconnected")
+    return "\n".join(lines)
+
+
+async def _client(args):
+    """Send one command to the daemon and print the resulting state."""
+    from ..api import ApiClient
+
+    client = ApiClient(env.API_SOCKET, env.API_PORT)
+    try:
+        await client.connect()
+    except OSError as e:
+        raise SystemExit(f"Daemon is not running ({e}); start it with: iets-speed-control daemon")
+
+    try:
+        if args.command == "mode":
+            state = await client.request("mode", mode=args.mode)
+        elif args.command == "speed":
+            state = await client.request("speed", speed=args.speed)
+            if state["mode"] != "manual":
+                state = await client.request("mode", mode="manual")
+        elif args.command == "profile":
+            print("Profiling the daemon...", file=sys.stderr)
+            state = await client.request("profile", seconds=args.seconds, mode=args.mode)
+            print(state["profile"])
+            return
+        elif args.command == "status" and args.watch:
+            client.on_state = lambda _: print(json.dumps(_) if args.json else _format_state(_), flush=True)
+            await client.request("subscribe")
+            await client.wait_closed()
+            return
+        else:
+            state = await client.request(args.command)
+        print(json.dumps(state) if args.json else _format_state(state))
+    except RuntimeError as e:
+        raise SystemExit(f"Daemon error: {e}")
+    finally:
+        await client.close()
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(prog="iets-speed-control", description="Fan speed control for IETS cooler stands")
+    commands = parser.add_subparsers(dest="command")
+    commands.add_parser("run", help="run the control loop in this process (default)")
+    commands.add_parser("daemon", help="run the control loop and serve the local control API")
+
+    status = commands.add_parser("status", help="show the daemon's state")
+    status.add_argument("--watch", action="store_true", help="keep printing state changes")
+    mode = commands.add_parser("mode", help="switch the daemon's control mode")
+    mode.add_argument("mode", choices=("auto", "manual"))
+    speed = commands.add_parser("speed", help="set a manual fan speed on the daemon")
+    speed.add_argument("speed", type=int, choices=range(101), metavar="0-100")
+    commands.add_parser("start", help="start the daemon's control loop")
+    commands.add_parser("stop", help="stop the daemon's control loop (fan to 0)")
+    profile = commands.add_parser("profile", help="profile the daemon and print the path of the profile file")
+    profile.add_argument("--seconds", type=float, help="capture length (PROFILE_SECONDS by default)")
+    profile.add_argument("--mode", choices=("sample", "cprofile"), help="PROFILE_MODE by default")
+    for command in (status, mode, speed):
+        command.add_argument("--json", action="store_true", help="print the raw state")
+    return parser.parse_args(argv)
 
 
 def cli():
     """Main CLI entrypoint."""
-    return asyncio.run(_cli())
+    args = parse_args()
+    settings = env.configure()
+    logger_setup(
+        settings.verbose,
+        log_file=settings.log_file,
+        json_format=settings.log_json,
+        max_bytes=settings.log_max_bytes,
+        backups=settings.log_backups,
+        repeat_interval=settings.log_repeat_interval,
+    )
+    logging.debug(f"env verbose: {settings.verbose}")
+    if args.command in (None, "run", "daemon"):
+        return asyncio.run(_cli(daemon=args.command == "daemon"))
+    args.json = getattr(args, "json", False)
+    args.watch = getattr(args, "watch", False)
+    try:
+        return asyncio.run(_client(args))
+    except KeyboardInterrupt:
+        pass
 
 
 if __name__ == "__main__":
@@ -8,19 +8,21 @@ import asyncio
 import logging
 import threading
 from pathlib import Path
-from typing import Optional, Callable
+from typing import TYPE_CHECKING, Optional, Callable
 
 import customtkinter as ctk
-from PIL import Image
-import pystray
-from pystray import MenuItem as Item
 
-from ..controller import Mode, SpeedController  # type: ignore[unresolved-import]
+from ..api import RemoteController, daemon_running  # type: ignore[unresolved-import]
+from ..controller import Mode, MultiSpeedController, SpeedController, StatusSnapshot, create_controller  # type: ignore[unresolved-import]
 from ..util import env  # type: ignore[unresolved-import]
+from ..util.logger import logger_setup  # type: ignore[unresolved-import]
+from ..util.metrics import MetricsServer  # type: ignore[unresolved-import]
+from ..util.profiler import Profiler, install_signal_handler  # type: ignore[unresolved-import]
 
-# Configure CustomTkinter
-ctk.set_appearance_mode("dark")
-ctk.set_default_color_theme("blue")
+# Pillow and pystray are imported when the tray icon is created
+if TYPE_CHECKING:
+    import pystray
+    from PIL import Image
 
 APP_NAME = "IETS Speed Control"
 
@@ -28,11 +30,12 @@ APP_NAME = "IETS Speed Control"
 class ControlWindow(ctk.CTkFrame):
     """Main control panel frame."""
 
-    def __init__(self, master, controller: SpeedController, on_exit: Callable, gui_app: "GUIApp" = None):
+    def __init__(self, master, controller: SpeedController | MultiSpeedController | RemoteController, on_exit: Callable, gui_app: "GUIApp" = None):
         super().__init__(master)
         self.controller = controller
         self.on_exit = on_exit
         self.gui_app = gui_app
+        self.device_labels: dict[str, ctk.CTkLabel] = {}
 
         self._build_ui()
         self._setup_callbacks()
@@ -77,6 +80,23 @@ class ControlWindow(ctk.CTkFrame):
         )
         self.status_label.pack(pady=5)
 
+        self.metrics_label = ctk.CTkLabel(
+            status_frame, text="", font=("", 10), text_color="gray"
+        )
+        self.metrics_label.pack(pady=(0, 5))
+
+        self.sparkline_label = ctk.CTkLabel(
+            status_frame, text="", font=("", 10), text_color="gray"
+        )
+        self.sparkline_label.pack(pady=(0, 5))
+
+        # Per-device status
+        if isinstance(self.controller, MultiSpeedController):
+            for name in self.controller.controllers:
+                label = ctk.CTkLabel(status_frame, text=f"{name}: --", font=("", 11))
+                label.pack(pady=1)
+                self.device_labels[name] = label
+
         # Temperature display
         temp_frame = ctk.CTkFrame(self)
         temp_frame.grid(row=2, column=0, padx=10, pady=5, sticky="ew")
@@ -127,13 +147,36 @@ class ControlWindow(ctk.CTkFrame):
         exit_btn.grid(row=4, column=0, padx=10, pady=20)
 
     def _setup_callbacks(self):
-        """Setup controller callbacks."""
-        self.controller.set_callbacks(
-            on_status_change=self._on_status_change,
-            on_temps_change=self._on_temps_change,
-            on_speed_change=self._on_speed_change,
+        """Subscribe to status snapshots; changes are merged to at most STATUS_MAX_RATE updates per second."""
+        self._snapshot: Optional[StatusSnapshot] = None
+        self.subscription = self.controller.publisher.subscribe(
+            self._on_snapshot, max_rate=env.STATUS_MAX_RATE
         )
 
+    def _on_snapshot(self, snapshot: StatusSnapshot):
+        """Hop a published snapshot from the event loop thread onto the Tk thread."""
+        self.after(0, self._apply_snapshot, snapshot)
+
+    def _apply_snapshot(self, snapshot: StatusSnapshot):
+        """Update only the widgets whose values changed."""
+        previous, self._snapshot = self._snapshot, snapshot
+        if previous is None or (snapshot.connected, snapshot.running, snapshot.mode, snapshot.port) != (
+            previous.connected, previous.running, previous.mode, previous.port
+        ):
+            self._on_status_change(snapshot.connected, snapshot.running)
+        if previous is None or (snapshot.cpu_temp, snapshot.gpu_temp) != (previous.cpu_temp, previous.gpu_temp):
+            self._on_temps_change(snapshot.cpu_temp, snapshot.gpu_temp)
+        if previous is None or snapshot.current_speed != previous.current_speed:
+            self._on_speed_change(snapshot.current_speed)
+
+        previous_devices = dict(previous.devices) if previous else {}
+        for name, device in snapshot.devices:
+            if device != previous_devices.get(name):
+                self._on_device_change(name, device)
+
+        if self.gui_app:
+            self.gui_app._update_tray_tooltip(snapshot)
+
     def _on_mode_change(self):
         """Handle mode change."""
         mode = Mode(self.mode_var.get())
@@ -182,6 +225,18 @@ class ControlWindow(ctk.CTkFrame):
             self.speed_slider.set(speed)
             self.slider_value_label.configure(text=f"{speed}%")
 
+    def _on_device_change(self, name: str, device: StatusSnapshot):
+        """Handle a single device change from a multi-device controller."""
+        label = self.device_labels.get(name)
+        if not label:
+            return
+
+        if device.connected:
+            text = f"{name}: CPU {device.cpu_temp}°C | GPU {device.gpu_temp}°C | Fan {device.current_speed}%"
+        else:
+            text = f"{name}: Disconnected"
+        label.configure(text=text)
+
     def _update_slider_visibility(self):
         """Show/hide slider based on mode."""
         if self.controller.mode == Mode.MANUAL:
@@ -199,10 +254,15 @@ class GUIApp:
 
     window = ctk.CTk
     def __init__(self):
-        self.controller = SpeedController()
+        # Attach to a running daemon instead of driving the device from this process
+        if daemon_running(env.API_SOCKET, env.API_PORT):
+            self.controller = RemoteController(env.API_SOCKET, env.API_PORT)
+        else:
+            self.controller = create_controller()
+        self.profiler = Profiler(env.PROFILE_DIR, env.PROFILE_SECONDS, env.PROFILE_MODE)
         self.window: Optional[ctk.CTk] = None
         self.control_panel: Optional[ControlWindow] = None
-        self.tray_icon: Optional[pystray.Icon] = None
+        self.tray_icon: Optional["pystray.Icon"] = None
         self.loop: Optional[asyncio.AbstractEventLoop] = None
         self._running = False
 
@@ -213,8 +273,10 @@ class GUIApp:
         self.icon_red_image = self._load_icon(self.icon_red_path)
         self._is_connected = True  # Track connection status for icon
 
-    def _load_icon(self, icon_path: Path) -> Optional[Image.Image]:
+    def _load_icon(self, icon_path: Path) -> Optional["Image.Image"]:
         """Load the application icon."""
+        from PIL import Image
+
         try:
             if icon_path.exists():
                 return Image.open(icon_path)
@@ -227,15 +289,20 @@ class GUIApp:
 
     def _create_tray_menu(self) -> list:
         """Create the tray menu items."""
+        from pystray import MenuItem as Item
+
         return [
             Item("Show", self._show_window, default=True),
             Item("Start", self._start_control),
             Item("Stop", self._stop_control),
+            Item(f"Profile {self.profiler.seconds:g} s", self._profile),
             Item("Exit", self._exit_app),
         ]
 
-    def _create_tray_icon(self) -> pystray.Icon:
+    def _create_tray_icon(self) -> "pystray.Icon":
         """Create the system tray icon."""
+        import pystray
+
         menu = pystray.Menu(*self._create_tray_menu())
         icon = pystray.Icon(
             APP_NAME,
@@ -263,7 +330,8 @@ class GUIApp:
         """Create the GUI window."""
         self.window = ctk.CTk()
         self.window.title(APP_NAME)
-        self.window.geometry("350x350")
+        devices = len(self.controller.controllers) if isinstance(self.controller, MultiSpeedController) else 0
+        self.window.geometry(f"350x{375 + 40 * devices}")
         self.window.resizable(False, False)
 
         # Set window icon
@@ -355,12 +423,41 @@ class GUIApp:
                 self.controller.stop(), self.loop
             )
 
+    def _profile(self, icon=None, item=None):
+        """Capture a profile of the event loop, of the daemon's when attached to one."""
+        if not self.loop:
+            return
+        if isinstance(self.controller, RemoteController):
+            coroutine = self.controller.profile(self.profiler.seconds, self.profiler.mode)
+        else:
+            coroutine = self.profiler.capture()
+        future = asyncio.run_coroutine_threadsafe(coroutine, self.loop)
+        future.add_done_callback(self._on_profile_done)
+
+    def _on_profile_done(self, future):
+        """Tell where the profile was written."""
+        try:
+            message = f"Profile written to {future.result()}"
+        except Exception as e:
+            logging.error(f"Profiling failed: {e}")
+            message = f"Profiling failed: {e}"
+        if self.tray_icon and self.tray_icon.HAS_NOTIFICATION:
+            self.tray_icon.notify(message, APP_NAME)
+
     def _exit_app(self, icon=None, item=None):
         """Exit the application."""
         self._running = False
 
-        # Stop controller synchronously
-        if self.loop and self.controller.running:
+        # Stop controller synchronously; a daemon keeps running
+        if self.loop and isinstance(self.controller, RemoteController):
+            future = asyncio.run_coroutine_threadsafe(
+                self.controller.shutdown(), self.loop
+            )
+            try:
+                future.result(timeout=2.0)
+            except Exception as e:
+                logging.debug(f"Error detaching from the daemon: {e}")
+        elif self.loop and self.controller.running:
             future = asyncio.run_coroutine_threadsafe(
                 self.controller.stop(), self.loop
             )
@@ -382,12 +479,16 @@ class GUIApp:
         if self.loop:
             self.loop.call_soon_threadsafe(self.loop.stop)
 
-    def _update_tray_tooltip(self):
+    def _update_tray_tooltip(self, snapshot: StatusSnapshot):
         """Update tray icon tooltip with current status."""
         if self.tray_icon:
-            status = f"CPU: {self.controller.cpu_temp}°C | GPU: {self.controller.gpu_temp}°C | Fan: {self.controller.current_speed}%"
+            status = f"CPU: {snapshot.cpu_temp}°C | GPU: {snapshot.gpu_temp}°C | Fan: {snapshot.current_speed}%"
             self.tray_icon.title = status
 
+        if self.control_panel:
+            self.control_panel.metrics_label.configure(text=self.controller.metrics_summary())
+            self.control_panel.sparkline_label.configure(text=self.controller.speed_sparkline())
+
     def _run_async_loop(self):
         """Run the asyncio event loop in a separate thread."""
         self.loop = asyncio.new_event_loop()
@@ -395,6 +496,8 @@ class GUIApp:
 
         # Start controller
         self.loop.create_task(self.controller.start())
+        if env.METRICS_PORT and not isinstance(self.controller, RemoteController):
+            self.loop.create_task(MetricsServer(self.controller.metrics_registries, env.METRICS_PORT).start())
 
         # Run event loop
         self.loop.run_forever()
@@ -406,6 +509,9 @@ class GUIApp:
         # Create tray icon
         self.tray_icon = self._create_tray_icon()
 
+        # Profile on SIGUSR1 (Ctrl+Break on Windows); signal handlers can only be set from the main thread
+        install_signal_handler(self._profile)
+
         # Create GUI window
         self._create_window()
 
@@ -413,15 +519,6 @@ class GUIApp:
         async_thread = threading.Thread(target=self._run_async_loop, daemon=True)
         async_thread.start()
 
-        # Setup periodic tooltip update
-        def update_tooltip():
-            if self._running and self.window:
-                self._update_tray_tooltip()
-                self.window.after(1000, update_tooltip)
-
-        if self.window:
-            self.window.after(1000, update_tooltip)
-
         # Run tray icon in separate thread
         tray_thread = threading.Thread(
             target=self.tray_icon.run_detached,
@@ -442,11 +539,20 @@ class GUIApp:
 
 def gui():
     """Main entrypoint."""
-    logging.basicConfig(
-        level=logging.INFO if not env.VERBOSE else logging.DEBUG,
-        format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+    settings = env.configure()
+    logger_setup(
+        settings.verbose,
+        log_file=settings.log_file,
+        json_format=settings.log_json,
+        max_bytes=settings.log_max_bytes,
+        backups=settings.log_backups,
+        repeat_interval=settings.log_repeat_interval,
     )
 
+    # Configure CustomTkinter
+    ctk.set_appearance_mode("dark")
+    ctk.set_default_color_theme("blue")
+
     app = GUIApp()
     app.run()
 
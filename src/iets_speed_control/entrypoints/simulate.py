@@ -0,0 +1,85 @@
+"""Simulator entrypoint - compare fan curve configurations offline."""
+
+import argparse
+import itertools
+import json
+import time
+
+from ..util import env
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description="Replay a temperature trace through candidate TEMP_RANGES / MAX_STEP / IGNORE_LESS_THAN "
+        "settings on a virtual clock and rank them. Candidates are the product of the given options, "
+        "defaulting to the current .env values."
+    )
+    source = parser.add_mutually_exclusive_group()
+    source.add_argument("--trace", help="telemetry file (TELEMETRY_FILE) or CSV with time,cpu,gpu columns")
+    source.add_argument("--synthetic", choices=("step", "sine", "burst"), default="step", help="synthetic trace")
+    parser.add_argument("--seconds", type=float, default=3600.0, help="synthetic trace duration")
+    parser.add_argument("--ranges", action="append", default=[], help="candidate TEMP_RANGES (repeatable)")
+    parser.add_argument("--candidates", help="JSON list of {temp_ranges, max_step, ignore_less_than} objects")
+    parser.add_argument("--max-step", type=int, nargs="+", default=[env.MAX_STEP], help="candidate MAX_STEP values")
+    parser.add_argument(
+        "--ignore-less-than", type=int, nargs="+", default=[env.IGNORE_LESS_THAN], help="candidate IGNORE_LESS_THAN"
+    )
+    parser.add_argument("--threshold", type=float, default=80.0, help="temperature counted as too hot")
+    parser.add_argument(
+        "--cooling", type=float, default=0.0, help="degrees the fan removes at 100%% PWM (0: open loop)"
+    )
+    parser.add_argument("--cooling-tau", type=float, default=30.0, help="cooling lag, seconds")
+    parser.add_argument("--top", type=int, default=20, help="number of results to print")
+    parser.add_argument("--verify", action="store_true", help="check the first candidate against CurveStrategy")
+    return parser.parse_args()
+
+
+def _candidates(args, candidate_class) -> list:
+    if args.candidates:
+        with open(args.candidates) as f:
+            return [candidate_class(**_) for _ in json.load(f)]
+    ranges = args.ranges or [env.TEMP_RANGES]
+    return [
+        candidate_class(temp_ranges, max_step, ignore_less_than)
+        for temp_ranges, max_step, ignore_less_than in itertools.product(ranges, args.max_step, args.ignore_less_than)
+    ]
+
+
+def simulate():
+    """Main simulator entrypoint."""
+    env.configure()
+    args = parse_args()
+    from ..simulation import Candidate, load_trace, simulate_reference, simulate, synthetic_trace
+
+    trace = load_trace(args.trace) if args.trace else synthetic_trace(args.synthetic, args.seconds, env.DELAY)
+    candidates = _candidates(args, Candidate)
+
+    started = time.perf_counter()
+    results = simulate(trace, candidates, args.threshold, cooling=args.cooling, cooling_tau=args.cooling_tau)
+    elapsed = time.perf_counter() - started
+    print(
+        f"{len(candidates)} candidates x {len(trace.time)} ticks ({trace.duration / 3600:.1f} h of trace) "
+        f"in {elapsed:.2f}s"
+    )
+
+    results.sort(key=lambda _: (_.seconds_above, _.writes, _.average_pwm))
+    print(f"{'above':>8} {'writes':>7} {'avg PWM':>8} {'max °C':>7}  candidate")
+    for result in results[: args.top]:
+        print(
+            f"{result.seconds_above:7.0f}s {result.writes:7d} {result.average_pwm:8.1f} {result.max_temp:7.1f}  "
+            f"{result.candidate}"
+        )
+
+    if args.verify:
+        first = simulate(trace, candidates[:1], args.threshold)[0]
+        writes, average_pwm = simulate_reference(trace, candidates[0])
+        matches = writes == first.writes and abs(average_pwm - first.average_pwm) < 1e-6
+        print(
+            f"CurveStrategy reference: {writes} writes, avg PWM {average_pwm:.1f} - {'OK' if matches else 'MISMATCH'}"
+        )
+        if not matches:
+            raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    simulate()
@@ -0,0 +1,192 @@
+"""Offline simulator - replay a temperature trace through AUTO mode curve control on a virtual clock."""
+
+import csv
+import math
+from dataclasses import dataclass
+from pathlib import Path
+from typing import NamedTuple, Optional, Sequence
+
+try:
+    import numpy as np
+except ImportError as e:
+    raise ImportError("The simulator requires numpy: uv sync --extra analysis") from e
+
+from .strategies import ControlInput, CurveStrategy
+from .util.fan_curve import FanCurve
+from .util.telemetry import MAGIC, read_telemetry
+
+
+class Trace(NamedTuple):
+    """Temperature samples, one per control loop tick."""
+
+    time: np.ndarray  # seconds
+    cpu: np.ndarray
+    gpu: np.ndarray
+
+    @property
+    def duration(self) -> float:
+        return float(self.time[-1] - self.time[0]) if len(self.time) > 1 else 0.0
+
+
+@dataclass(frozen=True)
+class Candidate:
+    """One configuration to evaluate: the CurveStrategy settings."""
+
+    temp_ranges: str
+    max_step: int = 0
+    ignore_less_than: int = 0
+
+    def __str__(self):
+        return f"max_step={self.max_step} ignore<{self.ignore_less_than} {self.temp_ranges}"
+
+
+class SimulationResult(NamedTuple):
+    candidate: Candidate
+    seconds_above: float  # time with the hottest temperature above the threshold
+    writes: int  # Dimmer writes
+    average_pwm: float
+    max_temp: float
+
+
+def load_trace(path) -> Trace:
+    """
+    Read a trace from a telemetry file (TELEMETRY_FILE) or a CSV file.
+
+    The CSV needs a header with cpu and gpu columns and an optional time (or timestamp) column
+    in seconds; without it the samples are one DELAY apart.
+    """
+    path = Path(path)
+    with open(path, "rb") as f:
+        is_telemetry = f.read(len(MAGIC)) == MAGIC
+
+    if is_telemetry:
+        columns = read_telemetry(path)
+        return Trace(columns["timestamp"], columns["cpu"].astype(float), columns["gpu"].astype(float))
+
+    with open(path, newline="") as f:
+        rows = list(csv.DictReader(f))
+    if not rows or not {"cpu", "gpu"} <= set(rows[0]):
+        raise ValueError(f"{path} must have a header with cpu and gpu columns")
+
+    cpu = np.array([float(_["cpu"]) for _ in rows])
+    gpu = np.array([float(_["gpu"]) for _ in rows])
+    time_column = next((_ for _ in ("time", "timestamp") if _ in rows[0]), None)
+    time = np.array([float(_[time_column]) for _ in rows]) if time_column else np.arange(len(rows), dtype=float)
+    return Trace(time, cpu, gpu)
+
+
+def synthetic_trace(kind="step", seconds=600.0, period=1.1, idle=50.0, load=90.0, gpu_offset=-5.0) -> Trace:
+    """
+    Synthetic load trace sampled every period seconds.
+
+    step: idle, then load from a third of the duration on. sine: slow oscillation between idle and load.
+    burst: short load spikes every minute.
+    """
+    time = np.arange(0.0, seconds, period)
+    if kind == "step":
+        cpu = np.where(time >= seconds / 3, load, idle)
+    elif kind == "sine":
+        cpu = idle + (load - idle) * (0.5 - 0.5 * np.cos(2 * math.pi * time / min(seconds, 300.0)))
+    elif kind == "burst":
+        cpu = np.where(time % 60 < 10, load, idle)
+    else:
+        raise ValueError(f"Unknown synthetic trace {kind!r}, expected step, sine or burst")
+    return Trace(time, cpu, cpu + gpu_offset)
+
+
+def _curve_table(curve: FanCurve, low: int, high: int) -> np.ndarray:
+    """curve(t) for every integer t in low..high; identical to the control loop's lookups."""
+    return np.array([curve(_) for _ in range(low, high + 1)], dtype=np.int64)
+
+
+def simulate(
+    trace: Trace,
+    candidates: Sequence[Candidate],
+    threshold: float = 80.0,
+    initial: Optional[int] = 0,
+    cooling: float = 0.0,
+    cooling_tau: float = 30.0,
+) -> list[SimulationResult]:
+    """
+    Run every candidate over the whole trace at once.
+
+    Each tick mirrors SpeedController._control_loop in AUTO mode with CurveStrategy:
+    integer temperatures, max of the CPU and GPU curve values, the MAX_STEP decrease limit,
+    the IGNORE_LESS_THAN threshold and a Dimmer write whenever the value changes.
+    The ticks are sequential, the candidates are the vectorized axis.
+
+    The trace is replayed open-loop unless cooling is set: then the fan lowers the temperatures
+    by up to cooling degrees at 100% PWM, following the PWM with a cooling_tau seconds lag.
+    """
+    count = len(candidates)
+    ticks = len(trace.time)
+    if not count or not ticks:
+        return []
+
+    curves = [FanCurve.parse(_.temp_ranges) for _ in candidates]
+    max_step = np.array([_.max_step for _ in candidates])
+    ignore_less_than = np.array([_.ignore_less_than for _ in candidates])
+    limit_step = max_step > 0
+
+    # Lookup tables over every integer temperature the trace can reach
+    low = int(math.floor(min(trace.cpu.min(), trace.gpu.min()) - cooling)) - 1
+    high = int(math.ceil(max(trace.cpu.max(), trace.gpu.max()))) + 1
+    tables = np.stack([_curve_table(_, low, high) for _ in curves])
+    rows = np.arange(count)
+
+    dt = np.diff(trace.time, append=trace.time[-1] + (np.median(np.diff(trace.time)) if ticks > 1 else 0.0))
+    current = np.full(count, -1 if initial is None else initial, dtype=np.int64)
+    known = np.full(count, initial is not None)
+    effect = np.zeros(count)  # lagged cooling effect, 0..1
+    writes = np.zeros(count, dtype=np.int64)
+    pwm_sum = np.zeros(count)
+    seconds_above = np.zeros(count)
+    max_temp = np.full(count, -np.inf)
+
+    for i in range(ticks):
+        cpu = trace.cpu[i] - cooling * effect
+        gpu = trace.gpu[i] - cooling * effect
+        hottest = np.maximum(cpu, gpu)
+        seconds_above += np.where(hottest > threshold, dt[i], 0.0)
+        np.maximum(max_temp, hottest, out=max_temp)
+
+        # int() like the control loop, then the curve lookup
+        cpu_index = np.clip(np.trunc(cpu).astype(np.int64), low, high) - low
+        gpu_index = np.clip(np.trunc(gpu).astype(np.int64), low, high) - low
+        new = np.maximum(tables[rows, cpu_index], tables[rows, gpu_index])
+
+        step_limited = known & limit_step & (new < current - max_step)
+        new = np.where(step_limited, current - max_step, new)
+        new = np.where(known & (np.abs(current - new) < ignore_less_than), current, new)
+
+        writes += new != current
+        current = new
+        known[:] = True
+        pwm_sum += current * dt[i]
+        if cooling:
+            effect += (current / 100.0 - effect) * min(dt[i] / cooling_tau, 1.0)
+
+    duration = dt.sum() or 1.0
+    return [
+        SimulationResult(
+            candidate, float(seconds_above[k]), int(writes[k]), float(pwm_sum[k] / duration), float(max_temp[k])
+        )
+        for k, candidate in enumerate(candidates)
+    ]
+
+
+def simulate_reference(trace: Trace, candidate: Candidate, initial: Optional[int] = 0) -> tuple[int, float]:
+    """(writes, average PWM) of one candidate through CurveStrategy itself, tick by tick, open-loop."""
+    strategy = CurveStrategy(
+        FanCurve.parse(candidate.temp_ranges), max_step=candidate.max_step, ignore_less_than=candidate.ignore_less_than
+    )
+    dt = np.diff(trace.time, append=trace.time[-1] + (np.median(np.diff(trace.time)) if len(trace.time) > 1 else 0.0))
+    current, writes, pwm_sum = initial, 0, 0.0
+    for i, now in enumerate(trace.time):
+        cpu, gpu = int(trace.cpu[i]), int(trace.gpu[i])
+        new = strategy.compute(ControlInput(cpu, gpu, {}, current, float(now)))
+        if current != new:
+            writes += 1
+        current = new
+        pwm_sum += current * dt[i]
+    return writes, pwm_sum / (dt.sum() or 1.0)
@@ -0,0 +1,206 @@
+"""Control strategies - turn temperatures into a dimmer value for AUTO mode."""
+
+from collections import deque
+from typing import NamedTuple, Optional
+
+from .util import env
+from .util.fan_curve import CurveSet, FanCurve
+
+
+class ControlInput(NamedTuple):
+    """Everything a strategy sees on one tick."""
+
+    cpu_temp: int
+    gpu_temp: int
+    sensors: dict
+    current: Optional[int]
+    now: float
+
+
+class ControlStrategy:
+    """Base class for AUTO mode control strategies."""
+
+    name = "base"
+
+    @property
+    def sensor_filters(self) -> tuple[str, ...]:
+        """Label filters of the sensors compute() reads besides the CPU/GPU temperatures."""
+        return ()
+
+    def reset(self):
+        """Forget any internal state, e.g. when switching back to AUTO mode."""
+
+    def compute(self, tick: ControlInput) -> int:
+        """Return the dimmer value for this tick."""
+        raise NotImplementedError
+
+
+class CurveStrategy(ControlStrategy):
+    """
+    The piecewise TEMP_RANGES curve.
+
+    With curves (SENSOR_CURVES), every sensor group is evaluated on its own curve and the group targets
+    are reduced to one value; otherwise the curve is applied to the CPU and GPU temperatures.
+    Decreases are limited to max_step per tick, and changes smaller than ignore_less_than are skipped.
+    """
+
+    name = "curve"
+
+    def __init__(self, curve: FanCurve, max_step=0, ignore_less_than=0, curves: Optional[CurveSet] = None):
+        self.curve = curve
+        self.max_step = max_step
+        self.ignore_less_than = ignore_less_than
+        self.curves = curves
+
+    @property
+    def sensor_filters(self) -> tuple[str, ...]:
+        return self.curves.label_filters if self.curves else ()
+
+    def compute(self, tick: ControlInput) -> int:
+        if self.curves:
+            new_value = self.curves(tick.sensors)
+        else:
+            new_value = max(self.curve(tick.cpu_temp), self.curve(tick.gpu_temp))
+        current = tick.current
+
+        # Apply step limits
+        if current is not None and self.max_step:
+            if new_value < current - self.max_step:
+                new_value = current - self.max_step
+
+        # Apply minimum change threshold
+        if current is not None and abs(current - new_value) < self.ignore_less_than:
+            new_value = current
+
+        return new_value
+
+
+class PIDStrategy(ControlStrategy):
+    """
+    PID controller holding the max CPU/GPU temperature at a setpoint.
+
+    The integral term only accumulates while the output is not saturated in the direction of the error
+    and is clamped to the output range (anti-windup). The derivative acts on the measured temperature,
+    so setpoint changes don't kick the output. Output changes smaller than hysteresis are skipped.
+
+    An optional feed-forward term adds feed_forward_gain * the max value of the sensors whose label
+    contains any of feed_forward_filters (e.g. CPU/GPU utilization or power), so the fan spins up
+    on load before the temperature follows.
+    """
+
+    name = "pid"
+
+    def __init__(
+        self,
+        setpoint: float,
+        kp: float,
+        ki: float,
+        kd: float,
+        min_output=0,
+        max_output=100,
+        hysteresis=0,
+        feed_forward_filters: tuple[str, ...] = (),
+        feed_forward_gain: float = 0.0,
+    ):
+        self.setpoint = setpoint
+        self.kp = kp
+        self.ki = ki
+        self.kd = kd
+        self.min_output = min_output
+        self.max_output = max_output
+        self.hysteresis = hysteresis
+        self.feed_forward_filters = tuple(_ for _ in feed_forward_filters if _)
+        self.feed_forward_gain = feed_forward_gain
+        self.reset()
+
+    @property
+    def sensor_filters(self) -> tuple[str, ...]:
+        return self.feed_forward_filters if self.feed_forward_gain else ()
+
+    def reset(self):
+        self._integral = 0.0
+        self._last_temperature: Optional[float] = None
+        self._last_time: Optional[float] = None
+
+    def _feed_forward(self, sensors: dict) -> float:
+        if not self.feed_forward_gain or not self.feed_forward_filters:
+            return 0.0
+
+        values = []
+        for label, value in sensors.items():
+            if any(_ in label for _ in self.feed_forward_filters):
+                try:
+                    values.append(float(value))
+                except Exception:
+                    continue
+        return self.feed_forward_gain * max(values or [0])
+
+    def _clamp(self, value: float) -> float:
+        return min(max(value, self.min_output), self.max_output)
+
+    def compute(self, tick: ControlInput) -> int:
+        temperature = max(tick.cpu_temp, tick.gpu_temp)
+        error = temperature - self.setpoint  # positive when too hot
+        dt = 0.0 if self._last_time is None else max(tick.now - self._last_time, 0.0)
+
+        derivative = 0.0
+        if dt and self._last_temperature is not None:
+            derivative = (temperature - self._last_temperature) / dt
+        self._last_temperature = temperature
+        self._last_time = tick.now
+
+        proportional = self.kp * error + self.kd * derivative + self._feed_forward(tick.sensors)
+        integral = self._integral + self.ki * error * dt
+        output = proportional + integral
+        saturated_high = output > self.max_output and error > 0
+        saturated_low = output < self.min_output and error < 0
+        if not (saturated_high or saturated_low):
+            self._integral = self._clamp(integral)
+
+        new_value = int(round(self._clamp(proportional + self._integral)))
+        if tick.current is not None and abs(new_value - tick.current) < self.hysteresis:
+            new_value = tick.current
+        return new_value
+
+
+class RateMeter:
+    """Counts events in a sliding time window."""
+
+    def __init__(self, window: float = 60.0):
+        self.window = window
+        self._events: deque[float] = deque()
+
+    def record(self, now: float):
+        self._events.append(now)
+        self._trim(now)
+
+    def rate(self, now: float) -> float:
+        """Events per window ending at now."""
+        self._trim(now)
+        return float(len(self._events))
+
+    def _trim(self, now: float):
+        while self._events and self._events[0] <= now - self.window:
+            self._events.popleft()
+
+
+def create_strategy(name: str, curve: FanCurve, curves: Optional[CurveSet] = None) -> ControlStrategy:
+    """Build a strategy by name with its settings from env."""
+    name = name.strip().lower()
+    if name == CurveStrategy.name:
+        return CurveStrategy(curve, max_step=env.MAX_STEP, ignore_less_than=env.IGNORE_LESS_THAN, curves=curves)
+
+    if name == PIDStrategy.name:
+        return PIDStrategy(
+            setpoint=env.PID_SETPOINT,
+            kp=env.PID_KP,
+            ki=env.PID_KI,
+            kd=env.PID_KD,
+            min_output=env.PID_MIN_OUTPUT,
+            max_output=env.PID_MAX_OUTPUT,
+            hysteresis=env.PID_HYSTERESIS,
+            feed_forward_filters=tuple(_.strip() for _ in env.PID_FEED_FORWARD_FILTER.split(",")),
+            feed_forward_gain=env.PID_FEED_FORWARD_GAIN,
+        )
+
+    raise ValueError(f"Unknown CONTROL_STRATEGY {name!r}, expected one of: {CurveStrategy.name}, {PIDStrategy.name}")
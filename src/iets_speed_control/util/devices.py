@@ -0,0 +1,86 @@
+import json
+from dataclasses import dataclass, field, fields
+from pathlib import Path
+
+from . import env
+
+
+@dataclass(frozen=True)
+class DeviceConfig:
+    """
+    One fan channel: the serial device, the Tasmota command that drives it and what it reacts to.
+
+    Channels of one device share its port and device_serial; channel N drives it with ChannelN instead of command.
+    """
+
+    name: str = ""
+    port: str = field(default_factory=lambda: env.DEFAULT_PORT)
+    device_name: str = field(default_factory=lambda: env.DEVICE_NAME)
+    device_serial: str = field(default_factory=lambda: env.DEVICE_SERIAL)
+    command: str = field(default_factory=lambda: env.PWM_COMMAND)
+    channel: str = ""
+    cpu_sensor_filter: str = field(default_factory=lambda: env.CPU_SENSOR_FILTER)
+    gpu_sensor_filter: str = field(default_factory=lambda: env.GPU_SENSOR_FILTER)
+    temp_ranges: str = field(default_factory=lambda: env.TEMP_RANGES)
+    sensor_curves: str = field(default_factory=lambda: env.SENSOR_CURVES)
+    strategy: str = field(default_factory=lambda: env.CONTROL_STRATEGY)
+
+    @property
+    def pwm_command(self) -> str:
+        """Tasmota command that gets and sets the PWM of this channel."""
+        return f"Channel{self.channel}" if self.channel else self.command
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "DeviceConfig":
+        known = {_.name for _ in fields(cls)}
+        unknown = sorted(set(data) - known)
+        if unknown:
+            raise ValueError(f"Unknown device setting(s) {', '.join(unknown)}; expected: {', '.join(sorted(known))}")
+        return cls(**{k: str(v) for k, v in data.items()})
+
+
+def load_device_configs(path) -> list[DeviceConfig]:
+    """
+    Load device definitions from a JSON list of objects.
+
+    Every key is optional and defaults to the matching .env setting, e.g.
+    [{"name": "left", "port": "COM7", "channel": 1}, {"name": "right", "port": "COM7", "channel": 2}].
+    Devices with the same port and device_serial are channels of one Tasmota device.
+    """
+    data = json.loads(Path(path).read_text(encoding="utf-8"))
+    if not isinstance(data, list) or not data:
+        raise ValueError(f"{path} must contain a non-empty JSON list of device objects")
+
+    configs = []
+    for i, item in enumerate(data):
+        if not isinstance(item, dict):
+            raise ValueError(f"{path}: device #{i + 1} must be a JSON object")
+        config = DeviceConfig.from_dict(item)
+        if not config.name:
+            config = DeviceConfig.from_dict({**item, "name": f"{config.port} {config.pwm_command}"})
+        configs.append(config)
+
+    names = [_.name for _ in configs]
+    duplicates = sorted({_ for _ in names if names.count(_) > 1})
+    if duplicates:
+        raise ValueError(f"{path}: duplicate device names {', '.join(duplicates)}")
+
+    for (port, serial), group in group_by_device(configs).items():
+        commands = [_.pwm_command.lower() for _ in group]
+        if len(set(commands)) < len(commands):
+            device = f"{port} ({serial})" if serial else port
+            raise ValueError(f"{path}: devices {', '.join(_.name for _ in group)} on {device} drive the same channel")
+    return configs
+
+
+def group_by_device(configs: list[DeviceConfig]) -> dict[tuple[str, str], list[DeviceConfig]]:
+    """
+    Configs by (port or URL, device_serial): the channels that go through one device.
+
+    The port falls back to DEFAULT_PORT, so devices found by their serial alone only share a group
+    when their serials match too.
+    """
+    groups: dict[tuple[str, str], list[DeviceConfig]] = {}
+    for config in configs:
+        groups.setdefault((config.port, config.device_serial), []).append(config)
+    return groups
@@ -0,0 +1,149 @@
+import json
+import logging
+import os
+import sys
+import time
+from pathlib import Path
+from typing import Optional
+
+CACHE_PATH = Path.home() / ".iets-speed-control" / "ports.json"
+
+
+def _hotplug_signature() -> Optional[tuple]:
+    """Cheap fingerprint of the serial ports present, without enumerating their USB details."""
+    try:
+        if sys.platform == "win32":
+            import winreg
+
+            with winreg.OpenKey(winreg.HKEY_LOCAL_MACHINE, r"HARDWARE\DEVICEMAP\SERIALCOMM") as key:
+                count = winreg.QueryInfoKey(key)[1]
+                return tuple(sorted(str(winreg.EnumValue(key, i)[1]) for i in range(count)))
+        return tuple(sorted(_ for _ in os.listdir("/dev") if _.startswith(("tty", "cu."))))
+    except OSError:
+        return None
+
+
+class PortDiscovery:
+    """
+    Finds the serial port of a device by its USB description and/or serial number.
+
+    The last port the device was connected on is kept per device in a small JSON cache,
+    so the next start connects without a scan. Ports are rescanned only when the set of
+    present ports changed (hotplug) or, after a failed scan, once the exponential backoff elapsed.
+
+    The cache is keyed on name, the configured device name, so controllers matching the same
+    description keep their own entries. A port remembered by one owner (the device it was
+    opened for) is claimed until released; the other owners skip it when scanning.
+    """
+
+    _claims: dict[str, object] = {}  # port -> owner, shared by every PortDiscovery of the process
+
+    def __init__(
+        self,
+        device_name="",
+        device_serial="",
+        cache_path: Path = CACHE_PATH,
+        min_backoff: float = 1.0,
+        max_backoff: float = 60.0,
+        name="",
+        owner: object = None,
+    ):
+        self.device_name = device_name
+        self.device_serial = device_serial
+        self.name = name
+        self.owner = self if owner is None else owner
+        self.cache_path = cache_path
+        self.min_backoff = min_backoff
+        self.max_backoff = max_backoff
+
+        self.scans = 0
+        self.failed_scans = 0
+        self._backoff = 0.0
+        self._next_scan = 0.0
+        self._signature: Optional[tuple] = None
+
+    @property
+    def key(self) -> str:
+        """Cache key of the device."""
+        return self.name or self.device_serial or self.device_name
+
+    def _claimed(self, port: str) -> bool:
+        """Whether port was remembered by another owner."""
+        return self._claims.get(port, self.owner) is not self.owner
+
+    def release(self):
+        """Give up the port claimed by this owner."""
+        for port in [port for port, owner in self._claims.items() if owner is self.owner]:
+            del self._claims[port]
+
+    def _read_cache(self) -> dict:
+        try:
+            return json.loads(self.cache_path.read_text(encoding="utf-8"))
+        except Exception:
+            return {}
+
+    def cached_port(self) -> Optional[str]:
+        """Last port the device was connected on, unless another owner claimed it since."""
+        port = self._read_cache().get(self.key) if self.key else None
+        return None if port is None or self._claimed(port) else port
+
+    def remember(self, port: str):
+        """Store a port the device was successfully connected on, claim it and reset the backoff."""
+        self._backoff = 0.0
+        self._next_scan = 0.0
+        self.release()
+        self._claims[port] = self.owner
+        if not self.key or self.cached_port() == port:
+            return
+
+        cache = self._read_cache()
+        cache[self.key] = port
+        try:
+            self.cache_path.parent.mkdir(parents=True, exist_ok=True)
+            self.cache_path.write_text(json.dumps(cache, indent=2), encoding="utf-8")
+        except Exception as e:
+            logging.debug("Could not save port cache: %s", e)
+
+    def _match(self, ports) -> Optional[str]:
+        ports = [_ for _ in ports if not self._claimed(_.device)]
+        coms_match = []
+        if self.device_name:
+            coms_match = [_ for _ in ports if self.device_name in (_.description or "")]
+
+        if self.device_serial:
+            coms_match = [_ for _ in ports if _.serial_number and self.device_serial in _.serial_number] or coms_match
+
+        return coms_match[0].device if coms_match else None
+
+    def find(self) -> Optional[str]:
+        """Scan the ports for the device, unless nothing was plugged in since the last failed scan and it backs off."""
+        if not self.key:
+            return None
+
+        signature = _hotplug_signature()
+        hotplug = signature is not None and signature != self._signature
+        if not hotplug and time.monotonic() < self._next_scan:
+            return None
+
+        self._signature = signature
+        self.scans += 1
+        started = time.perf_counter()
+        from serial.tools.list_ports import comports
+
+        port = self._match(comports())
+        elapsed = time.perf_counter() - started
+        if port:
+            logging.debug("Port scan found %s at %s in %.3fs", self.key, port, elapsed)
+            return port
+
+        self.failed_scans += 1
+        self._backoff = min(max(self._backoff * 2, self.min_backoff), self.max_backoff)
+        self._next_scan = time.monotonic() + self._backoff
+        logging.info(
+            "Port scan for %s failed in %.3fs (%s failed scans), next scan in %.0fs or on hotplug",
+            self.key,
+            elapsed,
+            self.failed_scans,
+            self._backoff,
+        )
+        return None
@@ -1,32 +1,33 @@
-import os
-from .logger import logger_setup
-from .tools import strtobool
-import logging  # has to be here
-
-from dotenv import load_dotenv
-
-load_dotenv()
-
-VERBOSE = strtobool(os.getenv("VERBOSE", "False"))
-logger_setup()
-logging.debug(f"env verbose: {VERBOSE}")
-
-DEVICE_NAME = os.getenv("DEVICE_NAME", "USB-Enhanced-SERIAL CH9102")
-DEVICE_SERIAL = os.getenv("DEVICE_SERIAL", "568B022419")
-DEFAULT_PORT = os.getenv("DEFAULT_PORT", "COM7")
-PWM_COMMAND = os.getenv("PWM_COMMAND", "Dimmer")
-SERIAL_BAUDRATE = int(os.getenv("SERIAL_BAUDRATE", "115200"))
-SERIAL_TIMEOUT = float(os.getenv("SERIAL_TIMEOUT", "0.3"))
-DELAY = float(os.getenv("DELAY", "1.1"))
-IGNORE_LESS_THAN = int(os.getenv("IGNORE_LESS_THAN", "0"))
-CPU_SENSOR_FILTER = os.getenv("CPU_SENSOR_FILTER", "CPU")
-GPU_SENSOR_FILTER = os.getenv("GPU_SENSOR_FILTER", "GPU")
-MAX_STEP = int(os.getenv("MAX_STEP", 100))
-TEMP_RANGES = os.getenv(
-    "TEMP_RANGES",
-    "(0, min_temp, dimmer_zero, dimmer_zero),"
-    " (min_temp, 70, dimmer_minimum, 50),"
-    " (70, 85, 50, 65),"
-    " (85, 90, 65, 75),"
-    " (90, max_temp, 75, dimmer_maximum)",
-)
+"""
+Settings access for the rest of the package: env.DELAY, env.PWM_COMMAND, ...
+
+Importing this module has no side effects. Entrypoints build the settings explicitly with configure();
+otherwise they are loaded from the environment and .env on the first attribute access.
+"""
+
+from typing import Optional
+
+from .settings import Settings, load_settings
+
+_settings: Optional[Settings] = None
+
+
+def configure(settings: Optional[Settings] = None) -> Settings:
+    """Use the given settings, or load them from the environment and .env."""
+    global _settings
+    _settings = settings or load_settings()
+    return _settings
+
+
+def settings() -> Settings:
+    """The active settings."""
+    return _settings or configure()
+
+
+def __getattr__(name: str):
+    if name.isupper():
+        try:
+            return getattr(settings(), name.lower())
+        except AttributeError:
+            pass
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
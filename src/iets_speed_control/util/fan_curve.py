@@ -0,0 +1,263 @@
+# do not import env here
+import ast
+from typing import Iterable, NamedTuple, Optional, Union
+
+from .tools import calculate_dimmer_value
+
+Number = Union[int, float]
+Range = tuple[Number, Number, Number, Number]
+
+
+class FanCurve:
+    """
+    Piecewise-linear temperature -> PWM curve compiled from TEMP_RANGES.
+
+    The ranges are parsed and validated once, and the dimmer value for every integer
+    temperature between the lowest and the highest range bound is precomputed,
+    so evaluating the curve for an integer temperature is a single list index.
+    Values are identical to calculate_dimmer_value().
+    """
+
+    def __init__(self, ranges: Iterable[Range]):
+        self.ranges: tuple[Range, ...] = tuple(self._validate(ranges))
+        self.min_temp = min(_[0] for _ in self.ranges)
+        self.max_temp = max(_[1] for _ in self.ranges)
+        self.min_dimmer = min(_[2] for _ in self.ranges)
+        self.max_dimmer = max(_[3] for _ in self.ranges)
+
+        self._offset = int(self.min_temp)
+        self._table = [self._evaluate(_) for _ in range(self._offset, int(self.max_temp) + 1)]
+
+    @classmethod
+    def parse(cls, temperature_ranges: Union[str, Iterable[Range]]) -> "FanCurve":
+        """Build a curve from a TEMP_RANGES string or an iterable of (temp_down, temp_up, dimmer_down, dimmer_up)."""
+        if isinstance(temperature_ranges, str):
+            temperature_ranges = cls._literal(temperature_ranges)
+        return cls(temperature_ranges)
+
+    @staticmethod
+    def _literal(text: str):
+        try:
+            tree = ast.parse(text.strip(), mode="eval")
+        except SyntaxError as e:
+            raise ValueError(f"TEMP_RANGES is not a valid list of tuples: {text!r}") from e
+
+        names = sorted({_.id for _ in ast.walk(tree) if isinstance(_, ast.Name)})
+        if names:
+            raise ValueError(f"TEMP_RANGES contains unknown names {', '.join(names)}; use numbers only: {text!r}")
+
+        try:
+            value = ast.literal_eval(tree)
+        except ValueError as e:
+            raise ValueError(f"TEMP_RANGES must contain number tuples only: {text!r}") from e
+
+        # a single "(a, b, c, d)" range is not wrapped in an outer tuple
+        if isinstance(value, tuple) and value and not isinstance(value[0], (tuple, list)):
+            value = (value,)
+        return value
+
+    @staticmethod
+    def _validate(ranges: Iterable[Range]) -> list[Range]:
+        output = []
+        for i, item in enumerate(ranges):
+            if not isinstance(item, (tuple, list)) or len(item) != 4:
+                raise ValueError(f"Range #{i + 1} {item!r} must be (temp_down, temp_up, dimmer_down, dimmer_up)")
+            if not all(isinstance(_, (int, float)) and not isinstance(_, bool) for _ in item):
+                raise ValueError(f"Range #{i + 1} {item!r} must contain numbers only")
+
+            temp_down, temp_up, dimmer_down, dimmer_up = item
+            if temp_down >= temp_up:
+                raise ValueError(f"Range #{i + 1} {item!r}: temp_down must be lower than temp_up")
+            if not (0 <= dimmer_down <= 100 and 0 <= dimmer_up <= 100):
+                raise ValueError(f"Range #{i + 1} {item!r}: dimmer values must be within 0..100")
+
+            if output:
+                previous = output[-1]
+                if temp_down < previous[0]:
+                    raise ValueError(f"Range #{i + 1} {item!r} is not sorted: it starts before {previous!r}")
+                if temp_down < previous[1]:
+                    raise ValueError(f"Range #{i + 1} {item!r} overlaps {previous!r}")
+
+            output.append(tuple(item))
+
+        if not output:
+            raise ValueError("TEMP_RANGES must contain at least one range")
+        return output
+
+    def _evaluate(self, temperature: Number) -> int:
+        return calculate_dimmer_value(temperature, self.ranges)
+
+    def __call__(self, temperature: Number) -> int:
+        """Dimmer value for the given temperature."""
+        if temperature.__class__ is int:
+            index = temperature - self._offset
+            if index < 0:
+                return self.min_dimmer
+            if index >= len(self._table):
+                return self.max_dimmer
+            return self._table[index]
+        return self._evaluate(temperature)
+
+    @property
+    def bounded_table(self) -> tuple[int, list[int]]:
+        """
+        (offset, table) with min_dimmer first and max_dimmer last: table[clamp(t - offset, 0, len - 1)]
+        is the dimmer value for an integer temperature t, for lookups that skip __call__.
+        """
+        return self._offset - 1, [self.min_dimmer, *self._table, self.max_dimmer]
+
+    def __repr__(self):
+        return f"{self.__class__.__name__}({self.ranges!r})"
+
+
+class CurveGroup(NamedTuple):
+    """Sensors whose label contains label_filter, driven by their own curve."""
+
+    label_filter: str
+    curve: FanCurve
+    weight: float = 1.0
+
+
+REDUCE_RULES = ("max", "weighted", "priority")
+
+
+class CurveSet:
+    """
+    Per-sensor fan curves: every sensor group gets its own curve, and the group targets are reduced to one value.
+
+    The tables of all curves are concatenated into one flat table when the set is built. The sensors
+    matching each group are compiled into slots, with the table base, offset and bounds of the group curve,
+    only when the sensor labels change. A tick is then one vectorized pass (numpy when installed, a list
+    comprehension otherwise): the hottest sensor per group, its lookup in the flat table, and the reduction:
+
+    - max: the fastest group
+    - weighted: the weight-averaged group targets
+    - priority: the group with the highest weight that has readings (on a tie, the fastest)
+
+    Temperatures are truncated to integers like the controller does for the CPU/GPU maximum.
+    """
+
+    def __init__(self, groups: Iterable[CurveGroup], rule: str = "max"):
+        self.groups: tuple[CurveGroup, ...] = tuple(groups)
+        if not self.groups:
+            raise ValueError("A curve set needs at least one sensor group")
+        if rule not in REDUCE_RULES:
+            raise ValueError(f"Unknown reduce rule {rule!r}, expected one of: {', '.join(REDUCE_RULES)}")
+        self.rule = rule
+        self.idle_value = min(_.curve.min_dimmer for _ in self.groups)  # no group has readings
+
+        # curves shared by several groups are stored once
+        self._table: list[int] = []
+        self._curves: dict[int, tuple[int, int, int]] = {}  # id(curve) -> (base, offset, last index)
+        for group in self.groups:
+            if id(group.curve) not in self._curves:
+                offset, table = group.curve.bounded_table
+                self._curves[id(group.curve)] = (len(self._table), offset, len(table) - 1)
+                self._table.extend(table)
+
+        try:
+            import numpy as np
+        except ImportError:
+            np = None
+        self._np = np
+        self._table_array = np.asarray(self._table, dtype=np.int16) if np else None
+        self._labels: Optional[frozenset] = None
+        self._compile(())
+
+    @classmethod
+    def parse(cls, spec: str, base: FanCurve, label_filters: Iterable[str] = (), rule: str = "max") -> "CurveSet":
+        """
+        Groups for label_filters (CPU and GPU) with the base curve, plus the groups of a SENSOR_CURVES string.
+
+        spec is "filter[*weight][: ranges]" items separated by ";", e.g.
+        "VRM: (40, 80, 20, 100); GPU Hot Spot*2: (70, 95, 40, 100); NVMe*0.5". A group without ranges
+        uses the base curve; a group with the filter of a base group replaces it.
+        """
+        groups = {_: CurveGroup(_, base) for _ in label_filters if _}
+        for i, item in enumerate(_.strip() for _ in spec.split(";")):
+            if not item:
+                continue
+            name, _, ranges = item.partition(":")
+            name, _, weight = name.partition("*")
+            name = name.strip()
+            if not name:
+                raise ValueError(f"Sensor curve #{i + 1} {item!r} has no sensor filter")
+            try:
+                weight = float(weight) if weight.strip() else 1.0
+            except ValueError as e:
+                raise ValueError(f"Sensor curve #{i + 1} {item!r}: the weight must be a number") from e
+            try:
+                curve = FanCurve.parse(ranges) if ranges.strip() else base
+            except ValueError as e:
+                raise ValueError(f"Sensor curve #{i + 1} {name!r}: {e}") from e
+            groups[name] = CurveGroup(name, curve, weight)
+        return cls(groups.values(), rule)
+
+    @property
+    def label_filters(self) -> tuple[str, ...]:
+        return tuple(_.label_filter for _ in self.groups)
+
+    def _compile(self, labels: Iterable[str]):
+        """Slots for the sensors matching each group; a sensor can be in several groups."""
+        self._labels = frozenset(labels)
+        slot_labels, starts, weights, shifts, lows, highs = [], [], [], [], [], []
+        for group in self.groups:
+            matches = [_ for _ in self._labels if group.label_filter in _]
+            if not matches:
+                continue
+            base, offset, last = self._curves[id(group.curve)]
+            starts.append(len(slot_labels))
+            slot_labels.extend(matches)
+            weights.append(group.weight)
+            shifts.append(base - offset)
+            lows.append(base)
+            highs.append(base + last)
+
+        self._slot_labels = tuple(slot_labels)
+        self._starts = starts
+        self._weights = weights
+        self._groups = list(zip(starts, [*starts[1:], len(slot_labels)], shifts, lows, highs))
+        np = self._np
+        if np:
+            self._starts_array = np.asarray(starts, dtype=np.intp)
+            self._shifts, self._lows, self._highs = (np.asarray(_, dtype=np.int64) for _ in (shifts, lows, highs))
+
+    def targets(self, sensors: dict) -> list[int]:
+        """
+        Target of every group that has readings, in group order: its curve at the hottest of its sensors,
+        like the CPU/GPU maximum without SENSOR_CURVES.
+        """
+        if sensors.keys() != self._labels:
+            self._compile(sensors)
+        if not self._slot_labels:
+            return []
+
+        np = self._np
+        if np:
+            temperatures = np.fromiter(map(sensors.__getitem__, self._slot_labels), float, len(self._slot_labels))
+            hottest = np.maximum.reduceat(temperatures.astype(np.int64), self._starts_array)
+            return self._table_array[np.clip(hottest + self._shifts, self._lows, self._highs)].tolist()
+
+        table, labels = self._table, self._slot_labels
+        return [
+            table[min(max(max(int(float(sensors[_])) for _ in labels[start:end]) + shift, low), high)]
+            for start, end, shift, low, high in self._groups
+        ]
+
+    def __call__(self, sensors: dict) -> int:
+        """Dimmer value for a {label: temperature} reading."""
+        targets = self.targets(sensors)
+        if not targets:
+            return self.idle_value
+        if self.rule == "max":
+            return max(targets)
+
+        weights = self._weights
+        if self.rule == "weighted":
+            total = sum(weights)
+            return int(round(sum(t * w for t, w in zip(targets, weights)) / total)) if total else max(targets)
+        top = max(weights)
+        return max(t for t, w in zip(targets, weights) if w == top)
+
+    def __repr__(self):
+        return f"{self.__class__.__name__}({self.groups!r}, rule={self.rule!r})"
@@ -1,22 +1,137 @@
-import os
+# do not import env here
+import atexit
+import json
 import logging
+import queue
+import time
+from typing import TYPE_CHECKING, Optional
+
+if TYPE_CHECKING:
+    from logging.handlers import QueueListener
 
 __LOGGER_SET_UP = False
+_listener: Optional["QueueListener"] = None
+
+TEXT_FORMAT = "%(asctime)s - %(levelname)s - %(message)s"
+
+# LogRecord attributes; anything else on a record came from extra={...}
+_RECORD_ATTRIBUTES = set(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "asctime"}
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line: time, level, logger, message, the extra={...} fields and the traceback."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "time": self.formatTime(record),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        entry.update((k, v) for k, v in vars(record).items() if k not in _RECORD_ATTRIBUTES)
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+class RepeatFilter(logging.Filter):
+    """
+    Rate-limits repeated warnings and errors.
+
+    A message seen again within interval seconds is dropped; the first one after the interval
+    goes through with the number of dropped repeats, so a dead sensor source or device logs
+    once a minute instead of once a tick. Lower levels are not filtered.
+    """
+
+    def __init__(self, interval: float = 60.0, level=logging.WARNING, max_keys=1024):
+        super().__init__()
+        self.interval = interval
+        self.level = level
+        self.max_keys = max_keys
+        self._seen: dict[tuple, list] = {}  # (logger, level, message) -> [emitted at, dropped]
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno < self.level or not self.interval:
+            return True
+
+        key = (record.name, record.levelno, record.getMessage())
+        now = time.monotonic()
+        seen = self._seen.get(key)
+        if seen is not None and now - seen[0] < self.interval:
+            seen[1] += 1
+            return False
+
+        if seen is not None and seen[1]:
+            record.msg, record.args = f"{record.getMessage()} (repeated {seen[1]} times)", None
+        if len(self._seen) >= self.max_keys:
+            self._seen = {k: v for k, v in self._seen.items() if now - v[0] < self.interval}
+        self._seen[key] = [now, 0]
+        return True
+
 
+class _QueueHandler(logging.Handler):
+    """
+    Hands records to the listener thread as they are; formatting happens there, not on the event loop.
 
-def logger_setup():
-    global __LOGGER_SET_UP
+    Unlike logging.handlers.QueueHandler, the message is not formatted on the calling thread.
+    Log arguments in this package are immutable values, so formatting them later gives the same text.
+    """
+
+    def __init__(self, log_queue: queue.SimpleQueue):
+        super().__init__()
+        self.queue = log_queue
+
+    def emit(self, record: logging.LogRecord):
+        self.queue.put_nowait(record)
+
+
+def logger_setup(
+    verbose=False,
+    log_file="",
+    json_format=False,
+    max_bytes=10 * 1024 * 1024,
+    backups=3,
+    repeat_interval=60.0,
+):
+    """
+    Route the root logger through a queue to a background thread that formats and writes the records.
+
+    Writes text to the console and, with log_file, to a size-rotated file (JSON lines with json_format).
+    Repeated warnings and errors are rate-limited to one per repeat_interval seconds (0 disables).
+    """
+    global __LOGGER_SET_UP, _listener
     if __LOGGER_SET_UP:
         return
 
-    verbose = os.getenv("VERBOSE")
+    from logging.handlers import QueueListener, RotatingFileHandler
+
     level = logging.DEBUG if verbose else logging.INFO
-    logging.basicConfig(level=level, format="%(asctime)s - %(levelname)s - %(message)s")
-    logger = logging.getLogger()
     console = logging.StreamHandler()
-    logger.handlers = [console]
+    console.setFormatter(logging.Formatter(TEXT_FORMAT))
+    handlers: list[logging.Handler] = [console]
+    if log_file:
+        file_handler = RotatingFileHandler(log_file, maxBytes=max_bytes, backupCount=backups, encoding="utf-8")
+        file_handler.setFormatter(JsonFormatter() if json_format else logging.Formatter(TEXT_FORMAT))
+        handlers.append(file_handler)
+
+    log_queue: queue.SimpleQueue = queue.SimpleQueue()
+    queue_handler = _QueueHandler(log_queue)
+    queue_handler.addFilter(RepeatFilter(repeat_interval))
+
+    logger = logging.getLogger()
+    logger.handlers = [queue_handler]
     logger.setLevel(level)
-    for handler in logger.handlers:
-        handler.setLevel(level)
+
+    _listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+    _listener.start()
+    atexit.register(logger_shutdown)
 
     __LOGGER_SET_UP = True
+
+
+def logger_shutdown():
+    """Write out the queued records and stop the background thread."""
+    global _listener
+    if _listener is not None:
+        listener, _listener = _listener, None
+        listener.stop()
@@ -0,0 +1,252 @@
+# do not import env here
+import asyncio
+import bisect
+import logging
+import time
+from contextlib import contextmanager
+from typing import Callable, Iterable, Optional
+
+# seconds
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+
+class Counter:
+    def __init__(
+        self,
+        name: str,
+        description: str = "",
+        read: Optional[Callable[[], float]] = None,
+        labels: Optional[dict] = None,
+    ):
+        self.name = name
+        self.description = description
+        self.read = read  # a count kept elsewhere, read when the metrics are rendered
+        self.labels = labels or {}
+        self._value = 0
+
+    @property
+    def value(self) -> float:
+        return self.read() if self.read else self._value
+
+    def inc(self, amount=1):
+        self._value += amount
+
+
+class Gauge:
+    """
+    Current value of something, e.g. a queue depth, read when the metrics are rendered.
+
+    labels tell apart gauges of one name in a registry, e.g. {"strategy": "pid"}.
+    """
+
+    def __init__(self, name: str, description: str, read: Callable[[], float], labels: Optional[dict] = None):
+        self.name = name
+        self.description = description
+        self.read = read
+        self.labels = labels or {}
+
+    @property
+    def key(self) -> str:
+        return self.name + _labels(self.labels)
+
+    @property
+    def value(self) -> float:
+        return self.read()
+
+
+class Histogram:
+    """Fixed-bucket histogram; constant memory regardless of the number of observations."""
+
+    def __init__(
+        self,
+        name: str,
+        description: str = "",
+        buckets: tuple[float, ...] = DEFAULT_BUCKETS,
+        labels: Optional[dict] = None,
+    ):
+        self.name = name
+        self.description = description
+        self.buckets = tuple(sorted(buckets))
+        self.labels = labels or {}
+        self.counts = [0] * (len(self.buckets) + 1)  # the last one is +Inf
+        self.count = 0
+        self.sum = 0.0
+        self.last = 0.0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+        self.last = value
+
+    def quantile(self, q: float) -> float:
+        """Approximate quantile, interpolated linearly inside the bucket."""
+        if not self.count:
+            return 0.0
+
+        rank = q * self.count
+        seen = 0
+        for i, count in enumerate(self.counts):
+            if count and seen + count >= rank:
+                lower = self.buckets[i - 1] if i else 0.0
+                upper = self.buckets[i] if i < len(self.buckets) else max(self.last, lower)
+                return lower + (upper - lower) * (rank - seen) / count
+            seen += count
+        return self.last
+
+
+class Metrics:
+    """
+    Named counters, gauges and timing histograms of one controller or device.
+
+    labels are added to every sample in the Prometheus text output, e.g. {"device": "left"};
+    a counter, gauge or histogram can add its own, e.g. {"transport": "http"}.
+    """
+
+    def __init__(self, prefix="iets_", labels: Optional[dict] = None):
+        self.prefix = prefix
+        self.labels = labels or {}
+        self.counters: dict[str, Counter] = {}
+        self.gauges: dict[str, Gauge] = {}
+        self.histograms: dict[str, Histogram] = {}
+
+    def counter(
+        self,
+        name: str,
+        description: str = "",
+        read: Optional[Callable[[], float]] = None,
+        labels: Optional[dict] = None,
+    ) -> Counter:
+        if name not in self.counters:
+            self.counters[name] = Counter(name, description, read, labels)
+        return self.counters[name]
+
+    def gauge(self, name: str, description: str, read: Callable[[], float], labels: Optional[dict] = None) -> Gauge:
+        gauge = Gauge(name, description, read, labels)
+        self.gauges[gauge.key] = gauge
+        return gauge
+
+    def histogram(self, name: str, description: str = "", labels: Optional[dict] = None) -> Histogram:
+        if name not in self.histograms:
+            self.histograms[name] = Histogram(name, description, labels=labels)
+        return self.histograms[name]
+
+    def inc(self, name: str, amount=1):
+        self.counter(name).inc(amount)
+
+    def observe(self, name: str, value: float):
+        self.histogram(name).observe(value)
+
+    @contextmanager
+    def timer(self, name: str):
+        """Observe the duration of the with-block in the named histogram."""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.histogram(name).observe(time.perf_counter() - started)
+
+    def snapshot(self) -> dict:
+        """Plain dict of counter and gauge values and histogram count/sum/p50/p99."""
+        return {
+            **{name: c.value for name, c in self.counters.items()},
+            **{key: g.value for key, g in self.gauges.items()},
+            **{
+                name: {"count": h.count, "sum": h.sum, "p50": h.quantile(0.5), "p99": h.quantile(0.99)}
+                for name, h in self.histograms.items()
+            },
+        }
+
+    def summary(self, names: Iterable[str] = ()) -> str:
+        """Compact one-line p50 summary of the given histograms (all when empty)."""
+        parts = []
+        for name in names or self.histograms:
+            histogram = self.histograms.get(name)
+            if histogram and histogram.count:
+                label = name.removesuffix("_seconds").replace("_", " ")
+                parts.append(f"{label} {histogram.quantile(0.5) * 1e3:.0f}ms")
+        return " | ".join(parts)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(labels: dict, extra: Optional[dict] = None) -> str:
+    labels = {**labels, **(extra or {})}
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in labels.items()) + "}"
+
+
+def render_prometheus(registries: Iterable[Metrics]) -> str:
+    """Prometheus text exposition format (0.0.4) of several registries."""
+    families: dict[str, tuple[str, str, list[str]]] = {}
+    for metrics in registries:
+        for counter in metrics.counters.values():
+            name = metrics.prefix + counter.name
+            _, _, samples = families.setdefault(name, ("counter", counter.description, []))
+            samples.append(f"{name}{_labels(metrics.labels, counter.labels)} {counter.value}")
+
+        for gauge in metrics.gauges.values():
+            name = metrics.prefix + gauge.name
+            _, _, samples = families.setdefault(name, ("gauge", gauge.description, []))
+            samples.append(f"{name}{_labels(metrics.labels, gauge.labels)} {gauge.value}")
+
+        for histogram in metrics.histograms.values():
+            name = metrics.prefix + histogram.name
+            _, _, samples = families.setdefault(name, ("histogram", histogram.description, []))
+            cumulative = 0
+            for bound, count in zip((*histogram.buckets, "+Inf"), histogram.counts):
+                cumulative += count
+                samples.append(
+                    f"{name}_bucket{_labels(metrics.labels, {**histogram.labels, 'le': bound})} {cumulative}"
+                )
+            samples.append(f"{name}_sum{_labels(metrics.labels, histogram.labels)} {histogram.sum}")
+            samples.append(f"{name}_count{_labels(metrics.labels, histogram.labels)} {histogram.count}")
+
+    lines = []
+    for name, (kind, description, samples) in families.items():
+        if description:
+            lines.append(f"# HELP {name} {description}")
+        lines.append(f"# TYPE {name} {kind}")
+        lines.extend(samples)
+    return "\n".join(lines) + "\n"
+
+
+class MetricsServer:
+    """Minimal localhost HTTP endpoint serving the Prometheus text format on any path."""
+
+    def __init__(self, registries: Callable[[], Iterable[Metrics]], port: int, host="127.0.0.1"):
+        self.registries = registries
+        self.port = port
+        self.host = host
+        self._server: Optional[asyncio.AbstractServer] = None
+
+    async def start(self):
+        self._server = await asyncio.start_server(self._handle, self.host, self.port)
+        logging.info(f"Metrics available at http://{self.host}:{self.port}/metrics")
+
+    async def stop(self):
+        if self._server:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            # request line and headers; the request itself is not needed
+            while (await asyncio.wait_for(reader.readline(), timeout=5)).strip():
+                pass
+            body = render_prometheus(self.registries()).encode()
+            writer.write(
+                b"HTTP/1.1 200 OK\r\n"
+                b"Content-Type: text/plain; version=0.0.4; charset=utf-8\r\n"
+                b"Content-Length: " + str(len(body)).encode() + b"\r\n"
+                b"Connection: close\r\n\r\n" + body
+            )
+            await writer.drain()
+        except Exception as e:
+            logging.debug(f"Metrics request failed: {e}")
+        finally:
+            writer.close()
@@ -0,0 +1,235 @@
+# do not import env here
+import asyncio
+import io
+import itertools
+import logging
+import os
+import signal
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Optional
+
+PROFILE_DIR = Path.home() / ".iets-speed-control" / "profiles"
+MODES = ("sample", "cprofile")
+
+
+def _frame_name(frame) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})"
+
+
+class StackSampler:
+    """
+    Samples the Python stack of every other thread at interval seconds, from a background thread.
+
+    Counts collapsed stacks ("thread;outer;...;inner"), the format flamegraph.pl and speedscope read.
+    The sampled threads run untouched, so it is cheap enough for a live process.
+    """
+
+    def __init__(self, interval=0.005):
+        self.interval = interval
+        self.stacks: Counter[str] = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="profile-sampler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+            self._thread = None
+
+    def _run(self):
+        own = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            names = {_.ident: _.name for _ in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == own:
+                    continue
+                stack = []
+                while frame is not None:
+                    stack.append(_frame_name(frame))
+                    frame = frame.f_back
+                stack.append(names.get(ident, str(ident)))
+                self.stacks[";".join(reversed(stack))] += 1
+            self.samples += 1
+
+    def report(self, top=30) -> str:
+        """Functions by own and total samples, then the collapsed stacks."""
+        own: Counter[str] = Counter()
+        total: Counter[str] = Counter()
+        for stack, count in self.stacks.items():
+            frames = stack.split(";")
+            own[f"{frames[0]}: {frames[-1]}"] += count
+            for frame in set(frames[1:]):
+                total[frame] += count
+
+        lines = [f"{self.samples} samples every {self.interval * 1000:g} ms", "", "Own samples:"]
+        lines += [f"{count:8} {name}" for name, count in own.most_common(top)]
+        lines += ["", "Total samples (the function or its callees):"]
+        lines += [f"{count:8} {name}" for name, count in total.most_common(top)]
+        lines += ["", "Collapsed stacks:"]
+        lines += [f"{stack} {count}" for stack, count in self.stacks.most_common()]
+        return "\n".join(lines)
+
+
+def format_tasks(loop: Optional[asyncio.AbstractEventLoop] = None) -> str:
+    """Stack of every asyncio task of loop (the running one by default); the await chain where supported."""
+    format_call_graph = getattr(asyncio, "format_call_graph", None)  # Python 3.14
+    out = io.StringIO()
+    tasks = sorted(asyncio.all_tasks(loop), key=lambda _: _.get_name())
+    for task in tasks:
+        if format_call_graph:
+            out.write(format_call_graph(task) + "\n")
+        else:
+            task.print_stack(file=out)
+        out.write("\n")
+    return f"{len(tasks)} tasks\n\n{out.getvalue()}"
+
+
+class Profiler:
+    """
+    On-demand profile of the live process, written to directory/profile-<timestamp>.txt.
+
+    A capture runs on the event loop for seconds: a stack sampler (mode "sample") or cProfile
+    (mode "cprofile", also saved as a .prof file for pstats or snakeviz), asyncio task stacks
+    at the start and the top tracemalloc allocation growth over the capture. tracemalloc runs
+    only while capturing unless it was already started. One capture at a time.
+    """
+
+    def __init__(self, directory="", seconds=10.0, mode="sample", top=30):
+        if mode not in MODES:
+            raise ValueError(f"Unknown profile mode {mode!r}, expected one of {', '.join(MODES)}")
+        self.directory = Path(directory) if directory else PROFILE_DIR
+        self.seconds = seconds
+        self.mode = mode
+        self.top = top
+        self._task: Optional[asyncio.Task] = None
+        self._busy = False
+
+    @property
+    def busy(self) -> bool:
+        return self._busy
+
+    async def capture(self, seconds: Optional[float] = None, mode: Optional[str] = None) -> Path:
+        """Profile the running process for seconds and return the path of the written file."""
+        seconds = self.seconds if seconds is None else seconds
+        mode = mode or self.mode
+        if mode not in MODES:
+            raise ValueError(f"Unknown profile mode {mode!r}, expected one of {', '.join(MODES)}")
+        if seconds <= 0:
+            raise ValueError(f"seconds must be positive, got {seconds}")
+        if self._busy:
+            raise RuntimeError("A profile capture is already running")
+
+        self._busy = True
+        try:
+            return await self._capture(seconds, mode)
+        finally:
+            self._busy = False
+
+    async def _capture(self, seconds: float, mode: str) -> Path:
+        # imported on demand, they add to the startup time
+        import cProfile
+        import platform
+        import pstats
+
+        started = datetime.now()
+        path = self.directory / f"profile-{started:%Y%m%d-%H%M%S}.txt"
+        logging.info(f"Profiling ({mode}) for {seconds:g} s")
+
+        tasks = format_tasks()
+        started_tracemalloc = not tracemalloc.is_tracing()
+        if started_tracemalloc:
+            tracemalloc.start(10)
+        before = tracemalloc.take_snapshot()
+
+        sampler = StackSampler() if mode == "sample" else None
+        profile = cProfile.Profile() if mode == "cprofile" else None
+        wall, cpu = time.perf_counter(), time.process_time()
+        try:
+            if sampler:
+                sampler.start()
+            if profile:
+                profile.enable()
+            await asyncio.sleep(seconds)
+        finally:
+            if profile:
+                profile.disable()
+            if sampler:
+                sampler.stop()
+            wall, cpu = time.perf_counter() - wall, time.process_time() - cpu
+            after = tracemalloc.take_snapshot()
+            traced, peak = tracemalloc.get_traced_memory()
+            if started_tracemalloc:
+                tracemalloc.stop()
+
+        self.directory.mkdir(parents=True, exist_ok=True)
+        for n in itertools.count(1):  # a capture started within the same second
+            if not path.exists():
+                break
+            path = path.with_name(f"profile-{started:%Y%m%d-%H%M%S}-{n}.txt")
+        own_files = [tracemalloc.Filter(False, tracemalloc.__file__), tracemalloc.Filter(False, __file__)]
+        growth = after.filter_traces(own_files).compare_to(before.filter_traces(own_files), "lineno")
+        growth = "\n".join(str(_) for _ in growth[: self.top])
+        if profile:
+            out = io.StringIO()
+            out.write(f"binary stats: {path.with_suffix('.prof').name}\n")
+            for key in ("cumulative", "tottime"):
+                pstats.Stats(profile, stream=out).sort_stats(key).print_stats(self.top)
+            samples = ("cProfile", out.getvalue())
+        else:
+            samples = ("Stack samples", sampler.report(self.top))
+        sections = [
+            (
+                "Profile",
+                f"started {started.isoformat(timespec='seconds')}, {wall:.1f} s, mode {mode}\n"
+                f"pid {os.getpid()}, Python {platform.python_version()} on {platform.platform()}\n"
+                f"process CPU {cpu:.2f} s ({cpu / wall:.0%} of one core), {threading.active_count()} threads",
+            ),
+            samples,
+            ("asyncio tasks at the start", tasks),
+            ("tracemalloc growth", f"traced {traced / 1024:.0f} KiB, peak {peak / 1024:.0f} KiB\n\n{growth}"),
+        ]
+
+        if profile:
+            profile.dump_stats(path.with_suffix(".prof"))
+        with open(path, "w", encoding="utf-8") as f:
+            for title, body in sections:
+                f.write(f"==== {title} ====\n{body.rstrip()}\n\n")
+        logging.info(f"Profile written to {path}")
+        return path
+
+    def start_capture(self):
+        """Start a capture with the default seconds and mode on the running loop, unless one is running."""
+        if self._busy:
+            logging.warning("A profile capture is already running")
+            return
+        self._task = asyncio.create_task(self.capture(), name="profile")
+        self._task.add_done_callback(
+            lambda _: not _.cancelled() and _.exception() and logging.error(f"Profiling failed: {_.exception()}")
+        )
+
+
+def install_signal_handler(callback: Callable[[], None]) -> Optional[str]:
+    """
+    Call callback on SIGUSR1, or SIGBREAK (Ctrl+Break) on Windows; returns the signal name.
+
+    Must be called from the main thread. callback runs there too, between two bytecodes, so it
+    should only hand the work over, e.g. with loop.call_soon_threadsafe.
+    """
+    signum = getattr(signal, "SIGUSR1", None) or getattr(signal, "SIGBREAK", None)
+    if signum is None:
+        return None
+    signal.signal(signum, lambda *_: callback())
+    return signal.Signals(signum).name
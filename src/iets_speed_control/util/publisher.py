@@ -0,0 +1,83 @@
+# do not import env here
+import asyncio
+import logging
+import time
+from typing import Callable, Generic, Optional, TypeVar
+
+T = TypeVar("T")
+
+
+class Subscription(Generic[T]):
+    """
+    One subscriber of a Publisher.
+
+    With max_rate (deliveries per second) set, values published faster than that are merged:
+    the subscriber gets the latest value once the interval has passed, never a backlog.
+    """
+
+    def __init__(self, publisher: "Publisher[T]", callback: Callable[[T], None], max_rate: float = 0.0):
+        self.publisher = publisher
+        self.callback = callback
+        self.min_interval = 1 / max_rate if max_rate else 0.0
+        self.deliveries = 0
+        self._delivered_at = -float("inf")
+        self._timer: Optional[asyncio.TimerHandle] = None
+
+    def cancel(self):
+        if self._timer:
+            self._timer.cancel()
+            self._timer = None
+        self.publisher.unsubscribe(self)
+
+    def _offer(self):
+        if self._timer:
+            return  # a delivery of the latest value is already scheduled
+
+        wait = self._delivered_at + self.min_interval - time.monotonic()
+        if wait <= 0:
+            self._deliver()
+            return
+        try:
+            self._timer = asyncio.get_running_loop().call_later(wait, self._deliver)
+        except RuntimeError:
+            self._deliver()  # published outside the event loop
+
+    def _deliver(self):
+        self._timer = None
+        self._delivered_at = time.monotonic()
+        self.deliveries += 1
+        try:
+            self.callback(self.publisher.value)
+        except Exception as e:
+            logging.exception(f"Error in status subscriber: {e}")
+
+
+class Publisher(Generic[T]):
+    """Holds the latest immutable value and hands it to subscribers only when it changes."""
+
+    def __init__(self):
+        self.value: Optional[T] = None
+        self.publishes = 0
+        self._subscriptions: list[Subscription[T]] = []
+
+    def subscribe(self, callback: Callable[[T], None], max_rate: float = 0.0) -> Subscription[T]:
+        """Call callback(value) on every change, at most max_rate times per second (0: unlimited)."""
+        subscription = Subscription(self, callback, max_rate)
+        self._subscriptions.append(subscription)
+        if self.value is not None:
+            subscription._offer()
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription[T]):
+        if subscription in self._subscriptions:
+            self._subscriptions.remove(subscription)
+
+    def publish(self, value: T) -> bool:
+        """Publish value if it differs from the current one. Returns whether it was published."""
+        if value == self.value:
+            return False
+        self.value = value
+        self.publishes += 1
+        for subscription in tuple(self._subscriptions):
+            subscription._offer()
+        return True
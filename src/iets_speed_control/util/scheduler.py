@@ -0,0 +1,88 @@
+# do not import env here
+import asyncio
+from typing import Optional
+
+
+class TickScheduler:
+    """
+    Fixed-cadence scheduler for the control loop.
+
+    wait() sleeps until the next tick deadline rather than a full period after the work is done,
+    so the tick period does not grow by the I/O time and does not drift.
+    A tick that overruns its deadline is counted and the cadence restarts from now instead of bursting.
+
+    When min_period < max_period the period adapts to the observed temperature:
+    it drops to min_period as soon as the temperature climbs by rise_threshold or more between ticks,
+    and grows by the backoff factor up to max_period after stable_ticks ticks without such a change.
+    """
+
+    def __init__(
+        self,
+        period: float,
+        min_period: Optional[float] = None,
+        max_period: Optional[float] = None,
+        rise_threshold: float = 2,
+        stable_ticks: int = 5,
+        backoff: float = 1.5,
+    ):
+        self.min_period = period if min_period is None else min_period
+        self.max_period = max(period if max_period is None else max_period, self.min_period)
+        self.base_period = min(max(period, self.min_period), self.max_period)
+        self.rise_threshold = rise_threshold
+        self.stable_ticks = stable_ticks
+        self.backoff = backoff
+
+        self.period = self.base_period
+        self.ticks = 0
+        self.overruns = 0
+        self._deadline: Optional[float] = None
+        self._last_temperature: Optional[float] = None
+        self._stable = 0
+
+    @property
+    def adaptive(self) -> bool:
+        return self.min_period < self.max_period
+
+    def reset(self):
+        """Restart the cadence and the adaptation from the base period."""
+        self.period = self.base_period
+        self._deadline = None
+        self._last_temperature = None
+        self._stable = 0
+
+    def observe(self, temperature: float):
+        """Feed the latest temperature used for the period adaptation."""
+        if not self.adaptive:
+            return
+
+        last, self._last_temperature = self._last_temperature, temperature
+        if last is None:
+            return
+
+        change = temperature - last
+        if change >= self.rise_threshold:
+            self.period = self.min_period
+            self._stable = 0
+        elif abs(change) < self.rise_threshold:
+            self._stable += 1
+            if self._stable >= self.stable_ticks:
+                self.period = min(self.period * self.backoff, self.max_period)
+                self._stable = 0
+        else:
+            self._stable = 0
+
+    async def wait(self) -> bool:
+        """Sleep until the next tick. Returns whether the tick overran its deadline."""
+        now = asyncio.get_running_loop().time()
+        if self._deadline is None:
+            self._deadline = now
+
+        self._deadline += self.period
+        self.ticks += 1
+        overrun = self._deadline < now
+        if overrun:
+            self.overruns += 1
+            self._deadline = now
+
+        await asyncio.sleep(self._deadline - now)
+        return overrun
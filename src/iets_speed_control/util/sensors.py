@@ -1,10 +1,17 @@
+import asyncio
 import logging
-import pythoncom
-
-from wmi import WMI
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Callable, Optional
 
 
+# pythoncom and wmi are Windows-only and imported where used, so the module imports anywhere
 def get_sensors():
+    import pythoncom
+    from wmi import WMI
+
     # noinspection PyUnresolvedReferences
     pythoncom.CoInitialize()  # type: ignore[union-attr]
     wmi_obj = WMI(namespace="root\\WMI")
@@ -12,7 +19,7 @@ def get_sensors():
     try:
         sensor_values = wmi_obj.AIDA64_SensorValues()
     except Exception as e:
-        logging.error(f"Error connecting to AIDA64: {str(e)}")
+        logging.error("Error connecting to AIDA64: %s", e)
         return output
 
     for v in sensor_values:
@@ -20,6 +27,425 @@ def get_sensors():
     return output
 
 
+def _wql_string(value: str) -> str:
+    return "'" + str(value).replace("\\", "\\\\").replace("'", "\\'") + "'"
+
+
+class SensorProvider:
+    """Base class for a source of sensor readings ({label: value})."""
+
+    name = "base"
+    stale_after: Optional[float] = None  # seconds; None: the SensorReader's
+
+    def add_filters(self, *filters: str):
+        """Register label filters (substrings) whose sensors read() has to return."""
+
+    def labels(self, label_filter: str) -> Optional[tuple[str, ...]]:
+        """Labels matching the filter if the provider keeps an index, None otherwise."""
+        return None
+
+    async def read(self) -> dict:
+        """One reading; {} when the source is unavailable."""
+        raise NotImplementedError
+
+    async def close(self):
+        pass
+
+
+class WmiSensorProvider(SensorProvider):
+    """
+    Long-lived WMI sensor provider.
+
+    Owns a single worker thread with its own COM apartment and one WMI connection,
+    so the asyncio loop never blocks on WMI and the connection is reused between ticks.
+    The connection is dropped and re-established only after a failed query.
+    Concurrent read() calls share one query.
+
+    Consumers register the label filters they need with add_filters(). The labels matching them are
+    resolved once into an index (filter -> labels), and each read only fetches those sensors with a
+    narrow WQL query by sensor ID. The index is resolved again when the filters change, when a fetched
+    sensor disappears or is renamed, after a failed query and every index_refresh seconds (new sensors).
+    Without filters, or with an empty filter, every sensor is read.
+    """
+
+    namespace = "root\\WMI"
+    wmi_class = ""
+    id_property = "ID"
+    label_property = "Label"
+    value_property = "Value"
+    condition = ""  # WQL condition every queried sensor has to meet
+
+    def __init__(self, index_refresh: float = 60.0):
+        self.index_refresh = index_refresh
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._wmi = None
+        self._pending: Optional[asyncio.Future] = None
+
+        self._filters: frozenset[str] = frozenset()
+        self._index: Optional[dict[str, tuple[str, ...]]] = None
+        self._index_at = 0.0
+        self._ids: dict[str, str] = {}  # sensor ID -> label of the indexed sensors
+        self._select: Optional[str] = None
+        self.resolves = 0
+
+    def add_filters(self, *filters: str):
+        filters = self._filters | set(filters)
+        if filters != self._filters:
+            self._filters = filters
+            self._index = None
+
+    def labels(self, label_filter: str) -> Optional[tuple[str, ...]]:
+        index = self._index
+        return index.get(label_filter) if index is not None else None
+
+    def _worker_init(self):
+        import pythoncom
+
+        # noinspection PyUnresolvedReferences
+        pythoncom.CoInitialize()  # type: ignore[union-attr]
+
+    def _worker_release(self):
+        import pythoncom
+
+        self._wmi = None
+        # noinspection PyUnresolvedReferences
+        pythoncom.CoUninitialize()  # type: ignore[union-attr]
+
+    def _where(self, condition="") -> str:
+        conditions = [f"({_})" for _ in (self.condition, condition) if _]
+        return f" WHERE {' AND '.join(conditions)}" if conditions else ""
+
+    def _query(self) -> dict:
+        if self._wmi is None:
+            try:
+                from wmi import WMI
+
+                self._wmi = WMI(namespace=self.namespace)
+                logging.debug("Connected to WMI namespace %s", self.namespace)
+            except Exception as e:
+                logging.error("Error connecting to WMI namespace %s: %s", self.namespace, e)
+                return {}
+
+        label, value = self.label_property, self.value_property
+        try:
+            if not self._filters or "" in self._filters:
+                select = f"SELECT {label}, {value} FROM {self.wmi_class}{self._where()}"
+                return {getattr(row, label): getattr(row, value) for row in self._wmi.query(select)}
+
+            if self._index is None or time.monotonic() - self._index_at >= self.index_refresh:
+                self._resolve()
+            if not self._select:
+                return {}
+
+            rows = {
+                getattr(row, self.id_property): (getattr(row, label), getattr(row, value))
+                for row in self._wmi.query(self._select)
+            }
+            if rows.keys() != self._ids.keys() or any(self._ids[id_] != label for id_, (label, _) in rows.items()):
+                logging.debug("%s sensor set changed", self.name)
+                self._index = None
+            return dict(rows.values())
+        except Exception as e:
+            logging.error("Error reading %s sensors: %s", self.name, e)
+            self._wmi = None  # reconnect on the next query
+            self._index = None
+            return {}
+
+    def _resolve(self):
+        """Index the labels matching the filters and build the narrow query for their sensor IDs."""
+        filters, id_, label = self._filters, self.id_property, self.label_property
+        select = f"SELECT {id_}, {label} FROM {self.wmi_class}{self._where()}"
+        sensors = {getattr(row, id_): getattr(row, label) for row in self._wmi.query(select)}
+        index = {f: tuple(_ for _ in sensors.values() if f in _) for f in filters}
+        self._ids = {k: v for k, v in sensors.items() if any(f in v for f in filters)}
+        where = " OR ".join(f"{id_} = {_wql_string(_)}" for _ in self._ids)
+        self._select = (
+            f"SELECT {id_}, {label}, {self.value_property} FROM {self.wmi_class}{self._where(where)}" if where else None
+        )
+        self._index = index
+        self._index_at = time.monotonic()
+        self.resolves += 1
+        logging.debug(
+            "Resolved %s of %s %s sensors for filters %s", len(self._ids), len(sensors), self.name, sorted(filters)
+        )
+
+    async def read(self) -> dict:
+        if self._pending is None:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=1, thread_name_prefix=f"sensors-{self.name}", initializer=self._worker_init
+                )
+            self._pending = asyncio.ensure_future(
+                asyncio.get_running_loop().run_in_executor(self._executor, self._query)
+            )
+            self._pending.add_done_callback(self._on_query_done)
+        return await asyncio.shield(self._pending)
+
+    def _on_query_done(self, future: asyncio.Future):
+        self._pending = None
+
+    async def close(self):
+        """Release the WMI connection and stop the worker thread."""
+        if self._executor is None:
+            return
+
+        executor, self._executor = self._executor, None
+        await asyncio.get_running_loop().run_in_executor(executor, self._worker_release)
+        executor.shutdown(wait=False)
+
+
+class Aida64Provider(WmiSensorProvider):
+    """AIDA64 sensors written to WMI (Preferences -> External Applications)."""
+
+    name = "aida64"
+    wmi_class = "AIDA64_SensorValues"
+
+
+class LibreHardwareMonitorProvider(WmiSensorProvider):
+    """LibreHardwareMonitor temperature sensors; LibreHardwareMonitor has to be running."""
+
+    name = "librehardwaremonitor"
+    namespace = "root\\LibreHardwareMonitor"
+    wmi_class = "Sensor"
+    id_property = "Identifier"
+    label_property = "Name"
+    condition = "SensorType = 'Temperature'"
+
+
+# hwmon chip names of CPU and GPU drivers, so their labels match CPU_SENSOR_FILTER and GPU_SENSOR_FILTER
+HWMON_ROLES = {
+    "coretemp": "CPU",
+    "k10temp": "CPU",
+    "zenpower": "CPU",
+    "cpu_thermal": "CPU",
+    "amdgpu": "GPU",
+    "radeon": "GPU",
+    "nouveau": "GPU",
+}
+
+
+class HwmonProvider(SensorProvider):
+    """
+    Linux /sys/class/hwmon temperature sensors.
+
+    Labels are "<chip> <sensor label>" in °C, prefixed with CPU or GPU for known CPU and GPU drivers,
+    e.g. "CPU coretemp Package id 0" or "GPU amdgpu edge". Only sensors matching the registered filters
+    are read; the sensor files are found again every index_refresh seconds and after a failed read.
+    """
+
+    name = "hwmon"
+
+    def __init__(self, root="/sys/class/hwmon", index_refresh: float = 60.0):
+        self.root = Path(root)
+        self.index_refresh = index_refresh
+        self._filters: frozenset[str] = frozenset()
+        self._paths: Optional[dict[str, Path]] = None  # label -> temp*_input file
+        self._paths_at = 0.0
+
+    def add_filters(self, *filters: str):
+        self._filters = self._filters | set(filters)
+
+    def labels(self, label_filter: str) -> Optional[tuple[str, ...]]:
+        paths = self._paths
+        return tuple(_ for _ in paths if label_filter in _) if paths is not None else None
+
+    def _resolve(self) -> dict[str, Path]:
+        paths = {}
+        for chip in sorted(self.root.glob("hwmon*")):
+            try:
+                chip_name = (chip / "name").read_text().strip()
+            except OSError:
+                continue
+            prefix = f"{HWMON_ROLES[chip_name]} {chip_name}" if chip_name in HWMON_ROLES else chip_name
+            for temp_input in sorted(chip.glob("temp*_input")):
+                sensor = temp_input.name.removesuffix("_input")
+                try:
+                    sensor = (chip / f"{sensor}_label").read_text().strip()
+                except OSError:
+                    pass
+                paths.setdefault(f"{prefix} {sensor}", temp_input)
+        return paths
+
+    def _query(self) -> dict:
+        if self._paths is None or time.monotonic() - self._paths_at >= self.index_refresh:
+            self._paths = self._resolve()
+            self._paths_at = time.monotonic()
+
+        filters = self._filters if "" not in self._filters else ()
+        values = {}
+        for label, path in self._paths.items():
+            if filters and not any(_ in label for _ in filters):
+                continue
+            try:
+                values[label] = int(path.read_text()) / 1000
+            except Exception:
+                self._paths = None  # the sensor went away; find the files again on the next read
+        return values
+
+    async def read(self) -> dict:
+        return await asyncio.get_running_loop().run_in_executor(None, self._query)
+
+
+PROVIDERS: dict[str, Callable[..., SensorProvider]] = {
+    "aida64": Aida64Provider,
+    "librehardwaremonitor": LibreHardwareMonitorProvider,
+    "lhm": LibreHardwareMonitorProvider,
+    "hwmon": HwmonProvider,
+}
+
+
+def create_providers(names: str = "", index_refresh: float = 60.0) -> list[SensorProvider]:
+    """
+    Providers from a comma-separated list of names; empty: aida64 on Windows, hwmon elsewhere.
+
+    A name can be followed by its own stale timeout in seconds, e.g. "aida64:3, hwmon:10".
+    """
+    names = names or ("aida64" if sys.platform == "win32" else "hwmon")
+    providers = []
+    for item in names.split(","):
+        name, _, stale_after = (_.strip() for _ in item.partition(":"))
+        name = name.lower()
+        if name not in PROVIDERS:
+            raise ValueError(f"Unknown sensor provider: {name}. Choose from: {', '.join(PROVIDERS)}")
+        provider = PROVIDERS[name](index_refresh=index_refresh)
+        if stale_after:
+            try:
+                provider.stale_after = float(stale_after)
+            except ValueError as e:
+                raise ValueError(f"Sensor provider {item.strip()!r}: the stale timeout must be a number") from e
+            if provider.stale_after <= 0:
+                raise ValueError(f"Sensor provider {item.strip()!r}: the stale timeout must be positive")
+        providers.append(provider)
+    return providers
+
+
+class SensorSource:
+    """The last good reading of one provider, stale after stale_after seconds without one."""
+
+    def __init__(self, provider: SensorProvider, stale_after: float = 5.0):
+        self.provider = provider
+        self.stale_after = provider.stale_after if provider.stale_after is not None else stale_after
+        self.values: dict = {}
+        self.updated_at: Optional[float] = None
+        self.stale = True
+
+    def age(self, now: float) -> float:
+        return now - self.updated_at if self.updated_at is not None else float("inf")
+
+
+class SensorReader:
+    """
+    Merged reading of several sensor providers.
+
+    The providers are polled concurrently, each one bounded by its stale_after seconds (the provider's
+    own, or the reader's by default), and their readings are merged into one {label: value} dict;
+    on a label collision the earlier provider wins. A provider that fails or returns nothing keeps
+    contributing its last good reading until it's older than its stale_after; then the source is
+    stale and drops out. When every source is stale,
+    read() returns {} and stale is set, so the controller can apply its fail-safe speed.
+
+    Concurrent read() calls share one poll, and with cache_ttl > 0 a result younger than
+    cache_ttl seconds is returned without polling again, so several controllers can share one reader.
+    """
+
+    def __init__(
+        self,
+        providers: Optional[list[SensorProvider]] = None,
+        cache_ttl: float = 0.0,
+        stale_after: float = 5.0,
+    ):
+        self.cache_ttl = cache_ttl
+        self.stale_after = stale_after
+        providers = providers if providers is not None else create_providers()
+        self.sources = [SensorSource(_, stale_after) for _ in providers]
+        self.stale = True
+        self._pending: Optional[asyncio.Future] = None
+        self._cached: dict = {}
+        self._cached_at: Optional[float] = None
+
+    @property
+    def providers(self) -> list[SensorProvider]:
+        return [_.provider for _ in self.sources]
+
+    def add_filters(self, *filters: str):
+        """Register label filters (substrings) whose sensors read() has to return."""
+        for source in self.sources:
+            source.provider.add_filters(*filters)
+
+    def labels(self, label_filter: str) -> tuple[str, ...]:
+        """Labels matching the filter in the current reading, from the providers' indexes when they have one."""
+        labels = {}
+        for source in self.sources:
+            if source.stale:
+                continue
+            indexed = source.provider.labels(label_filter)
+            labels.update(dict.fromkeys(indexed if indexed is not None else source.values))
+        return tuple(_ for _ in labels if label_filter in _)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        await self.close()
+
+    async def _poll_source(self, source: SensorSource, now: float):
+        name = source.provider.name
+        try:
+            values = await asyncio.wait_for(source.provider.read(), source.stale_after)
+        except asyncio.TimeoutError:
+            logging.warning("Sensor source %s did not answer within %ss", name, source.stale_after)
+            values = {}
+        except Exception as e:
+            logging.error("Error reading sensor source %s: %s", name, e)
+            values = {}
+
+        if values:
+            source.values, source.updated_at = values, now
+        stale = source.age(now) > source.stale_after
+        if stale != source.stale:
+            source.stale = stale
+            if stale:
+                logging.warning("Sensor source %s is stale (no reading for %ss)", name, source.stale_after)
+            else:
+                logging.info("Sensor source %s is live", name)
+
+    async def _poll(self) -> dict:
+        loop = asyncio.get_running_loop()
+        now = loop.time()
+        await asyncio.gather(*(self._poll_source(_, now) for _ in self.sources))
+
+        merged = {}
+        for source in reversed(self.sources):
+            if not source.stale:
+                merged.update(source.values)
+        stale = all(_.stale for _ in self.sources)
+        if stale and not self.stale:
+            logging.error("All sensor sources are stale")
+        self.stale = stale
+        return merged
+
+    async def read(self) -> dict:
+        """Read the sensor values as a {label: value} dict without blocking the event loop."""
+        loop = asyncio.get_running_loop()
+        if self._cached_at is not None and loop.time() - self._cached_at < self.cache_ttl:
+            return self._cached
+
+        if self._pending is None:
+            self._pending = asyncio.ensure_future(self._poll())
+            self._pending.add_done_callback(self._on_poll_done)
+        return await asyncio.shield(self._pending)
+
+    def _on_poll_done(self, future: asyncio.Future):
+        self._pending = None
+        if not future.cancelled() and future.exception() is None:
+            self._cached = future.result()
+            self._cached_at = future.get_loop().time()
+
+    async def close(self):
+        """Close every provider."""
+        await asyncio.gather(*(_.provider.close() for _ in self.sources))
+
+
 # def __main():
 #     a = get_sensors()
 #     _output = {}
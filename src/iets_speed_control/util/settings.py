@@ -0,0 +1,110 @@
+# do not import env here
+import os
+from dataclasses import dataclass, fields
+from typing import Mapping, Optional
+
+from .tools import strtobool
+
+
+@dataclass(frozen=True)
+class Settings:
+    """
+    Typed application settings; every field is read from the upper-case environment variable
+    of the same name (see .env.example).
+    """
+
+    verbose: bool = False
+    log_file: str = ""
+    log_json: bool = False
+    log_max_bytes: int = 10 * 1024 * 1024
+    log_backups: int = 3
+    log_repeat_interval: float = 60.0
+    device_name: str = "USB-Enhanced-SERIAL CH9102"
+    device_serial: str = "568B022419"
+    default_port: str = "COM7"
+    pwm_command: str = "Dimmer"
+    serial_baudrate: int = 115200
+    serial_timeout: float = 0.3
+    serial_response_framing: bool = True
+    serial_command_deadline: float = 1.0
+    serial_lost_after: int = 3
+    serial_backlog: bool = True
+    reconnect_min_delay: float = 1.0
+    reconnect_max_delay: float = 30.0
+    delay: float = 1.1
+    delay_min: Optional[float] = None  # DELAY when not set
+    delay_max: Optional[float] = None  # DELAY when not set
+    delay_rise_threshold: float = 2.0
+    ignore_less_than: int = 0
+    cpu_sensor_filter: str = "CPU"
+    gpu_sensor_filter: str = "GPU"
+    sensor_index_refresh: float = 60.0
+    sensor_providers: str = ""
+    sensor_stale_after: float = 5.0
+    sensor_failsafe_pwm: int = 100
+    max_step: int = 100
+    shadow_state: bool = False
+    reconcile_interval: float = 30.0
+    control_strategy: str = "curve"
+    pid_setpoint: float = 75.0
+    pid_kp: float = 4.0
+    pid_ki: float = 0.2
+    pid_kd: float = 1.0
+    pid_min_output: int = 0
+    pid_max_output: int = 100
+    pid_hysteresis: int = 3
+    pid_feed_forward_filter: str = ""
+    pid_feed_forward_gain: float = 0.0
+    devices_file: str = ""
+    metrics_port: int = 0
+    api_socket: str = ""
+    api_port: int = 8765
+    status_max_rate: float = 4.0
+    telemetry_capacity: int = 3600
+    telemetry_file: str = ""
+    telemetry_max_bytes: int = 16 * 1024 * 1024
+    telemetry_backups: int = 3
+    telemetry_flush_interval: float = 10.0
+    profile_dir: str = ""
+    profile_seconds: float = 10.0
+    profile_mode: str = "sample"
+    temp_ranges: str = "(55, 64, 20, 49), (65, 68, 50, 50), (69, 79, 51, 64), (80, 89, 65, 74), (90, 100, 75, 100)"
+    sensor_curves: str = ""
+    sensor_curve_reduce: str = "max"
+
+    def __post_init__(self):
+        if self.delay_min is None:
+            object.__setattr__(self, "delay_min", self.delay)
+        if self.delay_max is None:
+            object.__setattr__(self, "delay_max", self.delay)
+
+    @classmethod
+    def from_env(cls, environ: Optional[Mapping[str, str]] = None) -> "Settings":
+        """
+        Settings from environment variables; unset ones keep their defaults.
+
+        An empty number or flag (e.g. DELAY_MIN=) counts as unset; an empty string stays empty.
+        """
+        environ = os.environ if environ is None else environ
+        values = {}
+        for field in fields(cls):
+            key = field.name.upper()
+            if key not in environ:
+                continue
+            kind = field.type if field.type in (bool, int, float, str) else float  # Optional[float]
+            if kind is not str and not environ[key].strip():
+                continue
+            try:
+                values[field.name] = bool(strtobool(environ[key])) if kind is bool else kind(environ[key])
+            except ValueError as e:
+                raise ValueError(f"{key}={environ[key]!r} is not a valid {kind.__name__}") from e
+        return cls(**values)
+
+
+def load_settings(dotenv=True) -> Settings:
+    """Settings from the environment, after loading .env into it when dotenv is set."""
+    if dotenv:
+        from dotenv import load_dotenv
+
+        load_dotenv()
+    return Settings.from_env()
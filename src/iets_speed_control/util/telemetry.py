@@ -0,0 +1,266 @@
+# do not import env here
+import json
+import logging
+import math
+import mmap
+import os
+import struct
+from pathlib import Path
+from typing import Optional
+
+MAGIC = b"IETSTEL1"
+# magic, record size, record count, schema length
+HEADER = struct.Struct("<8sIQI")
+SPARK_CHARS = "▁▂▃▄▅▆▇█"
+
+
+class TelemetrySchema:
+    """
+    Column layout of a telemetry record.
+
+    One record per tick: wall-clock timestamp, one float per sensor column, target and actual PWM
+    (-1 when unknown) and one float per stage timing in seconds, packed little-endian.
+    """
+
+    def __init__(self, sensors=("cpu", "gpu"), stages=("tick", "sensor_fetch", "device_read", "device_write")):
+        self.sensors = tuple(sensors)
+        self.stages = tuple(stages)
+        self.struct = struct.Struct("<d" + "f" * len(self.sensors) + "hh" + "f" * len(self.stages))
+
+    @property
+    def columns(self) -> tuple[str, ...]:
+        return ("timestamp", *self.sensors, "target", "actual", *(f"{_}_seconds" for _ in self.stages))
+
+    @property
+    def size(self) -> int:
+        return self.struct.size
+
+    def to_json(self) -> bytes:
+        return json.dumps({"sensors": self.sensors, "stages": self.stages}).encode()
+
+    @classmethod
+    def from_json(cls, data: bytes) -> "TelemetrySchema":
+        return cls(**json.loads(data))
+
+    def dtype(self):
+        import numpy as np
+
+        return np.dtype(
+            [("timestamp", "<f8")]
+            + [(_, "<f4") for _ in self.sensors]
+            + [("target", "<i2"), ("actual", "<i2")]
+            + [(f"{_}_seconds", "<f4") for _ in self.stages]
+        )
+
+
+def _numpy_columns(data: bytes, schema: TelemetrySchema) -> dict:
+    try:
+        import numpy as np
+    except ImportError as e:
+        raise ImportError("Reading telemetry as arrays requires numpy: uv sync --extra analysis") from e
+
+    records = np.frombuffer(data, dtype=schema.dtype())
+    return {name: records[name].copy() for name in schema.columns}
+
+
+class TelemetryFile:
+    """
+    Size-capped memory-mapped telemetry file.
+
+    The file is preallocated to max_bytes and mapped once. Records are copied into the map and
+    the record count in the header is updated on every flush. When the file is full it's rotated
+    to path.1 .. path.N (backups) and a new file is started.
+    """
+
+    def __init__(self, path, schema: TelemetrySchema, max_bytes=16 * 1024 * 1024, backups=3):
+        self.path = Path(path)
+        self.schema = schema
+        self.backups = backups
+        self._schema_json = schema.to_json()
+        self._data_offset = HEADER.size + len(self._schema_json)
+        self.capacity = max((max_bytes - self._data_offset) // schema.size, 1)
+        self.count = 0
+        self._fd: Optional[int] = None
+        self._map: Optional[mmap.mmap] = None
+
+    @property
+    def max_bytes(self) -> int:
+        return self._data_offset + self.capacity * self.schema.size
+
+    def _open(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        existing = self._existing_count()
+        if existing is None and self.path.exists():
+            self._rotate()  # a file with another schema or size
+
+        self._fd = os.open(self.path, os.O_RDWR | os.O_CREAT | getattr(os, "O_BINARY", 0))
+        os.ftruncate(self._fd, self.max_bytes)
+        self._map = mmap.mmap(self._fd, self.max_bytes)
+        self.count = existing or 0
+        self._map[HEADER.size : self._data_offset] = self._schema_json
+        self._write_header()
+
+    def _existing_count(self) -> Optional[int]:
+        """Record count of an existing file that can be appended to."""
+        try:
+            with open(self.path, "rb") as f:
+                magic, size, count, schema_length = HEADER.unpack(f.read(HEADER.size))
+                schema_json = f.read(schema_length)
+            if magic != MAGIC or size != self.schema.size or schema_json != self._schema_json:
+                return None
+            if os.path.getsize(self.path) > self.max_bytes or count > self.capacity:
+                return None
+            return count
+        except Exception:
+            return None
+
+    def _write_header(self):
+        self._map[: HEADER.size] = HEADER.pack(MAGIC, self.schema.size, self.count, len(self._schema_json))
+
+    def _rotate(self):
+        self.close()
+        for i in range(self.backups, 0, -1):
+            source = self.path if i == 1 else self.path.with_name(f"{self.path.name}.{i - 1}")
+            target = self.path.with_name(f"{self.path.name}.{i}")
+            if source.exists():
+                os.replace(source, target)
+        if not self.backups and self.path.exists():
+            self.path.unlink()
+
+    def write(self, records: bytes):
+        """Append packed records, rotating the file when it's full."""
+        size = self.schema.size
+        while records:
+            if self._map is None:
+                self._open()
+            if self.count >= self.capacity:
+                self._rotate()
+                continue
+
+            fit = min(len(records) // size, self.capacity - self.count)
+            start = self._data_offset + self.count * size
+            self._map[start : start + fit * size] = records[: fit * size]
+            self.count += fit
+            records = records[fit * size :]
+
+        if self._map is not None:
+            self._write_header()
+            self._map.flush()
+
+    def close(self):
+        if self._map is not None:
+            self._map.flush()
+            self._map.close()
+            self._map = None
+        if self._fd is not None:
+            os.truncate(self.path, self._data_offset + self.count * self.schema.size)
+            os.close(self._fd)
+            self._fd = None
+
+
+def read_telemetry(path) -> dict:
+    """Read a telemetry file into a {column: numpy array} dict."""
+    with open(path, "rb") as f:
+        data = f.read()
+    magic, size, count, schema_length = HEADER.unpack_from(data)
+    if magic != MAGIC:
+        raise ValueError(f"{path} is not a telemetry file")
+
+    schema = TelemetrySchema.from_json(data[HEADER.size : HEADER.size + schema_length])
+    offset = HEADER.size + schema_length
+    return _numpy_columns(data[offset : offset + count * size], schema)
+
+
+class TelemetryBuffer:
+    """
+    Fixed-size ring buffer of struct-packed per-tick records.
+
+    Memory is allocated once (capacity records) and never grows. Records not yet written
+    to the optional TelemetryFile are flushed by flush().
+    """
+
+    def __init__(self, capacity=3600, schema: Optional[TelemetrySchema] = None, file: Optional[TelemetryFile] = None):
+        self.schema = schema or TelemetrySchema()
+        self.capacity = capacity
+        self.file = file
+        self._data = bytearray(capacity * self.schema.size)
+        self._head = 0  # next slot to write
+        self.count = 0
+        self._unflushed = 0
+
+    def __len__(self):
+        return self.count
+
+    def append(self, timestamp: float, sensors: dict, target: Optional[int], actual: Optional[int], stages: dict):
+        values = [timestamp]
+        values.extend(float(sensors.get(_, math.nan)) for _ in self.schema.sensors)
+        values.append(-1 if target is None else target)
+        values.append(-1 if actual is None else actual)
+        values.extend(float(stages.get(_, math.nan)) for _ in self.schema.stages)
+        self.schema.struct.pack_into(self._data, self._head * self.schema.size, *values)
+
+        self._head = (self._head + 1) % self.capacity
+        self.count = min(self.count + 1, self.capacity)
+        self._unflushed = min(self._unflushed + 1, self.capacity)
+
+    def copy_from(self, other: "TelemetryBuffer"):
+        """
+        Append the records of a buffer with another schema, columns matched by name; a column other
+        doesn't have is NaN (-1 for target and actual). They count as flushed, other's file has them.
+        """
+        defaults = {"target": -1, "actual": -1}
+        for record in other.records():
+            row = dict(zip(other.schema.columns, record))
+            values = [row.get(_, defaults.get(_, math.nan)) for _ in self.schema.columns]
+            self.schema.struct.pack_into(self._data, self._head * self.schema.size, *values)
+            self._head = (self._head + 1) % self.capacity
+            self.count = min(self.count + 1, self.capacity)
+
+    def _ordered(self, last: int) -> bytes:
+        """The last records as contiguous bytes, oldest first."""
+        last = min(last, self.count)
+        size = self.schema.size
+        start = (self._head - last) % self.capacity
+        if start + last <= self.capacity:
+            return bytes(self._data[start * size : (start + last) * size])
+        return bytes(self._data[start * size :]) + bytes(self._data[: self._head * size])
+
+    def flush(self):
+        """Write the records appended since the last flush to the file."""
+        if not self.file or not self._unflushed:
+            return
+        try:
+            self.file.write(self._ordered(self._unflushed))
+        except Exception as e:
+            logging.error(f"Error writing telemetry to {self.file.path}: {e}")
+        self._unflushed = 0
+
+    def close(self):
+        self.flush()
+        if self.file:
+            self.file.close()
+
+    def records(self, last: Optional[int] = None) -> list[tuple]:
+        """The last records as tuples in schema.columns order, oldest first."""
+        data = self._ordered(self.count if last is None else last)
+        return list(self.schema.struct.iter_unpack(data))
+
+    def column(self, name: str, last: Optional[int] = None) -> list:
+        """Values of one column, oldest first."""
+        index = self.schema.columns.index(name)
+        return [_[index] for _ in self.records(last)]
+
+    def to_numpy(self, last: Optional[int] = None) -> dict:
+        """The last records as a {column: numpy array} dict."""
+        return _numpy_columns(self._ordered(self.count if last is None else last), self.schema)
+
+    def sparkline(self, name="actual", width=30, low=0.0, high=100.0) -> str:
+        """Unicode block sparkline of the last width values of a column."""
+        chars = []
+        for value in self.column(name, width):
+            if math.isnan(value) or value < 0:
+                chars.append(" ")
+                continue
+            ratio = (min(max(value, low), high) - low) / ((high - low) or 1)
+            chars.append(SPARK_CHARS[round(ratio * (len(SPARK_CHARS) - 1))])
+        return "".join(chars)
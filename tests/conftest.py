@@ -0,0 +1,24 @@
+import pytest
+
+
+class StaticSensors:
+    """SensorReader stand-in without readings."""
+
+    stale = False
+
+    def add_filters(self, *filters):
+        pass
+
+    def labels(self, label_filter):
+        return ()
+
+    async def read(self):
+        return {}
+
+    async def close(self):
+        pass
+
+
+@pytest.fixture
+def sensors() -> StaticSensors:
+    return StaticSensors()
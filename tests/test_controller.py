@@ -0,0 +1,15 @@
+import time
+
+from iets_speed_control.controller import SpeedController
+from iets_speed_control.util.devices import DeviceConfig
+
+
+def test_discovery_and_reconnect_metrics(sensors):
+    controller = SpeedController(DeviceConfig(port="/dev/null-tty", device_serial=""), sensors=sensors)
+    controller.discovery.scans, controller.discovery.failed_scans = 3, 2
+    snapshot = controller.metrics.snapshot()
+    assert (snapshot["port_scans_total"], snapshot["port_scans_failed_total"]) == (3, 2)
+    assert snapshot["disconnected_seconds"] == 0.0
+
+    controller._disconnected_since = time.monotonic() - 5
+    assert controller.metrics.snapshot()["disconnected_seconds"] >= 5
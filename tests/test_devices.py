@@ -0,0 +1,57 @@
+import json
+
+import pytest
+
+from iets_speed_control.controller import MultiSpeedController
+from iets_speed_control.util.devices import group_by_device, load_device_configs
+
+
+def write_configs(tmp_path, devices) -> str:
+    path = tmp_path / "devices.json"
+    path.write_text(json.dumps(devices), encoding="utf-8")
+    return str(path)
+
+
+def test_serial_only_devices_are_separate(tmp_path, sensors):
+    path = write_configs(
+        tmp_path,
+        [
+            {"name": "left", "device_serial": "568B022419", "channel": 1},
+            {"name": "right", "device_serial": "5A7C011022", "channel": 2},
+        ],
+    )
+    configs = load_device_configs(path)
+    groups = group_by_device(configs)
+    assert [[_.name for _ in group] for group in groups.values()] == [["left"], ["right"]]
+
+    controller = MultiSpeedController(configs, sensors=sensors)
+    assert not controller.devices
+    left, right = controller.controllers.values()
+    assert left.device is not right.device
+    assert (left.command, right.command) == ("Channel1", "Channel2")
+
+
+def test_channels_of_one_device_share_it(tmp_path, sensors):
+    path = write_configs(
+        tmp_path,
+        [
+            {"name": "left", "port": "COM7", "device_serial": "568B022419", "channel": 1},
+            {"name": "right", "port": "COM7", "device_serial": "568B022419", "channel": 2},
+        ],
+    )
+    controller = MultiSpeedController(load_device_configs(path), sensors=sensors)
+    left, right = controller.controllers.values()
+    assert list(controller.devices) == [("COM7", "568B022419")]
+    assert left.device is right.device
+
+
+def test_same_channel_of_one_device_is_rejected(tmp_path):
+    path = write_configs(
+        tmp_path,
+        [
+            {"name": "left", "device_serial": "568B022419", "channel": 1},
+            {"name": "right", "device_serial": "568B022419", "command": "Channel1"},
+        ],
+    )
+    with pytest.raises(ValueError, match="drive the same channel"):
+        load_device_configs(path)
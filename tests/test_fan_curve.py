@@ -0,0 +1,30 @@
+import sys
+
+import pytest
+
+from iets_speed_control.util.fan_curve import CurveSet, FanCurve
+
+BASE = FanCurve.parse("(50, 70, 30, 60), (70, 90, 60, 100)")
+READINGS = {"CPU Package": "79.9", "CPU Core #1": "61.2", "GPU Hotspot": "88.5", "VRM MOS": 55.0}
+SPEC = "VRM: (40, 80, 20, 100)"
+
+
+def curve_set(monkeypatch, numpy: bool) -> CurveSet:
+    if not numpy:
+        monkeypatch.setitem(sys.modules, "numpy", None)  # import numpy raises ImportError
+    curves = CurveSet.parse(SPEC, BASE, ("CPU", "GPU"))
+    assert (curves._np is not None) == numpy
+    return curves
+
+
+def test_decimal_string_readings_without_numpy(monkeypatch):
+    curves = curve_set(monkeypatch, numpy=False)
+    # truncated like the CPU/GPU maximum: 79.9 -> 79, 88.5 -> 88
+    assert curves.targets(READINGS) == [BASE(79), BASE(88), FanCurve.parse("(40, 80, 20, 100)")(55)]
+    assert curves(READINGS) == max(curves.targets(READINGS))
+
+
+def test_both_paths_agree(monkeypatch):
+    pytest.importorskip("numpy")
+    with_numpy = curve_set(monkeypatch, numpy=True).targets(READINGS)
+    assert curve_set(monkeypatch, numpy=False).targets(READINGS) == with_numpy
@@ -0,0 +1,44 @@
+import asyncio
+
+import pytest
+
+from iets_speed_control.util.sensors import SensorProvider, SensorReader, create_providers
+
+
+class FlakyProvider(SensorProvider):
+    """Answers until failing is set, then returns nothing."""
+
+    def __init__(self, name, values, stale_after=None):
+        self.name = name
+        self.values = values
+        self.stale_after = stale_after
+        self.failing = False
+
+    async def read(self) -> dict:
+        return {} if self.failing else self.values
+
+
+def test_per_provider_stale_after():
+    fast = FlakyProvider("fast", {"CPU": 70.0}, stale_after=1.0)
+    slow = FlakyProvider("slow", {"GPU": 60.0})
+    reader = SensorReader([fast, slow], stale_after=10.0)
+    assert [_.stale_after for _ in reader.sources] == [1.0, 10.0]
+
+    async def run():
+        loop = asyncio.get_running_loop()
+        assert await reader.read() == {"CPU": 70.0, "GPU": 60.0}
+        fast.failing = slow.failing = True
+        for source in reader.sources:
+            source.updated_at = loop.time() - 5.0  # the last reading is 5 s old
+        return await reader.read()
+
+    assert asyncio.run(run()) == {"GPU": 60.0}
+    assert [_.stale for _ in reader.sources] == [True, False]
+    assert not reader.stale
+
+
+def test_create_providers_stale_after():
+    providers = create_providers("hwmon:2.5, hwmon")
+    assert [_.stale_after for _ in providers] == [2.5, None]
+    with pytest.raises(ValueError, match="stale timeout"):
+        create_providers("hwmon:soon")
@@ -0,0 +1,80 @@
+import asyncio
+import sys
+import threading
+import types
+
+from iets_speed_control.entities.serial_device import SerialTransport
+
+
+class FakeSerial:
+    """aioserial stand-in: pending holds output received before the command, lines what follows it."""
+
+    def __init__(self, pending: bytes, lines: list[bytes]):
+        self.pending = pending
+        self.lines = lines
+        self.written = []
+
+    @property
+    def in_waiting(self) -> int:
+        return len(self.pending)
+
+    def read(self, size: int) -> bytes:
+        data, self.pending = self.pending[:size], self.pending[size:]
+        return data
+
+    async def read_until_async(self) -> bytes:
+        return self.lines.pop(0) if self.lines else b""
+
+    async def write_async(self, data: bytes):
+        self.written.append(data)
+
+
+def test_pending_output_is_handled_not_dropped():
+    transport = SerialTransport("COM7", timeout=0.1, framing=True)
+    transport.serial = FakeSerial(
+        b'stat/RESULT = {"Dimmer":10}\r\n12:00:01 MQT: tele/STA',
+        [b'TE = {"Uptime":"0T01:00:00"}\r\n', b'stat/RESULT = {"Dimmer":40}\r\n'],
+    )
+    device_lines = []
+    transport._on_device_line = device_lines.append
+
+    results = asyncio.run(transport.exchange("Dimmer", ("Dimmer",), deadline=1.0))
+    assert results == {"Dimmer": {"Dimmer": 40}}
+    assert device_lines == ['stat/RESULT = {"Dimmer":10}', '12:00:01 MQT: tele/STATE = {"Uptime":"0T01:00:00"}']
+    assert transport.serial.written == [b"Dimmer\n"]
+
+
+def test_port_opened_after_cancel_is_closed(monkeypatch):
+    opened = threading.Event()
+    release = threading.Event()
+
+    class SlowSerial:
+        closed = False
+
+        def __init__(self, **kwargs):
+            opened.set()
+            release.wait(5)
+
+        def close(self):
+            SlowSerial.closed = True
+
+    monkeypatch.setitem(sys.modules, "aioserial", types.SimpleNamespace(AioSerial=SlowSerial))
+    transport = SerialTransport("COM7", timeout=0.1)
+
+    async def run():
+        task = asyncio.create_task(transport.open())
+        await asyncio.to_thread(opened.wait, 5)
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+        release.set()
+        for _ in range(100):  # the open finishes in the worker thread
+            if SlowSerial.closed:
+                break
+            await asyncio.sleep(0.01)
+
+    asyncio.run(run())
+    assert SlowSerial.closed
+    assert transport.serial is None
@@ -0,0 +1,52 @@
+import math
+
+from iets_speed_control.controller import SpeedController
+from iets_speed_control.util.devices import DeviceConfig
+from iets_speed_control.util.telemetry import TelemetryBuffer, TelemetrySchema
+
+
+def test_copy_from_matches_columns_by_name():
+    old = TelemetryBuffer(4, TelemetrySchema(("cpu", "gpu")))
+    for i in range(6):  # wraps around
+        old.append(float(i), {"cpu": 50 + i, "gpu": 40 + i}, 30 + i, None, {"tick": 0.01})
+
+    new = TelemetryBuffer(4, TelemetrySchema(("cpu", "gpu", "VRM")))
+    new.copy_from(old)
+    assert new.column("timestamp") == [2.0, 3.0, 4.0, 5.0]
+    assert new.column("cpu") == [52.0, 53.0, 54.0, 55.0]
+    assert all(math.isnan(_) for _ in new.column("VRM"))
+    assert new.column("actual") == [-1] * 4
+    assert new.sparkline("target", width=4) == old.sparkline("target", width=4)
+
+
+class LabelledSensors:
+    """The labels of the last reading, like SensorReader without provider indexes."""
+
+    def __init__(self):
+        self.reading = {}
+        self.calls = 0
+
+    def add_filters(self, *filters):
+        pass
+
+    def labels(self, label_filter):
+        self.calls += 1
+        return tuple(_ for _ in self.reading if label_filter in _)
+
+
+def test_schema_follows_new_labels_and_keeps_history():
+    sensors = LabelledSensors()
+    controller = SpeedController(DeviceConfig(cpu_sensor_filter="CPU", gpu_sensor_filter="GPU"), sensors=sensors)
+
+    sensors.reading = {"GPU Hotspot": 80.0, "CPU Package": 70.0}
+    controller._record_telemetry(sensors.reading, 40, 40)
+    assert controller.telemetry.schema.sensors == ("cpu", "gpu", "CPU Package", "GPU Hotspot")
+
+    calls = sensors.calls
+    controller._record_telemetry(dict(sensors.reading), 41, 40)
+    assert sensors.calls == calls  # same labels: not looked at again
+
+    sensors.reading = {**sensors.reading, "CPU Core #1": 65.0}
+    controller._record_telemetry(sensors.reading, 42, 41)
+    assert controller.telemetry.schema.sensors == ("cpu", "gpu", "CPU Core #1", "CPU Package", "GPU Hotspot")
+    assert controller.telemetry.column("target") == [40, 41, 42]